@@ -0,0 +1,40 @@
+import typing as t
+
+from flask_restful import Resource
+
+from app.api.university.cache import entity_cache
+
+
+class CacheStatsApi(Resource):
+    def get(self) -> dict[str, t.Any]:
+        """
+        This method returns statistics of serialized entities cache, usage
+        is read from the backend and counters are of the worker
+        ---
+        tags:
+          - Admin
+        responses:
+          200:
+            description: returns backend, whether it is enabled, amount
+              and size of cached responses, cache hits and misses, entries
+              evicted to fit max size, expired after TTL and dropped because
+              their entities were changed, misses served by value another
+              caller loaded, waits for it which timed out and failed backend
+              calls
+            examples: {
+                    "backend": "shared",
+                    "enabled": true,
+                    "entries": 120,
+                    "size_bytes": 48213,
+                    "max_bytes": 16777216,
+                    "hits": 5230,
+                    "misses": 311,
+                    "evictions": 0,
+                    "expirations": 150,
+                    "invalidations": 41,
+                    "coalesced": 27,
+                    "lock_timeouts": 0,
+                    "errors": 0
+                }
+        """
+        return entity_cache.status()
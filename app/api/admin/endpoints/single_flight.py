@@ -0,0 +1,23 @@
+from flask_restful import Resource
+
+from app.api.university.single_flight import list_flights
+
+
+class SingleFlightStatsApi(Resource):
+    def get(self) -> dict[str, int]:
+        """
+        This method returns counters of list requests coalescing of the
+        worker
+        ---
+        tags:
+          - Admin
+        responses:
+          200:
+            description: returns amount of list queries run and requests
+              folded into a query already in flight
+            examples: {
+                    "flights": 120,
+                    "folded": 1830
+                }
+        """
+        return list_flights.stats.as_dict()
@@ -0,0 +1,26 @@
+from flask_restful import Resource
+
+from app.db.transaction import transaction_stats
+
+
+class TransactionsStatsApi(Resource):
+    def get(self) -> dict[str, int]:
+        """
+        This method returns transaction counters of the worker
+        ---
+        tags:
+          - Admin
+        responses:
+          200:
+            description: returns amount of commits, rollbacks, retries of
+              serialization failures and deadlocks, transactions aborted after
+              all retries and rolled back savepoints
+            examples: {
+                    "commits": 120,
+                    "rollbacks": 3,
+                    "retries": 2,
+                    "aborts": 0,
+                    "savepoint_rollbacks": 1
+                }
+        """
+        return transaction_stats.as_dict()
@@ -0,0 +1,6 @@
+from app.api.university.api_models.base import MyBaseModel
+
+
+class EnrollmentRequest(MyBaseModel):
+    student_id: int
+    course_id: int
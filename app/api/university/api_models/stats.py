@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from app.api.university.api_models.base import MyBaseModel
+
+
+class CourseEnrollment(MyBaseModel):
+    id: int
+    name: str
+    students: int
+
+
+class GroupSize(MyBaseModel):
+    id: int
+    name: str
+    students: int
+
+
+class GroupSizeBucket(MyBaseModel):
+    size: int
+    groups: int
+
+
+class CourseStatsResponse(MyBaseModel):
+    refreshed_at: datetime
+    students: int
+    enrollments: int
+    students_without_courses: int
+    average_courses_per_student: float
+    courses: list[CourseEnrollment]
+
+
+class GroupStatsResponse(MyBaseModel):
+    refreshed_at: datetime
+    students: int
+    unassigned_students: int
+    average_group_size: float
+    group_size_distribution: list[GroupSizeBucket]
+    groups: list[GroupSize]
@@ -0,0 +1,188 @@
+import logging
+import time
+import typing as t
+from contextlib import suppress
+from urllib.parse import urlencode
+
+from flask import request
+
+from app.api.university.cache.base import (
+    CacheBackend,
+    CachedResponse,
+    CacheStats,
+)
+from app.api.university.cache.memory import MemoryBackend
+from app.api.university.cache.shared import SharedMemoryBackend
+from app.configs import (
+    ENTITY_CACHE_BACKEND,
+    ENTITY_CACHE_LOCK_POLL,
+    ENTITY_CACHE_LOCK_TTL,
+    ENTITY_CACHE_LOCK_WAIT,
+    ENTITY_CACHE_MAX_BYTES,
+    ENTITY_CACHE_REDIS_URL,
+    ENTITY_CACHE_SHARED_PATH,
+    ENTITY_CACHE_TTL,
+    REPLICA_STICKINESS,
+    REPLICA_URLS,
+)
+from app.db.invalidation import add_invalidation_listener, tag
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "CacheBackend",
+    "CachedResponse",
+    "CacheStats",
+    "CacheUnavailable",
+    "MemoryBackend",
+    "SharedMemoryBackend",
+    "create_backend",
+    "entity_cache",
+    "entity_tags",
+    "get_cached",
+    "invalidate_entities",
+    "request_key",
+]
+
+C = t.TypeVar("C", bound="CachedResponse | None")
+R = t.TypeVar("R")
+
+
+class CacheUnavailable(Exception):
+    """Call of cache backend failed, response is served from database"""
+
+
+def create_backend(name: str) -> CacheBackend:
+    """This function creates cache backend configured by ENTITY_CACHE_*
+    variables: memory of the worker, shared memory of the host or redis"""
+    settle = REPLICA_STICKINESS if REPLICA_URLS else 0
+    if name == "memory":
+        return MemoryBackend(
+            ENTITY_CACHE_MAX_BYTES,
+            ENTITY_CACHE_TTL,
+            ENTITY_CACHE_LOCK_TTL,
+            settle,
+        )
+    if name == "shared":
+        return SharedMemoryBackend(
+            ENTITY_CACHE_SHARED_PATH,
+            ENTITY_CACHE_MAX_BYTES,
+            ENTITY_CACHE_TTL,
+            ENTITY_CACHE_LOCK_TTL,
+            settle,
+        )
+    if name == "redis":
+        from app.api.university.cache.redis import RedisBackend
+
+        return RedisBackend(
+            ENTITY_CACHE_REDIS_URL,
+            ENTITY_CACHE_MAX_BYTES,
+            ENTITY_CACHE_TTL,
+            ENTITY_CACHE_LOCK_TTL,
+            settle,
+        )
+    raise ValueError(f"Unknown cache backend {name}")
+
+
+entity_cache = create_backend(ENTITY_CACHE_BACKEND)
+
+
+def invalidate_entities(tags: set[str]) -> None:
+    """This function drops cached values of changed entities. If backend
+    fails to do it all values are dropped, and if that fails too cache is
+    disabled, values it keeps may be stale"""
+    try:
+        entity_cache.invalidate(tags)
+        return
+    except Exception:
+        entity_cache.stats.increment("errors")
+        log.exception(f"Invalidation of {entity_cache.name} cache failed")
+    try:
+        entity_cache.clear()
+    except Exception:
+        entity_cache.stats.increment("errors")
+        entity_cache.disable()
+        log.exception(f"{entity_cache.name} cache is disabled")
+
+
+add_invalidation_listener(invalidate_entities)
+
+
+def entity_tags(
+    kind: str, entity_id: int, related: t.Mapping[str, t.Iterable[int]]
+) -> frozenset[str]:
+    """This function returns tags of serialized entity and entities
+    included in it"""
+    return frozenset(
+        [
+            tag(kind, entity_id),
+            *(
+                tag(related_kind, related_id)
+                for related_kind, ids in related.items()
+                for related_id in ids
+            ),
+        ]
+    )
+
+
+def request_key(name: str) -> str:
+    """This function returns cache key of request made of name and sorted
+    query parameters"""
+    return f"{name}?{urlencode(sorted(request.args.items(multi=True)))}"
+
+
+def get_cached(key: str, load: t.Callable[[], C]) -> C:
+    """This function returns cached response, on miss it is loaded and
+    stored. Only caller holding fill lock of key loads it, the others wait
+    for the value till ENTITY_CACHE_LOCK_WAIT passes and load it themselves
+    after that. Response is loaded without cache if backend fails. None
+    returned if there is nothing to load"""
+    if not entity_cache.enabled:
+        return load()
+    try:
+        cached = _call(entity_cache.get, key)
+        if cached is not None:
+            entity_cache.stats.increment("hits")
+            return t.cast(C, cached)
+        entity_cache.stats.increment("misses")
+
+        deadline = time.monotonic() + ENTITY_CACHE_LOCK_WAIT
+        while (token := _call(entity_cache.try_lock, key)) is None:
+            if time.monotonic() >= deadline:
+                entity_cache.stats.increment("lock_timeouts")
+                return _fill(key, load)
+            time.sleep(ENTITY_CACHE_LOCK_POLL)
+            cached = _call(entity_cache.get, key)
+            if cached is not None:
+                entity_cache.stats.increment("coalesced")
+                return t.cast(C, cached)
+    except CacheUnavailable:
+        return load()
+    try:
+        return _fill(key, load)
+    finally:
+        with suppress(CacheUnavailable):
+            _call(entity_cache.unlock, key, token)
+
+
+def _fill(key: str, load: t.Callable[[], C]) -> C:
+    try:
+        since = _call(entity_cache.now)
+    except CacheUnavailable:
+        return load()
+    cached = load()
+    if cached is not None:
+        with suppress(CacheUnavailable):
+            _call(entity_cache.set, key, cached, since)
+    return cached
+
+
+def _call(method: t.Callable[..., R], *args: t.Any) -> R:
+    """This function calls backend method, its error is logged and raised
+    as CacheUnavailable"""
+    try:
+        return method(*args)
+    except Exception as error:
+        entity_cache.stats.increment("errors")
+        log.warning(f"{entity_cache.name} cache failed: {error!r}")
+        raise CacheUnavailable from error
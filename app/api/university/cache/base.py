@@ -0,0 +1,186 @@
+import abc
+import json
+import secrets
+import threading
+import typing as t
+from dataclasses import dataclass, field
+
+from flask import Response
+
+from app.api.university.utils import etag_headers, not_modified
+from app.db.invalidation import ANY_ID, tag
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    tags: frozenset[str]
+    etag: str | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+    def response(self) -> Response:
+        """This method returns response with cached body, or empty 304
+        response if client already has it"""
+        if self.etag is not None and (response := not_modified(self.etag)):
+            return response
+        headers = dict(self.headers)
+        if self.etag is not None:
+            headers.update(etag_headers(self.etag))
+        return Response(self.body, 200, headers, mimetype="application/json")
+
+    def dumps(self) -> bytes:
+        """This method packs response to bytes for shared backends, JSON
+        line with metadata is followed by body"""
+        meta = {
+            "tags": sorted(self.tags),
+            "etag": self.etag,
+            "headers": self.headers,
+        }
+        return json.dumps(meta).encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        meta, _, body = data.partition(b"\n")
+        fields = json.loads(meta)
+        return cls(
+            body, frozenset(fields["tags"]), fields["etag"], fields["headers"]
+        )
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    coalesced: int = 0
+    lock_timeouts: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+                "lock_timeouts": self.lock_timeouts,
+                "errors": self.errors,
+            }
+
+
+def invalidating_tags(tags: t.Iterable[str]) -> set[str]:
+    """This function returns tags which invalidation drops value marked with
+    tags, kind:* drops values marked with any tag of the kind"""
+    return {
+        *tags,
+        *(tag(value_tag.partition(":")[0], ANY_ID) for value_tag in tags),
+    }
+
+
+def lock_token() -> str:
+    """This function returns random token of fill lock holder, only holder
+    with the token can release the lock"""
+    return secrets.token_hex(16)
+
+
+class CacheBackend(abc.ABC):
+    """Storage of serialized responses. Values are tagged with entities
+    they hold and dropped when any of them changes, value read before
+    invalidation of its tags is never stored after it. Fill locks let one
+    caller load a missing value while the others wait for it"""
+
+    name: str
+
+    def __init__(
+        self, max_bytes: int, ttl: float, lock_ttl: float, settle: float = 0
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Fill lock expires by itself if its holder dies
+        self.lock_ttl = lock_ttl
+        # Reads started less than settle seconds after invalidation of their
+        # tags aren't stored, replicas may still return data from before the
+        # change
+        self.settle = settle
+        self.stats = CacheStats()
+        self.disabled = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0 and not self.disabled
+
+    def disable(self) -> None:
+        """This method turns cache off till restart of the worker, values
+        which can't be invalidated must not be served"""
+        self.disabled = True
+
+    @abc.abstractmethod
+    def now(self) -> float:
+        """This method returns time of backend clock, reads pass it to set
+        as time they started"""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> CachedResponse | None:
+        """This method returns cached value, None if there is no value or
+        it is expired"""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: CachedResponse, since: float) -> bool:
+        """This method stores value read from database at since time, it is
+        skipped if any of its tags was invalidated after that"""
+
+    @abc.abstractmethod
+    def invalidate(self, tags: t.Iterable[str]) -> None:
+        """This method drops values marked with tags, kind:* tag drops all
+        values marked with tag of that kind"""
+
+    @abc.abstractmethod
+    def try_lock(self, key: str) -> str | None:
+        """This method takes fill lock of key and returns its token, None if
+        somebody else holds it"""
+
+    @abc.abstractmethod
+    def unlock(self, key: str, token: str) -> None:
+        """This method releases fill lock of key if it is still held with
+        token, lock which expired and was taken by another caller is kept"""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """This method drops all values"""
+
+    @abc.abstractmethod
+    def usage(self) -> dict[str, t.Any]:
+        """This method returns amount and size of stored values"""
+
+    def status(self) -> dict[str, t.Any]:
+        return {
+            "backend": self.name,
+            "enabled": self.enabled,
+            **self.usage(),
+            **self.stats.as_dict(),
+        }
+
+    def can_store(self, value: CachedResponse) -> bool:
+        return self.enabled and len(value.body) <= self.max_bytes
+
+    @property
+    def invalidation_ttl(self) -> float:
+        """Invalidations are remembered for that long, reads which started
+        earlier aren't stored at all"""
+        return self.lock_ttl + self.settle
+
+    def read_too_long_ago(self, since: float, now: float) -> bool:
+        """This method checks if value was read longer than fill lock lives,
+        invalidations which would skip it may be already forgotten"""
+        return now - since > self.lock_ttl
@@ -0,0 +1,146 @@
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+from app.api.university.cache.base import (
+    CacheBackend,
+    CachedResponse,
+    invalidating_tags,
+    lock_token,
+)
+from app.db.invalidation import ANY_ID
+
+
+class MemoryBackend(CacheBackend):
+    """LRU cache of the worker limited by total size of bodies"""
+
+    name = "memory"
+
+    def __init__(
+        self, max_bytes: int, ttl: float, lock_ttl: float, settle: float = 0
+    ) -> None:
+        super().__init__(max_bytes, ttl, lock_ttl, settle)
+        self._entries: OrderedDict[
+            str, tuple[float, CachedResponse]
+        ] = OrderedDict()
+        self._keys_by_tag: dict[str, set[str]] = {}
+        # Expiration time and token of fill lock by key
+        self._locks: dict[str, tuple[float, str]] = {}
+        self._size = 0
+        # Last invalidation time by tag, kept for invalidation_ttl
+        self._invalidated_at: dict[str, float] = {}
+        self._pruned_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.now():
+                self._remove(key)
+                self.stats.increment("expirations")
+                return None
+            self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: CachedResponse, since: float) -> bool:
+        if not self.can_store(value):
+            return False
+        with self._lock:
+            if self._invalidated_since(value.tags, since):
+                return False
+            self._remove(key)
+            self._entries[key] = (self.now() + self.ttl, value)
+            self._size += len(value.body)
+            for value_tag in value.tags:
+                self._keys_by_tag.setdefault(value_tag, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats.increment("evictions")
+        return True
+
+    def invalidate(self, tags: t.Iterable[str]) -> None:
+        with self._lock:
+            now = self.now()
+            keys: set[str] = set()
+            for changed in tags:
+                self._invalidated_at[changed] = now
+                kind, _, entity_id = changed.partition(":")
+                if entity_id == ANY_ID:
+                    for value_tag, tagged in self._keys_by_tag.items():
+                        if value_tag.startswith(f"{kind}:"):
+                            keys |= tagged
+                else:
+                    keys |= self._keys_by_tag.get(changed, set())
+            for key in keys:
+                self._remove(key)
+            self._prune_invalidations(now)
+        self.stats.increment("invalidations", len(keys))
+
+    def try_lock(self, key: str) -> str | None:
+        with self._lock:
+            now = self.now()
+            expires_at, _ = self._locks.get(key, (now, ""))
+            if expires_at > now:
+                return None
+            token = lock_token()
+            self._locks[key] = (now + self.lock_ttl, token)
+        return token
+
+    def unlock(self, key: str, token: str) -> None:
+        with self._lock:
+            if key in self._locks and self._locks[key][1] == token:
+                del self._locks[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self._size = 0
+
+    def usage(self) -> dict[str, t.Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _invalidated_since(self, tags: t.Iterable[str], since: float) -> bool:
+        now = self.now()
+        if self.read_too_long_ago(since, now):
+            return True
+        return any(
+            self._invalidated_at.get(changed, float("-inf")) + self.settle
+            >= since
+            for changed in invalidating_tags(tags)
+        )
+
+    def _prune_invalidations(self, now: float) -> None:
+        """Forgotten invalidations can't skip any value, reads older than
+        them aren't stored. Pruning runs once per invalidation_ttl"""
+        if now - self._pruned_at < self.invalidation_ttl:
+            return
+        self._invalidated_at = {
+            changed: invalidated_at
+            for changed, invalidated_at in self._invalidated_at.items()
+            if now - invalidated_at <= self.invalidation_ttl
+        }
+        self._pruned_at = now
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry[1].body)
+        for value_tag in entry[1].tags:
+            tagged = self._keys_by_tag.get(value_tag)
+            if tagged is not None:
+                tagged.discard(key)
+                if not tagged:
+                    del self._keys_by_tag[value_tag]
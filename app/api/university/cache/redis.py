@@ -0,0 +1,156 @@
+import typing as t
+
+from app.api.university.cache.base import (
+    CacheBackend,
+    CachedResponse,
+    invalidating_tags,
+    lock_token,
+)
+from app.db.invalidation import ANY_ID, tag
+
+# Lock is deleted only by holder of its token, in one step on the server
+UNLOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend(CacheBackend):
+    """Cache shared by workers of all hosts, kept in Redis or any server
+    speaking its protocol. Entries and tag sets expire by server TTL and
+    total size is limited by server maxmemory, max_bytes only limits size
+    of single entry. Requires optional redis package"""
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str,
+        max_bytes: int,
+        ttl: float,
+        lock_ttl: float,
+        settle: float = 0,
+        prefix: str = "university:cache:",
+    ) -> None:
+        super().__init__(max_bytes, ttl, lock_ttl, settle)
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError(
+                "Redis cache backend requires redis package, install it with "
+                "poetry install --extras redis"
+            ) from error
+        self._watch_error = redis.WatchError
+        self._client = redis.Redis.from_url(url)
+        self._unlock_script = self._client.register_script(UNLOCK_SCRIPT)
+        self.prefix = prefix
+
+    def now(self) -> float:
+        # Clock of server is shared by all hosts
+        seconds, microseconds = self._client.time()
+        return seconds + microseconds / 1_000_000
+
+    def get(self, key: str) -> CachedResponse | None:
+        data = self._client.get(self._entry_key(key))
+        if data is None:
+            return None
+        return CachedResponse.loads(data)
+
+    def set(self, key: str, value: CachedResponse, since: float) -> bool:
+        if not self.can_store(value):
+            return False
+        if self.read_too_long_ago(since, self.now()):
+            return False
+        invalidated_keys = [
+            self._invalidated_key(changed)
+            for changed in sorted(invalidating_tags(value.tags))
+        ]
+        ttl = int(self.ttl * 1000)
+        with self._client.pipeline() as pipe:
+            try:
+                if invalidated_keys:
+                    # Invalidation of tags of entry made while it is written
+                    # aborts it
+                    pipe.watch(*invalidated_keys)
+                    if any(
+                        float(invalidated_at) + self.settle >= since
+                        for invalidated_at in pipe.mget(invalidated_keys)
+                        if invalidated_at is not None
+                    ):
+                        return False
+                pipe.multi()
+                pipe.set(self._entry_key(key), value.dumps(), px=ttl)
+                for value_tag in value.tags:
+                    kind, _, _ = value_tag.partition(":")
+                    for tag_key in (
+                        self._tag_key(value_tag),
+                        self._tag_key(tag(kind, ANY_ID)),
+                    ):
+                        pipe.sadd(tag_key, key)
+                        pipe.pexpire(tag_key, ttl)
+                pipe.execute()
+            except self._watch_error:
+                return False
+        return True
+
+    def invalidate(self, tags: t.Iterable[str]) -> None:
+        # Tag key kind:* holds entries marked with any tag of the kind
+        tags = list(tags)
+        if not tags:
+            return
+        tag_keys = [self._tag_key(changed) for changed in tags]
+        now = self.now()
+        # Reads older than invalidation_ttl aren't stored, so invalidation
+        # time isn't needed longer
+        with self._client.pipeline(transaction=False) as pipe:
+            for changed in tags:
+                pipe.set(
+                    self._invalidated_key(changed),
+                    now,
+                    px=int(self.invalidation_ttl * 1000),
+                )
+            pipe.execute()
+        entry_keys = [
+            self._entry_key(key.decode())
+            for key in self._client.sunion(tag_keys)
+        ]
+        removed = self._client.delete(*entry_keys) if entry_keys else 0
+        self._client.delete(*tag_keys)
+        self.stats.increment("invalidations", removed)
+
+    def try_lock(self, key: str) -> str | None:
+        token = lock_token()
+        locked = self._client.set(
+            self._lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000)
+        )
+        return token if locked else None
+
+    def unlock(self, key: str, token: str) -> None:
+        self._unlock_script(keys=[self._lock_key(key)], args=[token])
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def usage(self) -> dict[str, t.Any]:
+        memory = self._client.info("memory")
+        return {
+            "used_memory": memory["used_memory"],
+            "maxmemory": memory["maxmemory"],
+            "max_bytes": self.max_bytes,
+        }
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}entry:{key}"
+
+    def _tag_key(self, value_tag: str) -> str:
+        return f"{self.prefix}tag:{value_tag}"
+
+    def _invalidated_key(self, value_tag: str) -> str:
+        return f"{self.prefix}invalidated:{value_tag}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.prefix}lock:{key}"
@@ -0,0 +1,271 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+
+from app.api.university.cache.base import (
+    CacheBackend,
+    CachedResponse,
+    invalidating_tags,
+    lock_token,
+)
+from app.db.invalidation import ANY_ID
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_key ON tags (key);
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    token TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS invalidations (
+    tag TEXT PRIMARY KEY,
+    invalidated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS invalidations_invalidated_at
+ON invalidations (invalidated_at);
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (id, size) VALUES (1, 0);
+"""
+
+# Hit updates recency of entry only if it is older than that, so hot
+# entries don't take write lock of the file on every read
+TOUCH_INTERVAL = 1.0
+
+
+class SharedMemoryBackend(CacheBackend):
+    """Cache shared by worker processes of the host. Entries are kept in
+    SQLite file in WAL mode, by default on tmpfs, so workers read it through
+    shared memory map. Least recently used entries are evicted to fit size
+    of all bodies in max_bytes"""
+
+    name = "shared"
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        ttl: float,
+        lock_ttl: float,
+        settle: float = 0,
+    ) -> None:
+        super().__init__(max_bytes, ttl, lock_ttl, settle)
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.time()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT expires_at, used_at, data FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        expires_at, used_at, data = row
+        now = self.now()
+        if expires_at <= now:
+            with self._transaction() as connection:
+                expired = self._delete(
+                    connection, [key], "AND expires_at <= ?", (now,)
+                )
+            if expired:
+                self.stats.increment("expirations")
+            return None
+        if now - used_at > TOUCH_INTERVAL:
+            with self._connect() as connection:
+                connection.execute(
+                    "UPDATE entries SET used_at = ? WHERE key = ?", (now, key)
+                )
+        return CachedResponse.loads(data)
+
+    def set(self, key: str, value: CachedResponse, since: float) -> bool:
+        if not self.can_store(value):
+            return False
+        data = value.dumps()
+        now = self.now()
+        if self.read_too_long_ago(since, now):
+            return False
+        with self._transaction() as connection:
+            (invalidated_at,) = connection.execute(
+                "SELECT max(invalidated_at) FROM invalidations "
+                "WHERE tag IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(invalidating_tags(value.tags))),),
+            ).fetchone()
+            if (
+                invalidated_at is not None
+                and invalidated_at + self.settle >= since
+            ):
+                return False
+            self._delete(connection, [key])
+            connection.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, now + self.ttl, now, len(value.body), data),
+            )
+            connection.executemany(
+                "INSERT INTO tags VALUES (?, ?)",
+                [(value_tag, key) for value_tag in value.tags],
+            )
+            connection.execute(
+                "UPDATE meta SET size = size + ?", (len(value.body),)
+            )
+            self._evict(connection)
+        return True
+
+    def invalidate(self, tags: t.Iterable[str]) -> None:
+        tags = list(tags)
+        now = self.now()
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO invalidations VALUES (?, ?)",
+                [(changed, now) for changed in tags],
+            )
+            # Reads older than that aren't stored, invalidation can't skip
+            # them anymore
+            connection.execute(
+                "DELETE FROM invalidations WHERE invalidated_at < ?",
+                (now - self.invalidation_ttl,),
+            )
+            keys: set[str] = set()
+            for changed in tags:
+                kind, _, entity_id = changed.partition(":")
+                if entity_id == ANY_ID:
+                    # Range over tags of kind, ";" is next character after ":"
+                    rows = connection.execute(
+                        "SELECT key FROM tags WHERE tag >= ? AND tag < ?",
+                        (f"{kind}:", f"{kind};"),
+                    )
+                else:
+                    rows = connection.execute(
+                        "SELECT key FROM tags WHERE tag = ?", (changed,)
+                    )
+                keys.update(key for (key,) in rows)
+            removed = self._delete(connection, keys)
+        self.stats.increment("invalidations", removed)
+
+    def try_lock(self, key: str) -> str | None:
+        now = self.now()
+        token = lock_token()
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM locks WHERE key = ? AND expires_at <= ?",
+                (key, now),
+            )
+            inserted = connection.execute(
+                "INSERT OR IGNORE INTO locks VALUES (?, ?, ?)",
+                (key, now + self.lock_ttl, token),
+            ).rowcount
+        return token if inserted == 1 else None
+
+    def unlock(self, key: str, token: str) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM locks WHERE key = ? AND token = ?", (key, token)
+            )
+
+    def clear(self) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM entries")
+            connection.execute("DELETE FROM tags")
+            connection.execute("UPDATE meta SET size = 0")
+
+    def usage(self) -> dict[str, t.Any]:
+        with self._connect() as connection:
+            entries, size = connection.execute(
+                "SELECT (SELECT count(*) FROM entries), size FROM meta"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    @contextmanager
+    def _connect(self) -> t.Iterator[sqlite3.Connection]:
+        """Connection is opened by each process, one inherited from parent
+        after fork can't be used"""
+        with self._lock:
+            if self._connection is None or self._pid != os.getpid():
+                self._connection = self._open()
+                self._pid = os.getpid()
+            yield self._connection
+
+    @contextmanager
+    def _transaction(self) -> t.Iterator[sqlite3.Connection]:
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        # Cache may lose recent entries on power loss, not consistency
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute("PRAGMA busy_timeout = 1000")
+        connection.execute(f"PRAGMA mmap_size = {2 * self.max_bytes}")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _delete(
+        self,
+        connection: sqlite3.Connection,
+        keys: t.Iterable[str],
+        condition: str = "",
+        parameters: tuple[t.Any, ...] = (),
+    ) -> int:
+        removed = 0
+        for key in keys:
+            row = connection.execute(
+                f"DELETE FROM entries WHERE key = ? {condition} "
+                "RETURNING size",
+                (key, *parameters),
+            ).fetchone()
+            if row is None:
+                continue
+            connection.execute("DELETE FROM tags WHERE key = ?", (key,))
+            connection.execute("UPDATE meta SET size = size - ?", row)
+            removed += 1
+        return removed
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        while True:
+            (size,) = connection.execute("SELECT size FROM meta").fetchone()
+            if size <= self.max_bytes:
+                return
+            oldest = connection.execute(
+                "SELECT key FROM entries ORDER BY used_at LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                return
+            self._delete(connection, oldest)
+            self.stats.increment("evictions")
@@ -1,34 +1,124 @@
+import json
 import typing as t
+from functools import partial
 
 from flask import Response, request
 from flask_restful import Resource
 from pydantic import ValidationError
 
 from app.api.university.api_models.course import CourseRequest, CourseResponse
+from app.api.university.cache import (
+    CachedResponse,
+    entity_tags,
+    get_cached,
+    request_key,
+)
+from app.api.university.single_flight import list_flights
+from app.api.university.utils import (
+    ROWS_TOUCHED_HEADER,
+    PageArgs,
+    get_include,
+    get_list_query,
+    get_page_args,
+    ndjson_response,
+    paginate,
+    wants_ndjson,
+    write_if_unchanged,
+)
 from app.crud.university.course import (
+    COURSE_LIST_FIELDS,
     delete_course,
-    get_all_courses,
     get_course,
+    get_course_etag,
+    get_course_rows,
+    less_or_equal_students_in_course,
     post_course,
     put_course,
+    stream_all_courses,
     update_course,
+    update_course_fields,
 )
+from app.crud.university.list_query import ListQuery
+from app.db.invalidation import LIST_ID, tag
+
+COURSE_RELATIONSHIPS = {"students"}
+
+
+class CourseStudentAmountApi(Resource):
+    def get(self, student_amount: int) -> list[dict[str, t.Any]] | Response:
+        """
+        This method retrieves a courses with less or equal student amount
+        ---
+        tags:
+          - Course
+        parameters:
+          - name: student_amount
+            in: path
+            type: int
+        responses:
+          200:
+            description: Returns courses with less or equal student amount
+            examples: [
+                    {
+                      "id": 4,
+                      "name": "History",
+                      "description": "Exploration of historical events.",
+                      "students": []
+                    },
+                ]
+          404:
+            description: There is no courses with specified amount
+        """
+        courses = less_or_equal_students_in_course(student_amount)
+        if not courses:
+            return Response("There is no course with that amount", 404)
+        return [
+            CourseResponse.model_validate(course).model_dump()
+            for course in courses
+        ]
 
 
 class CoursesApi(Resource):
-    def get(self) -> list[dict[str, t.Any]] | list:
+    def get(self) -> Response:
         """
-        This method returns all courses with their students
+        This method returns page of courses with their students
         ---
         tags:
           - Course
+        produces:
+          - application/json
+          - application/x-ndjson
         parameters:
           - name: with
             in: query
             type: str
+            description: comma separated relationships to include, e.g.
+              students
+          - name: filter
+            in: query
+            type: str
+            description: comma separated field:operator:value conditions,
+              e.g. student_count:lte:10,name:prefix:A
+          - name: sort
+            in: query
+            type: str
+            description: comma separated fields, - prefix for descending
+              order, e.g. -student_count,name
+          - name: limit
+            in: query
+            type: int
+            description: page size, default PAGE_SIZE_DEFAULT (100) and at
+              most PAGE_SIZE_MAX. Without it only the first page is returned,
+              not all courses
+          - name: after
+            in: query
+            type: str
         responses:
           200:
-            description: returns all courses or empty list
+            description: returns page of courses, X-Next-Cursor header
+              holds cursor of the next page. With Accept application/x-ndjson
+              all courses are streamed one per line. Identical requests
+              made at the same time share one query and serialized body
             examples: [
                     {
                     'id': 1,
@@ -47,18 +137,74 @@ class CoursesApi(Resource):
                     "description": "Principles of matter and energy.",
                     students: []
                 ]
+          422:
+            description: Invalid limit, after, with, filter or sort
+              parameter
         """
-        with_entity = request.args.get("with", None)
-        exclude = set() if with_entity == "students" else {"students"}
-        courses = get_all_courses()
-        return [
-            CourseResponse.model_validate(course).model_dump(exclude=exclude)
-            for course in courses
-        ]
+        try:
+            include = get_include(COURSE_RELATIONSHIPS)
+            page = get_page_args()
+            query = get_list_query(COURSE_LIST_FIELDS)
+        except ValueError as e:
+            return Response(f"{e}", 422)
+        if wants_ndjson():
+            exclude = COURSE_RELATIONSHIPS - include
+            return ndjson_response(
+                partial(stream_all_courses, include=include, query=query),
+                lambda course: CourseResponse.model_validate(
+                    course
+                ).model_dump(exclude=exclude),
+            )
+        load = partial(_load_courses, page, include, query)
+        # Unfiltered pages are the course catalog, only they are cached
+        if not (request.args.get("filter") or request.args.get("sort")):
+            load = partial(get_cached, request_key("courses"), load)
+        try:
+            cached = list_flights.run(request_key(request.path), load)
+        except ValueError as e:
+            return Response(f"{e}", 422)
+        return cached.response()
+
+
+def _load_courses(
+    page: PageArgs, include: set[str], query: ListQuery
+) -> CachedResponse:
+    rows = get_course_rows(page.limit + 1, page.after, include, query)
+    courses, headers = paginate(rows, page, query.cursor_key)
+    body = [course.as_dict(include) for course in courses]
+    # Not included students aren't loaded, they are None
+    tags = {tag("course", LIST_ID)}
+    for course in courses:
+        tags |= entity_tags(
+            "course",
+            course.id,
+            {"student": [student.id for student in course.students or ()]},
+        )
+    return CachedResponse(
+        json.dumps(body).encode(), frozenset(tags), headers=headers
+    )
+
+
+def _load_course(course_id: int) -> CachedResponse | None:
+    etag = get_course_etag(course_id)
+    if etag is None:
+        return None
+    course = get_course(course_id)
+    if not course:
+        return None
+    return CachedResponse(
+        CourseResponse.model_validate(course).model_dump_json().encode(),
+        entity_tags(
+            "course",
+            course.id,
+            {"student": [student.id for student in course.students]},
+        ),
+        etag,
+    )
 
 
 class CourseApi(Resource):
-    def get(self, course_id: int) -> Response | dict[str, t.Any]:
+    def get(self, course_id: int) -> Response:
         """
         This method return data about course by it id
         ---
@@ -68,9 +214,13 @@ class CourseApi(Resource):
           - name: course_id
             in: path
             type: int
+          - name: If-None-Match
+            in: header
+            type: string
         responses:
           200:
             description: return data about course in dict
+              with ETag header
             examples: {
                     "id": 4,
                     "name": "Chemistry",
@@ -83,13 +233,17 @@ class CourseApi(Resource):
                             }
                         ]
                     }
+          304:
+            description: Client has current version of course
           404:
             description: course with provided id don't exist
         """
-        course = get_course(course_id)
-        if not course:
+        cached = get_cached(
+            tag("course", course_id), partial(_load_course, course_id)
+        )
+        if cached is None:
             return Response(f"Course with id {course_id} don't exist", 404)
-        return CourseResponse.model_validate(course).model_dump()
+        return cached.response()
 
     def post(self) -> Response:
         """
@@ -133,33 +287,67 @@ class CourseApi(Resource):
           - name: course_id
             in: path
             type: int
+          - name: If-Match
+            in: header
+            type: string
           - name: action
             in: path
             type: str
         responses:
           200:
-            description: Course updated successfully
+            description: Course updated successfully,
+              if only scalar fields are sent they are updated with one
+              statement and course is returned without relationships
           404:
             description: Course don't exist
+          412:
+            description: Course was changed since If-Match ETag
           422:
             description: Not valid data for updating
         """
-        course = get_course(course_id)
-        if not course:
-            return Response(f"Course with id {course_id} doesn't exist", 404)
+        return write_if_unchanged(
+            partial(get_course_etag, course_id, lock=True),
+            partial(self._patch, course_id, action),
+        )
 
+    def _patch(
+        self, course_id: int, action: str | None = None
+    ) -> dict[str, t.Any] | Response:
         try:
-            request_data = CourseRequest(**request.get_json())
+            request_data = CourseRequest(
+                **(request.get_json(silent=True) or {})
+            )
         except ValidationError as exc:
             return Response(f"Not valid data, {exc}", status=422)
 
+        fields = request_data.model_dump(
+            exclude={"student_ids"}, exclude_none=True
+        )
+        if action is None and request_data.student_ids is None and fields:
+            row = update_course_fields(course_id, fields)
+            if not row:
+                return Response(
+                    f"Course with id {course_id} doesn't exist", 404
+                )
+            return CourseResponse.model_validate(row).model_dump(
+                exclude=COURSE_RELATIONSHIPS
+            )
+
+        # Students removed by one DELETE are read after it by the response
+        course = get_course(course_id, with_students=action != "remove")
+        if not course:
+            return Response(f"Course with id {course_id} doesn't exist", 404)
+
         try:
             updated_course = update_course(course, request_data, action)
         except ValueError as exc:
             return Response(f"Not correct data, {exc}", status=422)
+
         return CourseResponse.model_validate(updated_course).model_dump()
 
-    def put(self, course_id: int) -> dict[str, t.Any] | Response:
+    def put(
+        self, course_id: int
+    ) -> tuple[dict[str, t.Any], int, dict[str, str]] | Response:
         """
         This method update entire course in the database by course_id
         ---
@@ -169,17 +357,32 @@ class CourseApi(Resource):
           - name: course_id
             in: path
             type: int
+          - name: If-Match
+            in: header
+            type: string
           - name: action
             in: path
             type: str
         responses:
           200:
             description: Course updated successfully
+              with X-Rows-Touched header holding amount of changed
+              relationship rows
           404:
             description: Course don't exist
+          412:
+            description: Course was changed since If-Match ETag
           422:
             description: Not valid data for updating
         """
+        return write_if_unchanged(
+            partial(get_course_etag, course_id, lock=True),
+            partial(self._put, course_id),
+        )
+
+    def _put(
+        self, course_id: int
+    ) -> tuple[dict[str, t.Any], int, dict[str, str]] | Response:
         course = get_course(course_id)
         if not course:
             return Response(f"Course with id {course_id} doesn't exist", 404)
@@ -187,13 +390,17 @@ class CourseApi(Resource):
         try:
             request_data = CourseRequest(**request.get_json())
             request_data.check_not_none_field()
-            putted_course = put_course(course, request_data)
+            putted_course, rows_touched = put_course(course, request_data)
         except (ValidationError, ValueError) as exc:
             return Response(f"Not valid data, {exc}", status=422)
 
-        return CourseResponse.model_validate(putted_course).model_dump()
+        return (
+            CourseResponse.model_validate(putted_course).model_dump(),
+            200,
+            {ROWS_TOUCHED_HEADER: str(rows_touched)},
+        )
 
-    def delete(self, course_id: int):
+    def delete(self, course_id: int) -> Response:
         """
         This method remove course from database by course_id
         ---
@@ -209,9 +416,7 @@ class CourseApi(Resource):
           404:
             description: This course don't exist
         """
-        course = get_course(course_id)
-        if not course:
+        if not delete_course(course_id):
             return Response(f"course {course_id} don't exist", status=404)
 
-        delete_course(course)
         return Response(None, status=204)
@@ -0,0 +1,88 @@
+import typing as t
+from dataclasses import asdict
+
+from flask import Response
+from flask_restful import Resource
+from pydantic import ValidationError
+
+from app.api.university.api_models.enrollment import EnrollmentRequest
+from app.api.university.utils import TooManyItems, read_json_items
+from app.crud.university.enrollment import (
+    delete_enrollments,
+    post_enrollments,
+)
+
+
+def _read_pairs() -> list[tuple[int, int]]:
+    """This function reads (student_id, course_id) pairs from request body,
+    ValueError raised if body is malformed"""
+    items = read_json_items()
+    pairs = []
+    for item in items:
+        try:
+            enrollment = EnrollmentRequest.model_validate(item)
+        except ValidationError as exc:
+            raise ValueError(f"{exc}")
+        pairs.append((enrollment.student_id, enrollment.course_id))
+    return pairs
+
+
+class EnrollmentsApi(Resource):
+    def post(self) -> dict[str, t.Any] | Response:
+        """
+        This method enrolls students to courses by student and course ids
+        ---
+        tags:
+          - Enrollment
+        parameters:
+          - name: enrollments
+            in: body
+            type: array
+            description: list of {"student_id", "course_id"} pairs
+        responses:
+          200:
+            description: Amounts of inserted, already existing and invalid
+              (not existing student or course) pairs
+            examples: {"inserted": 2, "duplicate": 1, "invalid": 0}
+          413:
+            description: More pairs than BULK_MAX_ITEMS
+          422:
+            description: Invalid types in requests
+        """
+        try:
+            pairs = _read_pairs()
+        except TooManyItems as exc:
+            return Response(f"Too many pairs, {exc}", status=413)
+        except ValueError as exc:
+            return Response(f"Not valid data, {exc}", status=422)
+
+        return asdict(post_enrollments(pairs))
+
+    def delete(self) -> dict[str, t.Any] | Response:
+        """
+        This method removes students from courses by student and course ids
+        ---
+        tags:
+          - Enrollment
+        parameters:
+          - name: enrollments
+            in: body
+            type: array
+            description: list of {"student_id", "course_id"} pairs
+        responses:
+          200:
+            description: Amounts of deleted and not enrolled pairs
+            examples: {"deleted": 2, "missing": 0}
+          413:
+            description: More pairs than BULK_MAX_ITEMS
+          422:
+            description: Invalid types in requests
+        """
+        try:
+            pairs = _read_pairs()
+        except TooManyItems as exc:
+            return Response(f"Too many pairs, {exc}", status=413)
+        except ValueError as exc:
+            return Response(f"Not valid data, {exc}", status=422)
+
+        return asdict(delete_enrollments(pairs))
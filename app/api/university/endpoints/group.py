@@ -1,19 +1,47 @@
+import json
 import typing as t
+from functools import partial
 
 from flask import Response, request
 from flask_restful import Resource
 from pydantic import ValidationError
 
 from app.api.university.api_models.group import GroupRequest, GroupResponse
+from app.api.university.cache import (
+    CachedResponse,
+    entity_tags,
+    get_cached,
+    request_key,
+)
+from app.api.university.single_flight import list_flights
+from app.api.university.utils import (
+    ROWS_TOUCHED_HEADER,
+    PageArgs,
+    get_include,
+    get_list_query,
+    get_page_args,
+    ndjson_response,
+    paginate,
+    wants_ndjson,
+    write_if_unchanged,
+)
 from app.crud.university.group import (
+    GROUP_LIST_FIELDS,
     delete_group,
-    get_all_groups,
     get_group,
+    get_group_etag,
+    get_group_rows,
     less_or_equal_students_in_group,
     post_group,
     put_group,
+    stream_all_groups,
     update_group,
+    update_group_fields,
 )
+from app.crud.university.list_query import ListQuery
+from app.db.invalidation import tag
+
+GROUP_RELATIONSHIPS = {"students"}
 
 
 class GroupStudentAmountApi(Resource):
@@ -59,31 +87,105 @@ class GroupStudentAmountApi(Resource):
 
 
 class GroupsApi(Resource):
-    def get(self) -> list[dict[str, t.Any]] | list:
+    def get(self) -> Response:
         """
-        This method returns all groups with their students
+        This method returns page of groups with their students
         ---
         tags:
           - Group
+        produces:
+          - application/json
+          - application/x-ndjson
         parameters:
           - name: with
             in: query
             type: str
+            description: comma separated relationships to include, e.g.
+              students
+          - name: filter
+            in: query
+            type: str
+            description: comma separated field:operator:value conditions,
+              e.g. student_count:lte:10,name:prefix:A
+          - name: sort
+            in: query
+            type: str
+            description: comma separated fields, - prefix for descending
+              order, e.g. -student_count,name
+          - name: limit
+            in: query
+            type: int
+            description: page size, default PAGE_SIZE_DEFAULT (100) and at
+              most PAGE_SIZE_MAX. Without it only the first page is returned,
+              not all groups
+          - name: after
+            in: query
+            type: str
         responses:
           200:
-            description: returns all groups or empty list if entity don't exist
+            description: returns page of groups, X-Next-Cursor header
+              holds cursor of the next page. With Accept application/x-ndjson
+              all groups are streamed one per line. Identical requests
+              made at the same time share one query and serialized body
+          422:
+            description: Invalid limit, after, with, filter or sort
+              parameter
         """
-        with_entity = request.args.get("with", None)
-        exclude = set() if with_entity == "students" else {"students"}
-        groups = get_all_groups()
-        return [
-            GroupResponse.model_validate(group).model_dump(exclude=exclude)
-            for group in groups
-        ]
+        try:
+            include = get_include(GROUP_RELATIONSHIPS)
+            page = get_page_args()
+            query = get_list_query(GROUP_LIST_FIELDS)
+        except ValueError as e:
+            return Response(f"{e}", 422)
+        exclude = GROUP_RELATIONSHIPS - include
+        if wants_ndjson():
+            return ndjson_response(
+                partial(stream_all_groups, include=include, query=query),
+                lambda group: GroupResponse.model_validate(group).model_dump(
+                    exclude=exclude
+                ),
+            )
+        try:
+            cached = list_flights.run(
+                request_key(request.path),
+                partial(_load_groups, page, include, query),
+            )
+        except ValueError as e:
+            return Response(f"{e}", 422)
+        return cached.response()
+
+
+def _load_groups(
+    page: PageArgs, include: set[str], query: ListQuery
+) -> CachedResponse:
+    rows = get_group_rows(page.limit + 1, page.after, include, query)
+    groups, headers = paginate(rows, page, query.cursor_key)
+    body = [group.as_dict(include) for group in groups]
+    return CachedResponse(
+        json.dumps(body).encode(), frozenset(), headers=headers
+    )
+
+
+def _load_group(group_id: int) -> CachedResponse | None:
+    etag = get_group_etag(group_id)
+    if etag is None:
+        return None
+    group = get_group(group_id)
+    if not group:
+        return None
+    return CachedResponse(
+        GroupResponse.model_validate(group).model_dump_json().encode(),
+        entity_tags(
+            "group",
+            group.id,
+            {"student": [student.id for student in group.students]},
+        ),
+        etag,
+    )
 
 
 class GroupApi(Resource):
-    def get(self, group_id: int) -> Response | dict[str, t.Any]:
+    def get(self, group_id: int) -> Response:
         """
         This method return data about group by it id
         ---
@@ -93,9 +195,13 @@ class GroupApi(Resource):
           - name: group_id
             in: path
             type: int
+          - name: If-None-Match
+            in: header
+            type: string
         responses:
           200:
             description: return data about group in dict
+              with ETag header
             examples: {
                     "id": 1,
                     "name": "FI-63",
@@ -107,13 +213,17 @@ class GroupApi(Resource):
                             }
                         ]
                     }
+          304:
+            description: Client has current version of group
           404:
             description: Group with provided id don't exist
         """
-        group = get_group(group_id)
-        if not group:
+        cached = get_cached(
+            tag("group", group_id), partial(_load_group, group_id)
+        )
+        if cached is None:
             return Response(f"Student with id {group_id} don't exist", 404)
-        return GroupResponse.model_validate(group).model_dump()
+        return cached.response()
 
     def post(self) -> Response:
         """
@@ -153,30 +263,65 @@ class GroupApi(Resource):
           - name: group_id
             in: path
             type: int
+          - name: If-Match
+            in: header
+            type: string
           - name: action
             in: path
             type: str
         responses:
           200:
-            description: Group updated successfully
+            description: Group updated successfully,
+              if only scalar fields are sent they are updated with one
+              statement and group is returned without relationships
           404:
             description: Group don't exist
+          412:
+            description: Group was changed since If-Match ETag
           422:
             description: Not valid data for updating
         """
-        group = get_group(group_id)
+        return write_if_unchanged(
+            partial(get_group_etag, group_id, lock=True),
+            partial(self._patch, group_id, action),
+        )
+
+    def _patch(
+        self, group_id: int, action: str | None = None
+    ) -> dict[str, t.Any] | Response:
+        try:
+            request_data = GroupRequest(
+                **(request.get_json(silent=True) or {})
+            )
+        except ValidationError as exc:
+            return Response(f"Not valid data, {exc}", status=422)
+
+        fields = request_data.model_dump(
+            exclude={"student_ids"}, exclude_none=True
+        )
+        if action is None and request_data.student_ids is None and fields:
+            row = update_group_fields(group_id, fields)
+            if not row:
+                return Response(f"Group with id {group_id} doesn't exist", 404)
+            return GroupResponse.model_validate(row).model_dump(
+                exclude=GROUP_RELATIONSHIPS
+            )
+
+        # Students removed by one UPDATE are read after it by the response
+        group = get_group(group_id, with_students=action != "remove")
         if not group:
             return Response(f"Group with id {group_id} doesn't exist", 404)
 
         try:
-            request_data = GroupRequest(**request.get_json())
             updated_group = update_group(group, request_data, action)
         except ValueError as exc:
-            return Response(f"Not valid data, {exc}", status=422)
+            return Response(f"Not correct data, {exc}", status=422)
 
         return GroupResponse.model_validate(updated_group).model_dump()
 
-    def put(self, group_id: int) -> dict[str, t.Any] | Response:
+    def put(
+        self, group_id: int
+    ) -> tuple[dict[str, t.Any], int, dict[str, str]] | Response:
         """
         This method update group in the database by group_id
         ---
@@ -186,14 +331,29 @@ class GroupApi(Resource):
           - name: group_id
             in: path
             type: int
+          - name: If-Match
+            in: header
+            type: string
         responses:
           200:
             description: Group updated successfully
+              with X-Rows-Touched header holding amount of changed
+              relationship rows
           404:
             description: Group don't exist
+          412:
+            description: Group was changed since If-Match ETag
           422:
             description: Not valid data for updating
         """
+        return write_if_unchanged(
+            partial(get_group_etag, group_id, lock=True),
+            partial(self._put, group_id),
+        )
+
+    def _put(
+        self, group_id: int
+    ) -> tuple[dict[str, t.Any], int, dict[str, str]] | Response:
         group = get_group(group_id)
         if not group:
             return Response(f"Group with id {group_id} doesn't exist", 404)
@@ -201,11 +361,15 @@ class GroupApi(Resource):
         try:
             request_data = GroupRequest(**request.get_json())
             request_data.check_not_none_field()
-            putted_group = put_group(group, request_data)
+            putted_group, rows_touched = put_group(group, request_data)
         except (ValidationError, ValueError) as exc:
             return Response(f"Not valid data, {exc}", status=422)
 
-        return GroupResponse.model_validate(putted_group).model_dump()
+        return (
+            GroupResponse.model_validate(putted_group).model_dump(),
+            200,
+            {ROWS_TOUCHED_HEADER: str(rows_touched)},
+        )
 
     def delete(self, group_id: int) -> Response:
         """
@@ -223,9 +387,7 @@ class GroupApi(Resource):
           404:
             description: This group don't exist
         """
-        group = get_group(group_id)
-        if not group:
+        if not delete_group(group_id):
             return Response(f"Group {group_id} don't exist", status=404)
 
-        delete_group(group)
         return Response(None, status=204)
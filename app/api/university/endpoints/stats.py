@@ -0,0 +1,91 @@
+import typing as t
+
+from flask import Response
+from flask_restful import Resource
+
+from app.api.university.api_models.stats import (
+    CourseStatsResponse,
+    GroupStatsResponse,
+)
+from app.crud.university.stats import (
+    get_course_stats,
+    get_group_size_distribution,
+    get_group_stats,
+    get_student_stats,
+)
+
+
+class CourseStatsApi(Resource):
+    def get(self) -> dict[str, t.Any] | Response:
+        """
+        This method returns enrollment statistics of courses, they are read
+        from materialized views refreshed by python -m app.cli
+        --refresh-stats
+        ---
+        tags:
+          - Stats
+        responses:
+          200:
+            description: returns enrollment statistics
+            examples: {
+                "refreshed_at": "2024-01-01T03:00:00+00:00",
+                "students": 200,
+                "enrollments": 410,
+                "students_without_courses": 12,
+                "average_courses_per_student": 2.05,
+                "courses": [
+                    {"id": 5, "name": "Mathematics", "students": 64}
+                ]
+              }
+          503:
+            description: Statistics views weren't populated
+        """
+        totals = get_student_stats()
+        if totals is None:
+            return Response("Statistics aren't available", 503)
+        return CourseStatsResponse.model_validate(
+            {**totals._mapping, "courses": get_course_stats()}
+        ).model_dump(mode="json")
+
+
+class GroupStatsApi(Resource):
+    def get(self) -> dict[str, t.Any] | Response:
+        """
+        This method returns statistics of group sizes, they are read from
+        materialized views refreshed by python -m app.cli --refresh-stats
+        ---
+        tags:
+          - Stats
+        responses:
+          200:
+            description: returns group statistics
+            examples: {
+                "refreshed_at": "2024-01-01T03:00:00+00:00",
+                "students": 200,
+                "unassigned_students": 17,
+                "average_group_size": 18.3,
+                "group_size_distribution": [
+                    {"size": 0, "groups": 1},
+                    {"size": 18, "groups": 3}
+                ],
+                "groups": [{"id": 3, "name": "OC-60", "students": 25}]
+              }
+          503:
+            description: Statistics views weren't populated
+        """
+        totals = get_student_stats()
+        if totals is None:
+            return Response("Statistics aren't available", 503)
+        distribution = get_group_size_distribution()
+        groups = sum(bucket.groups for bucket in distribution)
+        assigned = sum(bucket.size * bucket.groups for bucket in distribution)
+        return GroupStatsResponse.model_validate(
+            {
+                "refreshed_at": totals.refreshed_at,
+                "students": totals.students,
+                "unassigned_students": totals.unassigned_students,
+                "average_group_size": assigned / groups if groups else 0,
+                "group_size_distribution": distribution,
+                "groups": get_group_stats(),
+            }
+        ).model_dump(mode="json")
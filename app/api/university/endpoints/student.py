@@ -1,37 +1,96 @@
 import typing as t
+from functools import partial
 
 from flask import Response, request
 from flask_restful import Resource
 from pydantic import ValidationError
 
+from app.api.university.api_models.base import BaseStudent
 from app.api.university.api_models.student import (
     StudentRequest,
     StudentResponse,
 )
+from app.api.university.cache import (
+    CachedResponse,
+    entity_tags,
+    get_cached,
+)
+from app.api.university.utils import (
+    ROWS_TOUCHED_HEADER,
+    TooManyItems,
+    get_flag,
+    get_include,
+    get_list_query,
+    get_limit,
+    get_page_args,
+    ndjson_response,
+    paginate,
+    read_json_items,
+    wants_ndjson,
+    write_if_unchanged,
+)
 from app.crud.university.student import (
+    STUDENT_LIST_FIELDS,
     delete_student,
-    get_all_students,
     get_student,
+    get_student_etag,
+    get_student_rows,
     post_student,
+    post_students_bulk,
     put_student,
+    search_students,
+    stream_all_students,
     update_student,
+    update_student_fields,
 )
+from app.configs import SEARCH_LIMIT_DEFAULT
+from app.db.invalidation import tag
+
+STUDENT_RELATIONSHIPS = {"group", "courses"}
 
 
 class StudentsApi(Resource):
-    def get(self) -> list[dict[str, t.Any]] | Response:
+    def get(
+        self,
+    ) -> tuple[list[dict[str, t.Any]], int, dict[str, str]] | Response:
         """
-        This method returns all students with their courses and groups
+        This method returns page of students with their courses and groups
         ---
         tags:
           - Student
+        produces:
+          - application/json
+          - application/x-ndjson
         parameters:
           - name: with
             in: query
             type: str
+            description: comma separated relationships to include, e.g.
+              group,courses
+          - name: filter
+            in: query
+            type: str
+            description: comma separated field:operator:value conditions,
+              e.g. group_id:eq:3,last_name:prefix:Sm
+          - name: sort
+            in: query
+            type: str
+            description: comma separated fields, - prefix for descending
+              order, e.g. -last_name,id
+          - name: limit
+            in: query
+            type: int
+            description: page size, default PAGE_SIZE_DEFAULT (100) and at
+              most PAGE_SIZE_MAX. Without it only the first page is returned,
+              not all students
+          - name: after
+            in: query
+            type: str
         responses:
           200:
-            description: returns all students or empty list
+            description: returns page of students, X-Next-Cursor header
+              holds cursor of the next page. With Accept application/x-ndjson
+              all students are streamed one per line
             examples: [
                 {
                   'id': 2,
@@ -50,18 +109,101 @@ class StudentsApi(Resource):
                     ]
                 },
             ]
+          422:
+            description: Invalid limit, after, with, filter or sort
+              parameter
+        """
+        try:
+            include = get_include(STUDENT_RELATIONSHIPS)
+            page = get_page_args()
+            query = get_list_query(STUDENT_LIST_FIELDS)
+        except ValueError as e:
+            return Response(f"{e}", 422)
+        exclude = STUDENT_RELATIONSHIPS - include
+        if wants_ndjson():
+            return ndjson_response(
+                partial(stream_all_students, include=include, query=query),
+                lambda student: StudentResponse.model_validate(
+                    student
+                ).model_dump(exclude=exclude),
+            )
+        try:
+            rows = get_student_rows(page.limit + 1, page.after, include, query)
+        except ValueError as e:
+            return Response(f"{e}", 422)
+        students, headers = paginate(rows, page, query.cursor_key)
+        return (
+            [student.as_dict(include) for student in students],
+            200,
+            headers,
+        )
+
+
+class StudentsSearchApi(Resource):
+    def get(self) -> list[dict[str, t.Any]] | Response:
+        """
+        This method returns students which name is similar to query, most
+        similar first, misspelled and partial names are matched too
+        ---
+        tags:
+          - Student
+        parameters:
+          - name: q
+            in: query
+            type: str
+            required: true
+          - name: limit
+            in: query
+            type: int
+        responses:
+          200:
+            description: returns list of found students
+            examples: [
+                {
+                  'id': 2,
+                  'first_name': 'Jacob',
+                  'last_name': 'Martin'
+                },
+            ]
+          422:
+            description: Empty q or invalid limit parameter
         """
-        with_entity = request.args.get("with", None)
-        exclude = set() if with_entity == "courses" else {"courses"}
-        students = get_all_students()
+        query = request.args.get("q", "").strip()
+        if not query:
+            return Response("q parameter is required", 422)
+        try:
+            limit = get_limit(SEARCH_LIMIT_DEFAULT)
+        except ValueError as e:
+            return Response(f"{e}", 422)
         return [
-            StudentResponse.model_validate(student).model_dump(exclude=exclude)
-            for student in students
+            BaseStudent.model_validate(student).model_dump()
+            for student in search_students(query, limit)
         ]
 
 
+def _load_student(student_id: int) -> CachedResponse | None:
+    etag = get_student_etag(student_id)
+    if etag is None:
+        return None
+    student = get_student(student_id)
+    if not student:
+        return None
+    return CachedResponse(
+        StudentResponse.model_validate(student).model_dump_json().encode(),
+        entity_tags(
+            "student",
+            student.id,
+            {
+                "group": [student.group.id] if student.group else [],
+                "course": [course.id for course in student.courses],
+            },
+        ),
+        etag,
+    )
+
+
 class StudentApi(Resource):
-    def get(self, student_id: int) -> dict[str, t.Any] | Response:
+    def get(self, student_id: int) -> Response:
         """
         This method return data about student by it id
         ---
@@ -71,9 +213,13 @@ class StudentApi(Resource):
           - name: student_id
             in: path
             type: int
+          - name: If-None-Match
+            in: header
+            type: string
         responses:
           200:
             description: return data about student in dict
+              with ETag header
             examples: {
                     "id": 51,
                     "first_name": "Rachel",
@@ -90,13 +236,17 @@ class StudentApi(Resource):
                         }
                         ]
                     }
+          304:
+            description: Client has current version of student
           404:
             description: Student with provided id don't exist
         """
-        student = get_student(student_id)
-        if not student:
+        cached = get_cached(
+            tag("student", student_id), partial(_load_student, student_id)
+        )
+        if cached is None:
             return Response(f"Student with id {student_id} don't exist", 404)
-        return StudentResponse.model_validate(student).model_dump()
+        return cached.response()
 
     def post(self) -> dict[str, t.Any] | Response:
         """
@@ -141,26 +291,61 @@ class StudentApi(Resource):
           - name: student_id
             in: path
             type: int
+          - name: If-Match
+            in: header
+            type: string
           - name: action
             in: path
             type: str
         responses:
           200:
-            description: Student updated successfully
+            description: Student updated successfully,
+              if only scalar fields are sent they are updated with one
+              statement and student is returned without relationships
           404:
             description: Student don't exist
+          412:
+            description: Student was changed since If-Match ETag
           422:
             description: Not valid data for updating
         """
-        student = get_student(student_id)
-        if not student:
-            return Response(f"Student with id {student_id} doesn't exist", 404)
+        return write_if_unchanged(
+            partial(get_student_etag, student_id, lock=True),
+            partial(self._patch, student_id, action),
+        )
 
+    def _patch(
+        self, student_id: int, action: str | None = None
+    ) -> dict[str, t.Any] | Response:
         try:
-            request_data = StudentRequest(**request.get_json())
+            request_data = StudentRequest(
+                **(request.get_json(silent=True) or {})
+            )
         except ValidationError as exc:
             return Response(f"Not valid data, {exc}", status=422)
 
+        fields = request_data.model_dump(
+            exclude={"group_id", "course_ids"}, exclude_none=True
+        )
+        if (
+            action is None
+            and request_data.group_id is None
+            and request_data.course_ids is None
+            and fields
+        ):
+            row = update_student_fields(student_id, fields)
+            if not row:
+                return Response(
+                    f"Student with id {student_id} doesn't exist", 404
+                )
+            return StudentResponse.model_validate(row).model_dump(
+                exclude=STUDENT_RELATIONSHIPS
+            )
+
+        student = get_student(student_id)
+        if not student:
+            return Response(f"Student with id {student_id} doesn't exist", 404)
+
         try:
             updated_student = update_student(student, request_data, action)
         except ValueError as exc:
@@ -168,7 +353,9 @@ class StudentApi(Resource):
 
         return StudentResponse.model_validate(updated_student).model_dump()
 
-    def put(self, student_id: int) -> dict[str, t.Any] | Response:
+    def put(
+        self, student_id: int
+    ) -> tuple[dict[str, t.Any], int, dict[str, str]] | Response:
         """
         This method update student in the database by student_id
         ---
@@ -178,14 +365,29 @@ class StudentApi(Resource):
           - name: student_id
             in: path
             type: int
+          - name: If-Match
+            in: header
+            type: string
         responses:
           200:
             description: Student updated successfully
+              with X-Rows-Touched header holding amount of changed
+              relationship rows
           404:
             description: Student don't exist
+          412:
+            description: Student was changed since If-Match ETag
           422:
             description: Not valid data for updating
         """
+        return write_if_unchanged(
+            partial(get_student_etag, student_id, lock=True),
+            partial(self._put, student_id),
+        )
+
+    def _put(
+        self, student_id: int
+    ) -> tuple[dict[str, t.Any], int, dict[str, str]] | Response:
         student = get_student(student_id)
         if not student:
             return Response(f"Student with id {student_id} doesn't exist", 404)
@@ -193,11 +395,15 @@ class StudentApi(Resource):
         try:
             request_data = StudentRequest(**request.get_json())
             request_data.check_not_none_field()
-            putted_student = put_student(student, request_data)
+            putted_student, rows_touched = put_student(student, request_data)
         except (ValidationError, ValueError) as exc:
             return Response(f"Not valid data, {exc}", status=422)
 
-        return StudentResponse.model_validate(putted_student).model_dump()
+        return (
+            StudentResponse.model_validate(putted_student).model_dump(),
+            200,
+            {ROWS_TOUCHED_HEADER: str(rows_touched)},
+        )
 
     def delete(self, student_id: int) -> Response:
         """
@@ -215,9 +421,80 @@ class StudentApi(Resource):
           404:
             description: Student don't exist
         """
-        student = get_student(student_id)
-        if not student:
+        if not delete_student(student_id):
             return Response(f"Student {student_id} don't exist", status=404)
 
-        delete_student(student)
         return Response(None, status=204)
+
+
+class StudentsBulkApi(Resource):
+    def post(self) -> tuple[dict[str, t.Any], int] | Response:
+        """
+        This method adds many students at once, body is JSON array or
+        newline delimited JSON of students
+        ---
+        tags:
+          - Student
+        consumes:
+          - application/json
+          - application/x-ndjson
+        parameters:
+          - name: students
+            in: body
+            type: array
+          - name: atomic
+            in: query
+            type: bool
+            description: add nothing if any student is invalid
+        responses:
+          201:
+            description: All students added
+            examples: {
+                "created": [{"index": 0, "id": 215}],
+                "errors": []
+              }
+          207:
+            description: Part of students added, errors hold the rest
+          413:
+            description: More students than BULK_MAX_ITEMS, nothing added
+          422:
+            description: No students added
+        """
+        atomic = get_flag("atomic")
+        try:
+            items = read_json_items()
+        except TooManyItems as exc:
+            return Response(f"Too many students, {exc}", status=413)
+        except ValueError as exc:
+            return Response(f"Not valid data, {exc}", status=422)
+
+        students_data, errors = {}, {}
+        for index, item in enumerate(items):
+            try:
+                students_data[index] = StudentRequest.model_validate(item)
+            except ValidationError as exc:
+                errors[index] = f"Not valid data, {exc}"
+
+        if atomic and errors:
+            created = {}
+        else:
+            result = post_students_bulk(students_data, atomic)
+            created = result.created
+            errors.update(result.errors)
+
+        if not errors:
+            status = 201
+        elif created:
+            status = 207
+        else:
+            status = 422
+        return {
+            "created": [
+                {"index": index, "id": student_id}
+                for index, student_id in created.items()
+            ],
+            "errors": [
+                {"index": index, "error": error}
+                for index, error in sorted(errors.items())
+            ],
+        }, status
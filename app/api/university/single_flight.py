@@ -0,0 +1,81 @@
+import threading
+import typing as t
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from sqlalchemy import Engine
+
+from app.db.invalidation import add_invalidation_listener
+from app.db.session import s
+
+T = t.TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    flights: int = 0
+    folded: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return {"flights": self.flights, "folded": self.folded}
+
+
+class SingleFlight:
+    """Coalescer of identical concurrent reads. The first caller of a key
+    loads the value and callers arriving while it is in flight wait for the
+    same result instead of loading it again. Flights are shared by request
+    threads of the worker"""
+
+    def __init__(self) -> None:
+        self._flights: dict[tuple[t.Any, ...], Future[t.Any]] = {}
+        self._lock = threading.Lock()
+        # Reads started before a change aren't joined after it
+        self._generation = 0
+        self.stats = SingleFlightStats()
+
+    def forget(self, tags: set[str]) -> None:
+        """This method is invalidation listener, callers arriving after a
+        change start new flights. Flights already running finish for their
+        callers"""
+        with self._lock:
+            self._generation += 1
+
+    def run(self, key: str, load: t.Callable[[], T]) -> T:
+        """This method returns result of load shared by concurrent callers
+        of key, exception of load is raised to all of them. Requests
+        reading different databases aren't folded"""
+        db_url = t.cast(Engine, s.user_db.get_bind()).url
+        with self._lock:
+            flight_key = (self._generation, str(db_url), key)
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[flight_key] = Future()
+        if not leader:
+            self.stats.increment("folded")
+            return t.cast(T, flight.result())
+
+        self.stats.increment("flights")
+        try:
+            result = load()
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[flight_key]
+
+
+list_flights = SingleFlight()
+add_invalidation_listener(list_flights.forget)
@@ -0,0 +1,204 @@
+import base64
+import binascii
+import json
+import typing as t
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from flask import Response, request
+from sqlalchemy.orm import Session
+from werkzeug.http import quote_etag
+
+from app.configs import (
+    BULK_MAX_ITEMS,
+    PAGE_SIZE_DEFAULT,
+    PAGE_SIZE_MAX,
+    STREAM_CHUNK_SIZE,
+)
+from app.crud.university.list_query import (
+    ListField,
+    ListQuery,
+    parse_list_query,
+)
+from app.crud.university.utils import PreconditionFailed, write_if_match
+from app.db.session import get_request_db_url, stream_session
+
+ETAG_HEADER = "ETag"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+ROWS_TOUCHED_HEADER = "X-Rows-Touched"
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+M = t.TypeVar("M")
+T = t.TypeVar("T")
+
+
+class TooManyItems(Exception):
+    """Raised when request body holds more items than BULK_MAX_ITEMS"""
+
+
+@dataclass(frozen=True)
+class PageArgs:
+    limit: int
+    after: list[t.Any] | None = None
+
+
+def encode_cursor(key: list[t.Any]) -> str:
+    """This function packs sort key of the last returned row to opaque
+    token"""
+    payload = json.dumps({"after": key}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[t.Any]:
+    """This function unpacks token made by encode_cursor, tokens holding only
+    id are accepted too. ValueError raised if token is malformed"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after = json.loads(payload)["after"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor {cursor}")
+    if isinstance(after, int):
+        after = [after]
+    if not isinstance(after, list) or not all(
+        isinstance(value, (int, str)) for value in after
+    ):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return after
+
+
+def read_json_items() -> list[t.Any]:
+    """This function reads request body which is JSON array or newline
+    delimited JSON, ValueError raised if body is malformed and TooManyItems
+    if it holds more than BULK_MAX_ITEMS items"""
+    items: list[t.Any] = []
+    if request.mimetype == NDJSON_MIMETYPE:
+        for line in request.stream:
+            if not line.strip():
+                continue
+            if len(items) == BULK_MAX_ITEMS:
+                raise TooManyItems(f"Body holds more than {BULK_MAX_ITEMS}")
+            items.append(json.loads(line))
+        return items
+    body = request.get_json(silent=True)
+    if not isinstance(body, list):
+        raise ValueError("Request body must be JSON array")
+    if len(body) > BULK_MAX_ITEMS:
+        raise TooManyItems(f"Body holds more than {BULK_MAX_ITEMS}")
+    return body
+
+
+def get_flag(name: str) -> bool:
+    """This function reads boolean query parameter"""
+    return request.args.get(name, "").lower() in ("1", "true", "yes")
+
+
+def get_include(relationships: t.Collection[str]) -> set[str]:
+    """This function reads comma separated list of relationships from with
+    query parameter, ValueError raised if entity has no such relationship"""
+    include = {
+        name.strip()
+        for name in request.args.get("with", "").split(",")
+        if name.strip()
+    }
+    unknown = include - set(relationships)
+    if unknown:
+        raise ValueError(f"Unknown with value {', '.join(sorted(unknown))}")
+    return include
+
+
+def get_list_query(fields: t.Mapping[str, ListField]) -> ListQuery:
+    """This function compiles filter and sort query parameters, ValueError
+    raised if they use not allowed fields or operators"""
+    return parse_list_query(
+        fields, request.args.get("filter", ""), request.args.get("sort", "")
+    )
+
+
+def get_limit(default: int = PAGE_SIZE_DEFAULT) -> int:
+    """This function reads limit query parameter capped by PAGE_SIZE_MAX,
+    ValueError raised if it isn't a positive integer"""
+    raw_limit = request.args.get("limit", str(default))
+    if not raw_limit.isdigit() or int(raw_limit) < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(int(raw_limit), PAGE_SIZE_MAX)
+
+
+def get_page_args() -> PageArgs:
+    """This function reads limit and after query parameters, ValueError
+    raised if parameters are invalid"""
+    after = request.args.get("after")
+    return PageArgs(
+        limit=get_limit(), after=decode_cursor(after) if after else None
+    )
+
+
+def paginate(
+    rows: t.Sequence[M],
+    page: PageArgs,
+    get_key: t.Callable[[M], list[t.Any]],
+) -> tuple[t.Sequence[M], dict[str, str]]:
+    """This function cuts rows fetched with limit + 1 to the page and returns
+    headers with next cursor if there are more rows"""
+    if len(rows) <= page.limit:
+        return rows, {}
+
+    rows = rows[: page.limit]
+    cursor = encode_cursor(get_key(rows[-1]))
+    query = urlencode({**request.args.to_dict(), "after": cursor})
+    return rows, {
+        NEXT_CURSOR_HEADER: cursor,
+        "Link": f'<{request.base_url}?{query}>; rel="next"',
+    }
+
+
+def wants_ndjson() -> bool:
+    """This function checks if client prefers newline delimited JSON"""
+    best = request.accept_mimetypes.best_match(
+        ["application/json", NDJSON_MIMETYPE]
+    )
+    return best == NDJSON_MIMETYPE
+
+
+def ndjson_response(
+    stream: t.Callable[[Session, int], t.Iterator[M]],
+    serialize: t.Callable[[M], dict[str, t.Any]],
+) -> Response:
+    """This function returns response which writes rows one JSON per line
+    while they are read from database, so whole table is never held in
+    memory"""
+    db_url = get_request_db_url()
+
+    def generate() -> t.Iterator[str]:
+        with stream_session(db_url) as session:
+            for row in stream(session, STREAM_CHUNK_SIZE):
+                yield json.dumps(serialize(row)) + "\n"
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    """This function returns headers carrying strong etag of response"""
+    return {ETAG_HEADER: quote_etag(etag)}
+
+
+def not_modified(etag: str) -> Response | None:
+    """This function returns 304 response if client already has
+    representation with etag in If-None-Match header, None otherwise"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return Response(status=304, headers=etag_headers(etag))
+
+
+def write_if_unchanged(
+    get_etag: t.Callable[[], str | None], write: t.Callable[[], T]
+) -> T | Response:
+    """This function runs write checking If-Match header first, 412 response
+    returned if entity was changed since client read it. Without header or
+    with * write runs unconditionally"""
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return write()
+    try:
+        return write_if_match(get_etag, if_match.as_set(), write)
+    except PreconditionFailed as exc:
+        return Response(f"Entity was changed, {exc}", 412)
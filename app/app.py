@@ -1,8 +1,10 @@
 import atexit
+import json
+import logging
 import typing as t
 
 from flasgger import Swagger
-from flask import Flask
+from flask import Flask, Response, request
 from flask_restful import Api
 
 from app.configs import (
@@ -10,15 +12,24 @@ from app.configs import (
     APP_DEBUG,
     APP_HOST,
     APP_PORT,
+    REPLICA_STICKINESS,
+    REPLICA_URLS,
 )
 from app.db.session import (
     close_dbs,
     pop_session,
+    query_stats,
     set_session,
+    start_query_stats,
 )
 from app.init_routers import init_api_routers
 from app.logger import logger_config
 
+log = logging.getLogger(__name__)
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+PRIMARY_COOKIE = "db_primary"
+
 
 def create_app() -> Flask:
     logger_config()
@@ -27,11 +38,51 @@ def create_app() -> Flask:
     api = Api(app, prefix=API_PREFIX)
     Swagger(app)
 
-    app.before_request(set_session)
+    @app.before_request
+    def open_session() -> None:
+        read_only = (
+            request.method in READ_ONLY_METHODS
+            and PRIMARY_COOKIE not in request.cookies
+        )
+        set_session(read_only)
+        start_query_stats()
+
+    @app.after_request
+    def stick_to_primary(response: Response) -> Response:
+        """After write client reads from primary for REPLICA_STICKINESS
+        seconds, so it sees its own writes despite replication lag"""
+        if (
+            REPLICA_URLS
+            and REPLICA_STICKINESS
+            and request.method not in READ_ONLY_METHODS
+        ):
+            response.set_cookie(
+                PRIMARY_COOKIE, "1", max_age=REPLICA_STICKINESS, httponly=True
+            )
+        return response
+
+    @app.after_request
+    def add_server_timing(response: Response) -> Response:
+        stats = query_stats.get()
+        if stats is not None:
+            response.headers.add("Server-Timing", stats.server_timing())
+        return response
 
     @app.teardown_request
     def handle_session(args: t.Any) -> t.Any:
         pop_session()
+        stats = query_stats.get()
+        if stats is not None:
+            log.info(
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.path,
+                        "endpoint": request.endpoint,
+                        **stats.as_dict(),
+                    }
+                )
+            )
         return args
 
     init_api_routers(api)
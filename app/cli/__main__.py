@@ -1,19 +1,23 @@
 import click
+from sqlalchemy import create_engine
 
 from app.configs import (
     BASE_URL,
     DB_NAME,
     POSTGRESS_DB,
+    SLOW_QUERY_LOG_FILE,
 )
+from app.crud.university.stats import refresh_stats
+from app.db.index_usage import find_seq_scan_tables, find_unused_indexes
 from app.db.load_db.data_generation import load_db
 from app.db.session import (
     close_dbs,
     pop_session,
     set_session,
 )
+from app.db.slow_query import summarize_slow_queries
 from app.db.utils import (
     create_database,
-    create_table,
     drop_database,
     init_database,
 )
@@ -26,6 +30,22 @@ from app.db.utils import (
 @click.option("--recreate", is_flag=True, help="Recreate database")
 @click.option("--load", is_flag=True, help="Insert data to db")
 @click.option("--init", is_flag=True, help="Execute alembic revision")
+@click.option(
+    "--slow-query-report",
+    is_flag=True,
+    help="Summarize slow query log by fingerprint",
+)
+@click.option(
+    "--index-report",
+    is_flag=True,
+    help="Report unused indexes and tables read by sequential scans",
+)
+@click.option(
+    "--refresh-stats",
+    "refresh_stats_views",
+    is_flag=True,
+    help="Refresh statistics materialized views",
+)
 def cli(
     db_name: str,
     create: bool,
@@ -33,10 +53,15 @@ def cli(
     recreate: bool,
     load: bool,
     init: bool,
+    slow_query_report: bool,
+    index_report: bool,
+    refresh_stats_views: bool,
 ) -> None:
     """This function provide command line interface, it allows communication
     with database, you cand set DB_NAME create/drop/recreate run alembic
-    migrations with --init command and fill database with --load command"""
+    migrations with --init command, fill database with --load command,
+    summarize slow query log with --slow-query-report, report index usage
+    with --index-report and refresh statistics views with --refresh-stats"""
     base_superuser_url = f"{BASE_URL}/{POSTGRESS_DB}"
 
     if drop:
@@ -50,8 +75,9 @@ def cli(
         create_database(base_superuser_url, db_name)
 
     if load:
+        # Schema is built by migrations, so --init after it has nothing to do
+        init_database(BASE_URL, db_name)
         set_session()
-        create_table()
         load_db()
         pop_session()
         close_dbs()
@@ -59,6 +85,55 @@ def cli(
     if init:
         init_database(BASE_URL, db_name)
 
+    if slow_query_report:
+        print_slow_query_report(SLOW_QUERY_LOG_FILE)
+
+    if index_report:
+        print_index_report(f"{BASE_URL}/{db_name}")
+
+    if refresh_stats_views:
+        engine = create_engine(f"{BASE_URL}/{db_name}")
+        try:
+            with engine.begin() as connection:
+                refresh_stats(connection)
+        finally:
+            engine.dispose()
+        click.echo("Statistics views refreshed")
+
+
+def print_slow_query_report(path: str) -> None:
+    for item in summarize_slow_queries(path):
+        click.echo(
+            f"{item['fingerprint']} count={item['count']} "
+            f"total={item['total_ms']}ms avg={item['avg_ms']}ms "
+            f"max={item['max_ms']}ms callers={','.join(item['callers'])}"
+        )
+        click.echo(f"    {' '.join(item['statement'].split())[:200]}")
+
+
+def print_index_report(db_url: str) -> None:
+    engine = create_engine(db_url)
+    try:
+        with engine.connect() as connection:
+            unused_indexes = find_unused_indexes(connection)
+            seq_scan_tables = find_seq_scan_tables(connection)
+    finally:
+        engine.dispose()
+
+    click.echo("Unused indexes:")
+    for item in unused_indexes:
+        click.echo(
+            f"    {item['index_name']} on {item['table_name']} "
+            f"scans={item['scans']} size={item['size_bytes']}B"
+        )
+    click.echo("Tables with heavy sequential scans:")
+    for item in seq_scan_tables:
+        click.echo(
+            f"    {item['table_name']} rows={item['live_rows']} "
+            f"seq_scan={item['seq_scan']} seq_tup_read={item['seq_tup_read']} "
+            f"idx_scan={item['idx_scan']} index_usage={item['index_usage']}%"
+        )
+
 
 if __name__ == "__main__":
     cli()
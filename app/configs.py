@@ -23,13 +23,86 @@ APP_DEBUG = bool(os.getenv("APP_DEBUG", 0))
 
 ENGINE = os.getenv("ENGINE")
 
+DB_REPLICAS = [
+    replica.strip()
+    for replica in os.getenv("DB_REPLICAS", "").split(",")
+    if replica.strip()
+]
+REPLICA_BALANCING = os.getenv("REPLICA_BALANCING", "round_robin")
+REPLICA_STICKINESS = int(os.getenv("REPLICA_STICKINESS", 5))
+
 if ENGINE == "postgresql+psycopg2":
     BASE_URL = f"{ENGINE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}"
+    REPLICA_URLS = [
+        f"{ENGINE}://{DB_USER}:{DB_PASSWORD}@{replica}"
+        for replica in DB_REPLICAS
+    ]
 else:
     BASE_URL = ""
+    REPLICA_URLS = []
 
 ECHO_OPTION = os.getenv("ECHO_OPTION", 1)
-ENGINE_OPTIONS = {"echo": int(ECHO_OPTION)}
+
+POOL_SIZE = int(os.getenv("POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.getenv("POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(os.getenv("POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("POOL_RECYCLE", -1))
+POOL_PRE_PING = bool(int(os.getenv("POOL_PRE_PING", 0)))
+
+ENGINE_OPTIONS = {
+    "echo": int(ECHO_OPTION),
+    "pool_size": POOL_SIZE,
+    "max_overflow": POOL_MAX_OVERFLOW,
+    "pool_timeout": POOL_TIMEOUT,
+    "pool_recycle": POOL_RECYCLE,
+    "pool_pre_ping": POOL_PRE_PING,
+}
+
+TRANSACTION_ISOLATION_LEVEL = os.getenv("TRANSACTION_ISOLATION_LEVEL")
+TRANSACTION_RETRIES = int(os.getenv("TRANSACTION_RETRIES", 3))
+TRANSACTION_RETRY_BACKOFF = float(os.getenv("TRANSACTION_RETRY_BACKOFF", 0.05))
+TRANSACTION_RETRY_BACKOFF_MAX = float(
+    os.getenv("TRANSACTION_RETRY_BACKOFF_MAX", 1)
+)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(
+    os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024)
+)
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(
+    os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1)
+)
+SLOW_QUERY_EXPLAIN_QUEUE_SIZE = int(
+    os.getenv("SLOW_QUERY_EXPLAIN_QUEUE_SIZE", 100)
+)
+
+INDEX_REPORT_MIN_ROWS = int(os.getenv("INDEX_REPORT_MIN_ROWS", 10000))
+INDEX_REPORT_MIN_INDEX_USAGE = float(
+    os.getenv("INDEX_REPORT_MIN_INDEX_USAGE", 95)
+)
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 100))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 1000))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 500))
+SEARCH_LIMIT_DEFAULT = int(os.getenv("SEARCH_LIMIT_DEFAULT", 20))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+
+ENTITY_CACHE_MAX_BYTES = int(
+    os.getenv("ENTITY_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+)
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", 300))
+ENTITY_CACHE_BACKEND = os.getenv("ENTITY_CACHE_BACKEND", "memory")
+ENTITY_CACHE_SHARED_PATH = os.getenv(
+    "ENTITY_CACHE_SHARED_PATH", "/dev/shm/university_cache.sqlite"
+)
+ENTITY_CACHE_REDIS_URL = os.getenv(
+    "ENTITY_CACHE_REDIS_URL", "redis://localhost:6379/0"
+)
+ENTITY_CACHE_LOCK_TTL = float(os.getenv("ENTITY_CACHE_LOCK_TTL", 10))
+ENTITY_CACHE_LOCK_WAIT = float(os.getenv("ENTITY_CACHE_LOCK_WAIT", 2))
+ENTITY_CACHE_LOCK_POLL = float(os.getenv("ENTITY_CACHE_LOCK_POLL", 0.02))
 
 LOGGER_LEVEL = os.getenv("LOGGER_LEVEL")
 
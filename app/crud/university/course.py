@@ -1,31 +1,128 @@
 import typing as t
 
-from sqlalchemy import select, not_
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import Row, Select, any_, delete, select, not_, update
+from sqlalchemy.orm import joinedload, selectinload, Session
 
 from app.api.university.api_models.course import CourseRequest
+from app.crud.university.enrollment import replace_enrollments
+from app.crud.university.list_query import (
+    NAME_OPERATORS,
+    RANGE_OPERATORS,
+    ListField,
+    ListQuery,
+    parse_list_query,
+)
+from app.crud.university.rows import (
+    CourseRow,
+    rows_statement,
+    select_rows,
+)
 from app.crud.university.utils import (
+    aggregate_versions,
+    get_missing_ids,
     get_student_by_ids,
+    int_array,
+    relationship_options,
     set_value_to_model,
+    versions_digest,
 )
-from app.db.models import Course, Student
+from app.db.models import Course, Student, StudentToCourse
 from app.db.transaction import transaction
 from app.db.session import s
 
 
-def get_all_courses() -> t.Sequence[Course]:
-    """This function returns all courses with their students"""
-    statement = select(Course).options(selectinload(Course.students))
+COURSE_LIST_FIELDS = {
+    "id": ListField(Course.id, RANGE_OPERATORS, sortable=True),
+    "name": ListField(Course.name, NAME_OPERATORS, sortable=True),
+    "student_count": ListField(
+        Course.student_count, RANGE_OPERATORS, sortable=True
+    ),
+}
+
+
+def get_course_rows(
+    limit: int,
+    after: t.Sequence[t.Any] | None = None,
+    include: t.Collection[str] = (),
+    query: ListQuery | None = None,
+) -> list[CourseRow]:
+    """This function returns page of courses filtered and ordered by query,
+    by id if it isn't provided, as read only rows. Only rows which go after
+    cursor key and only needed columns are selected, rows skip identity map
+    and included relationships are loaded by one keyed query each"""
+    if query is None:
+        query = parse_list_query(COURSE_LIST_FIELDS)
+    statement = query.apply(rows_statement(CourseRow, include), after).limit(
+        limit
+    )
+    return select_rows(CourseRow, statement, include)
+
+
+def stream_all_courses(
+    session: Session,
+    chunk_size: int,
+    include: t.Collection[str] = (),
+    query: ListQuery | None = None,
+) -> t.Iterator[Course]:
+    """This function yields all courses filtered and ordered by query from
+    server side cursor, included relationships are loaded for each chunk of
+    rows"""
+    if query is None:
+        query = parse_list_query(COURSE_LIST_FIELDS)
+    statement = query.apply(
+        select(Course).options(*relationship_options(Course, include))
+    ).execution_options(yield_per=chunk_size)
+    yield from session.scalars(statement)
+
+
+def less_or_equal_students_in_course(
+    students_amount: int,
+) -> t.Sequence[Course]:
+    """This query return courses which has less or equal amount of student
+    then the specified students_amount argument using student_count index"""
+    statement = (
+        select(Course)
+        .options(selectinload(Course.students))
+        .where(Course.student_count <= students_amount)
+        .order_by(Course.student_count, Course.id)
+    )
     return s.user_db.scalars(statement).all()
 
 
-def get_course(course_id: int) -> Course | None:
-    """This function return course with students by it id, None if not exist"""
-    return s.user_db.get(
-        Course, course_id, options=(joinedload(Course.students),)
+def _course_etag(course_id: int) -> Select[tuple[str]]:
+    return (
+        select(
+            versions_digest(
+                Course.version,
+                aggregate_versions(Student.id, Student.version),
+            )
+        )
+        .select_from(Course)
+        .outerjoin(StudentToCourse, StudentToCourse.course_id == Course.id)
+        .outerjoin(Student, Student.id == StudentToCourse.student_id)
+        .where(Course.id == course_id)
+        .group_by(Course.id)
     )
 
 
+def get_course_etag(course_id: int, lock: bool = False) -> str | None:
+    """This function returns etag of course with its students computed from
+    row versions, None if course don't exist. With lock course row is locked
+    till the end of transaction"""
+    if lock:
+        s.user_db.execute(
+            select(Course.id).where(Course.id == course_id).with_for_update()
+        )
+    return s.user_db.scalar(_course_etag(course_id))
+
+
+def get_course(course_id: int, with_students: bool = True) -> Course | None:
+    """This function return course with students by it id, None if not exist,
+    if with_students set to False students are loaded only on access"""
+    options = (joinedload(Course.students),) if with_students else ()
+    return s.user_db.get(Course, course_id, options=options)
+
+
 @transaction
 def post_course(course_data: CourseRequest) -> Course:
     """This function create course and insert it to the database if student_ids
@@ -40,6 +137,23 @@ def post_course(course_data: CourseRequest) -> Course:
     return course
 
 
+@transaction
+def update_course_fields(
+    course_id: int, fields: dict[str, t.Any]
+) -> Row[t.Any] | None:
+    """This function updates scalar fields of course with one UPDATE ...
+    RETURNING without loading it first, returned row holds only course
+    columns, None if course don't exist"""
+    statement = (
+        update(Course)
+        .where(Course.id == course_id)
+        .values(**fields)
+        .returning(Course.id, Course.name, Course.description)
+        .execution_options(synchronize_session=False)
+    )
+    return s.user_db.execute(statement).one_or_none()
+
+
 @transaction
 def update_course(
     course: Course, request_data: CourseRequest, action: str | None
@@ -55,11 +169,7 @@ def update_course(
     student_ids = request_data.student_ids
     if student_ids is not None:
         if action == "remove":
-            students = _get_student_by_ids_course(
-                student_ids, course_id=course.id, with_course=True
-            )
-            students = list(set(course.students) - set(students))
-            course.students = students
+            _remove_students_from_course(course, student_ids)
             return course
 
         students = _get_student_by_ids_course(
@@ -71,8 +181,12 @@ def update_course(
 
 
 @transaction
-def put_course(course: Course, request_data: CourseRequest) -> Course:
-    """This function entirely update the course by provided request data"""
+def put_course(
+    course: Course, request_data: CourseRequest
+) -> tuple[Course, int]:
+    """This function entirely update the course by provided request data,
+    only difference between old and new students is written. Returns course
+    and amount of touched enrollment rows"""
     course = set_value_to_model(
         course,
         request_data={
@@ -80,17 +194,32 @@ def put_course(course: Course, request_data: CourseRequest) -> Course:
             "description": request_data.description,
         },
     )
-    course.students.clear()
-    assert request_data.student_ids
-    students = get_student_by_ids(request_data.student_ids)
-    course.students.extend(students)
+    assert request_data.student_ids is not None
+    missing = get_missing_ids(Student.id, request_data.student_ids)
+    if missing:
+        raise ValueError(f"There is no students with this ids {missing}")
+    rows_touched = replace_enrollments(
+        StudentToCourse.course_id,
+        course.id,
+        StudentToCourse.student_id,
+        request_data.student_ids,
+    )
+    s.user_db.expire(course, ["students"])
 
-    return course
+    return course, rows_touched
 
 
-def delete_course(course: Course) -> None:
-    """This function delete course from database"""
-    s.user_db.delete(course)
+def delete_course(course_id: int) -> bool:
+    """This function deletes course with one DELETE ... RETURNING without
+    loading it, enrollments are removed by ON DELETE CASCADE in database.
+    Returns False if course don't exist"""
+    statement = (
+        delete(Course)
+        .where(Course.id == course_id)
+        .returning(Course.id)
+        .execution_options(synchronize_session=False)
+    )
+    return s.user_db.scalar(statement) is not None
 
 
 def get_course_by_name(course_name: str) -> Course | None:
@@ -103,6 +232,30 @@ def get_course_by_name(course_name: str) -> Course | None:
     return s.user_db.scalar(statement)
 
 
+def _remove_students_from_course(
+    course: Course, student_ids: list[int]
+) -> None:
+    """This function removes students from course with one DELETE,
+    ValueError raised if some of them are not assigned to the course. Course
+    students are expired, so they are loaded once, by the next access"""
+    statement = (
+        delete(StudentToCourse)
+        .where(
+            StudentToCourse.course_id == course.id,
+            StudentToCourse.student_id == any_(int_array(student_ids)),
+        )
+        .returning(StudentToCourse.student_id)
+        .execution_options(synchronize_session=False)
+    )
+    missing = set(student_ids) - set(s.user_db.scalars(statement))
+    if missing:
+        raise ValueError(
+            f"There is no students {missing} which assigned to "
+            f"course {course.id}"
+        )
+    s.user_db.expire(course, ["students"])
+
+
 def _get_student_by_ids_course(
     student_ids: list[int], course_id: int, with_course: bool
 ) -> t.Sequence[Student]:
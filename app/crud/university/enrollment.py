@@ -0,0 +1,153 @@
+import typing as t
+from dataclasses import dataclass
+
+from sqlalchemy import CursorResult, all_, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.selectable import TableValuedAlias
+
+from app.crud.university.utils import int_array
+from app.db.invalidation import changed_rows
+from app.db.models import Course, Student, StudentToCourse
+from app.db.session import s
+from app.db.transaction import transaction
+
+
+@dataclass
+class EnrollmentResult:
+    inserted: int = 0
+    duplicate: int = 0
+    invalid: int = 0
+
+
+@dataclass
+class UnenrollmentResult:
+    deleted: int = 0
+    missing: int = 0
+
+
+def _pairs_table(pairs: t.Collection[tuple[int, int]]) -> TableValuedAlias:
+    """This function returns pairs as unnest of two arrays, so any amount of
+    pairs is sent to database as two parameters"""
+    student_ids, course_ids = zip(*pairs)
+    return (
+        func.unnest(int_array(student_ids), int_array(course_ids))
+        .table_valued("student_id", "course_id")
+        .render_derived(name="pairs")
+    )
+
+
+def _pair_rows(pairs: t.Iterable[tuple[int, int]]) -> list[dict[str, int]]:
+    return [
+        {"student_id": student_id, "course_id": course_id}
+        for student_id, course_id in pairs
+    ]
+
+
+@transaction
+def post_enrollments(pairs: t.Sequence[tuple[int, int]]) -> EnrollmentResult:
+    """This function enrolls students to courses by (student_id, course_id)
+    pairs with one INSERT ... ON CONFLICT DO NOTHING, pairs with not
+    existing student or course are counted as invalid, already enrolled as
+    duplicate"""
+    unique_pairs = set(pairs)
+    result = EnrollmentResult(duplicate=len(pairs) - len(unique_pairs))
+    if not unique_pairs:
+        return result
+
+    pairs_table = _pairs_table(unique_pairs)
+    valid = (
+        select(pairs_table.c.student_id, pairs_table.c.course_id)
+        .join(Student, Student.id == pairs_table.c.student_id)
+        .join(Course, Course.id == pairs_table.c.course_id)
+        .cte("valid")
+    )
+    inserted = (
+        insert(StudentToCourse)
+        .from_select(["student_id", "course_id"], select(valid))
+        .on_conflict_do_nothing()
+        .returning(StudentToCourse.student_id)
+        .cte("inserted")
+    )
+    valid_amount, inserted_amount = s.user_db.execute(
+        select(
+            select(func.count()).select_from(valid).scalar_subquery(),
+            select(func.count()).select_from(inserted).scalar_subquery(),
+        ).execution_options(
+            **changed_rows(StudentToCourse, _pair_rows(unique_pairs))
+        )
+    ).one()
+
+    result.inserted = inserted_amount
+    result.duplicate += valid_amount - inserted_amount
+    result.invalid = len(unique_pairs) - valid_amount
+    return result
+
+
+@transaction
+def delete_enrollments(
+    pairs: t.Sequence[tuple[int, int]]
+) -> UnenrollmentResult:
+    """This function removes students from courses by (student_id,
+    course_id) pairs with one DELETE, pairs which are not enrolled are
+    counted as missing"""
+    unique_pairs = set(pairs)
+    if not unique_pairs:
+        return UnenrollmentResult()
+
+    pairs_table = _pairs_table(unique_pairs)
+    statement = (
+        delete(StudentToCourse)
+        .where(
+            StudentToCourse.student_id == pairs_table.c.student_id,
+            StudentToCourse.course_id == pairs_table.c.course_id,
+        )
+        .execution_options(
+            synchronize_session=False,
+            **changed_rows(StudentToCourse, _pair_rows(unique_pairs)),
+        )
+    )
+    deleted = t.cast(CursorResult, s.user_db.execute(statement)).rowcount
+    return UnenrollmentResult(
+        deleted=deleted, missing=len(unique_pairs) - deleted
+    )
+
+
+def replace_enrollments(
+    owner: InstrumentedAttribute[int],
+    owner_id: int,
+    other: InstrumentedAttribute[int],
+    other_ids: t.Collection[int],
+) -> int:
+    """This function makes other_ids the only rows enrolled with owner_id,
+    rows which are kept are not touched, only extra ones are deleted and only
+    missing ones inserted. Returns amount of deleted and inserted rows"""
+    ids = int_array(set(other_ids))
+    # Deleted rows are returned, so entities on both sides of them are
+    # invalidated, not only the owner
+    delete_statement = (
+        delete(StudentToCourse)
+        .where(owner == owner_id, other != all_(ids))
+        .returning(StudentToCourse.student_id, StudentToCourse.course_id)
+        .execution_options(synchronize_session=False)
+    )
+    insert_statement = (
+        insert(StudentToCourse)
+        .from_select(
+            [owner.key, other.key],
+            select(literal(owner_id), func.unnest(ids)),
+        )
+        .on_conflict_do_nothing()
+        .execution_options(
+            **changed_rows(
+                StudentToCourse,
+                (
+                    {owner.key: owner_id, other.key: other_id}
+                    for other_id in other_ids
+                ),
+            )
+        )
+    )
+    deleted = s.user_db.execute(delete_statement).all()
+    inserted = t.cast(CursorResult, s.user_db.execute(insert_statement))
+    return len(deleted) + inserted.rowcount
@@ -1,43 +1,134 @@
 import typing as t
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import (
+    Row,
+    CursorResult,
+    Select,
+    all_,
+    any_,
+    delete,
+    select,
+    update,
+)
+from sqlalchemy.orm import joinedload, selectinload, Session
 
 from app.api.university.api_models.group import GroupRequest
+from app.crud.university.list_query import (
+    NAME_OPERATORS,
+    RANGE_OPERATORS,
+    ListField,
+    ListQuery,
+    parse_list_query,
+)
+from app.crud.university.rows import (
+    GroupRow,
+    rows_statement,
+    select_rows,
+)
 from app.crud.university.utils import (
+    aggregate_versions,
+    get_missing_ids,
     get_student_by_ids,
+    int_array,
+    relationship_options,
     set_value_to_model,
+    versions_digest,
 )
+from app.db.invalidation import changed_rows
 from app.db.models import Group, Student
 from app.db.transaction import transaction
 from app.db.session import s
 
 
-def get_all_groups() -> t.Sequence[Group]:
-    """This function returns all groups with students"""
-    statement = select(Group).options(selectinload(Group.students))
-    return s.user_db.scalars(statement).all()
+GROUP_LIST_FIELDS = {
+    "id": ListField(Group.id, RANGE_OPERATORS, sortable=True),
+    "name": ListField(Group.name, NAME_OPERATORS, sortable=True),
+    "student_count": ListField(
+        Group.student_count, RANGE_OPERATORS, sortable=True
+    ),
+}
+
+
+def get_group_rows(
+    limit: int,
+    after: t.Sequence[t.Any] | None = None,
+    include: t.Collection[str] = (),
+    query: ListQuery | None = None,
+) -> list[GroupRow]:
+    """This function returns page of groups filtered and ordered by query,
+    by id if it isn't provided, as read only rows. Only rows which go after
+    cursor key and only needed columns are selected, rows skip identity map
+    and included relationships are loaded by one keyed query each"""
+    if query is None:
+        query = parse_list_query(GROUP_LIST_FIELDS)
+    statement = query.apply(rows_statement(GroupRow, include), after).limit(
+        limit
+    )
+    return select_rows(GroupRow, statement, include)
+
+
+def stream_all_groups(
+    session: Session,
+    chunk_size: int,
+    include: t.Collection[str] = (),
+    query: ListQuery | None = None,
+) -> t.Iterator[Group]:
+    """This function yields all groups filtered and ordered by query from
+    server side cursor, included relationships are loaded for each chunk of
+    rows"""
+    if query is None:
+        query = parse_list_query(GROUP_LIST_FIELDS)
+    statement = query.apply(
+        select(Group).options(*relationship_options(Group, include))
+    ).execution_options(yield_per=chunk_size)
+    yield from session.scalars(statement)
 
 
 def less_or_equal_students_in_group(students_amount: int) -> t.Sequence[Group]:
     """This query return groups which has less or equal amount of student then
-    the specified students_amount argument"""
+    the specified students_amount argument, groups without students included.
+    It is range scan of student_count index maintained by triggers"""
     statement = (
         select(Group)
-        .join(Group.students)
-        .group_by(Group.id)
-        .having(func.count(Group.students) <= students_amount)
+        .options(selectinload(Group.students))
+        .where(Group.student_count <= students_amount)
+        .order_by(Group.student_count, Group.id)
     )
     return s.user_db.scalars(statement).all()
 
 
-def get_group(group_id: int) -> Group | None:
-    """This function return group with students by it id, None if not exist"""
-    return s.user_db.get(
-        Group, group_id, options=(joinedload(Group.students),)
+def _group_etag(group_id: int) -> Select[tuple[str]]:
+    return (
+        select(
+            versions_digest(
+                Group.version, aggregate_versions(Student.id, Student.version)
+            )
+        )
+        .select_from(Group)
+        .outerjoin(Student, Student.group_id == Group.id)
+        .where(Group.id == group_id)
+        .group_by(Group.id)
     )
 
 
+def get_group_etag(group_id: int, lock: bool = False) -> str | None:
+    """This function returns etag of group with its students computed from
+    row versions, None if group don't exist. With lock group row is locked
+    till the end of transaction"""
+    if lock:
+        s.user_db.execute(
+            select(Group.id).where(Group.id == group_id).with_for_update()
+        )
+    return s.user_db.scalar(_group_etag(group_id))
+
+
+def get_group(group_id: int, with_students: bool = True) -> Group | None:
+    """This function return group with students by it id, None if not exist,
+    if with_students set to False students are loaded only on access"""
+    options = (joinedload(Group.students),) if with_students else ()
+    return s.user_db.get(Group, group_id, options=options)
+
+
 def get_group_by_name(group_name: str) -> Group | None:
     """This function return group by provided name"""
     return s.user_db.scalar(select(Group).where(Group.name == group_name))
@@ -57,6 +148,23 @@ def post_group(group_data: GroupRequest) -> Group:
     return group
 
 
+@transaction
+def update_group_fields(
+    group_id: int, fields: dict[str, t.Any]
+) -> Row[t.Any] | None:
+    """This function updates scalar fields of group with one UPDATE ...
+    RETURNING without loading it first, returned row holds only group
+    columns, None if group don't exist"""
+    statement = (
+        update(Group)
+        .where(Group.id == group_id)
+        .values(**fields)
+        .returning(Group.id, Group.name)
+        .execution_options(synchronize_session=False)
+    )
+    return s.user_db.execute(statement).one_or_none()
+
+
 @transaction
 def update_group(
     group: Group, request_data: GroupRequest, action: str | None
@@ -72,11 +180,7 @@ def update_group(
     student_ids = request_data.student_ids
     if student_ids is not None:
         if action == "remove":
-            students = _get_student_by_ids_group(
-                student_ids, group_id=group.id
-            )
-            students = list(set(group.students) - set(students))
-            group.students = students
+            _remove_students_from_group(group, student_ids)
             return group
 
         students = get_student_by_ids(student_ids)
@@ -86,21 +190,108 @@ def update_group(
 
 
 @transaction
-def put_group(group: Group, request_data: GroupRequest) -> Group:
+def put_group(group: Group, request_data: GroupRequest) -> tuple[Group, int]:
     """This function overwrites group in the database by provided request
-    data"""
+    data, only students which leave or join the group are updated. Returns
+    group and amount of touched student rows"""
     group = set_value_to_model(group, request_data={"name": request_data.name})
-    group.students.clear()
-    assert request_data.student_ids
-    students = _get_student_by_ids_group(request_data.student_ids)
-    group.students.extend(students)
+    assert request_data.student_ids is not None
+    missing = get_missing_ids(Student.id, request_data.student_ids)
+    if missing:
+        raise ValueError(f"There is no students with this ids {missing}")
 
-    return group
+    student_ids = int_array(set(request_data.student_ids))
+    leaving = _lock_students(
+        Student.group_id == group.id, Student.id != all_(student_ids)
+    )
+    joining = _lock_students(
+        Student.id == any_(student_ids),
+        Student.group_id.is_distinct_from(group.id),
+    )
+    rows_touched = _move_students(leaving, None) + _move_students(
+        joining, group.id
+    )
+    s.user_db.expire(group, ["students"])
+
+    return group, rows_touched
+
+
+def delete_group(group_id: int) -> bool:
+    """This function deletes group with one DELETE ... RETURNING without
+    loading it, students are unassigned by ON DELETE SET NULL in database.
+    Returns False if group don't exist"""
+    statement = (
+        delete(Group)
+        .where(Group.id == group_id)
+        .returning(Group.id)
+        .execution_options(synchronize_session=False)
+    )
+    return s.user_db.scalar(statement) is not None
+
+
+def _lock_students(*conditions: t.Any) -> list[dict[str, t.Any]]:
+    """This function returns id and group_id of students matching conditions,
+    rows are locked till commit, so students keep group read here"""
+    statement = (
+        select(Student.id, Student.group_id)
+        .where(*conditions)
+        .with_for_update()
+    )
+    return [dict(row) for row in s.user_db.execute(statement).mappings()]
+
+
+def _move_students(
+    students: list[dict[str, t.Any]], group_id: int | None
+) -> int:
+    """This function assigns locked students to group with one UPDATE,
+    changed rows name groups they leave as well as the one they join. Returns
+    amount of updated rows"""
+    if not students:
+        return 0
+    joined = [
+        {"id": student["id"], "group_id": group_id} for student in students
+    ]
+    statement = (
+        update(Student)
+        .where(Student.id == any_(int_array(row["id"] for row in students)))
+        .values(group_id=group_id)
+        .execution_options(
+            synchronize_session="fetch",
+            **changed_rows(Student, [*students, *joined]),
+        )
+    )
+    return t.cast(CursorResult, s.user_db.execute(statement)).rowcount
 
 
-def delete_group(group: Group) -> None:
-    """This function delete group from database"""
-    s.user_db.delete(group)
+def _remove_students_from_group(group: Group, student_ids: list[int]) -> None:
+    """This function unassigns students from group with one UPDATE,
+    ValueError raised if some of them are not in the group. Group students
+    are expired, so they are loaded once, by the next access"""
+    statement = (
+        update(Student)
+        .where(
+            Student.group_id == group.id,
+            Student.id == any_(int_array(student_ids)),
+        )
+        .values(group_id=None)
+        .returning(Student.id)
+        .execution_options(
+            synchronize_session="fetch",
+            **changed_rows(
+                Student,
+                (
+                    {"id": student_id, "group_id": group.id}
+                    for student_id in student_ids
+                ),
+            ),
+        )
+    )
+    missing = set(student_ids) - set(s.user_db.scalars(statement))
+    if missing:
+        raise ValueError(
+            f"There is no students {missing} with group id {group.id}"
+        )
+    s.user_db.expire(group, ["students"])
 
 
 def _get_student_by_ids_group(
@@ -0,0 +1,158 @@
+import operator
+import typing as t
+from dataclasses import dataclass
+
+from sqlalchemy import ColumnElement, Select, and_, any_, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.crud.university.utils import int_array
+
+FILTER_SEPARATOR = ","
+PART_SEPARATOR = ":"
+VALUE_SEPARATOR = "|"
+NULL_VALUE = "null"
+LIKE_ESCAPE = "/"
+ID_FIELD = "id"
+
+COMPARISONS: dict[str, t.Callable[[t.Any, t.Any], ColumnElement[bool]]] = {
+    "eq": operator.eq,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+RANGE_OPERATORS = frozenset({"eq", "in", "lt", "lte", "gt", "gte"})
+NAME_OPERATORS = frozenset({"eq", "prefix"})
+
+
+@dataclass(frozen=True)
+class ListField:
+    column: InstrumentedAttribute[t.Any]
+    operators: frozenset[str]
+    sortable: bool = False
+
+
+@dataclass(frozen=True)
+class ListQuery:
+    filters: tuple[ColumnElement[bool], ...]
+    order: tuple[tuple[InstrumentedAttribute[t.Any], bool], ...]
+
+    def apply(
+        self, statement: Select[t.Any], after: t.Sequence[t.Any] | None = None
+    ) -> Select[t.Any]:
+        """This method adds filters, order and keyset condition selecting
+        rows which go after cursor key to statement"""
+        statement = statement.where(*self.filters).order_by(
+            *(
+                column.desc() if descending else column
+                for column, descending in self.order
+            )
+        )
+        if after is not None:
+            statement = statement.where(self._after(after))
+        return statement
+
+    def cursor_key(self, entity: t.Any) -> list[t.Any]:
+        """This method returns values of order columns of entity, which are
+        cursor of the next page"""
+        return [getattr(entity, column.key) for column, _ in self.order]
+
+    def _after(self, key: t.Sequence[t.Any]) -> ColumnElement[bool]:
+        if len(key) != len(self.order) or any(
+            not isinstance(value, column.type.python_type)
+            or isinstance(value, bool)
+            for (column, _), value in zip(self.order, key)
+        ):
+            raise ValueError("Cursor doesn't match sort")
+
+        if len({descending for _, descending in self.order}) == 1:
+            # Row value comparison is served by one index range scan
+            columns = tuple_(*(column for column, _ in self.order))
+            if self.order[0][1]:
+                return columns < tuple_(*key)
+            return columns > tuple_(*key)
+
+        conditions = []
+        for index, (column, descending) in enumerate(self.order):
+            equal = [
+                previous == value
+                for (previous, _), value in zip(self.order[:index], key)
+            ]
+            after = column < key[index] if descending else column > key[index]
+            conditions.append(and_(*equal, after))
+        return or_(*conditions)
+
+
+def _parse_value(field: ListField, raw_value: str) -> t.Any:
+    python_type = field.column.type.python_type
+    try:
+        return python_type(raw_value)
+    except ValueError:
+        raise ValueError(f"Invalid value {raw_value} of {field.column.key}")
+
+
+def _parse_filter(
+    fields: t.Mapping[str, ListField], condition: str
+) -> ColumnElement[bool]:
+    name, _, rest = condition.partition(PART_SEPARATOR)
+    operation, _, raw_value = rest.partition(PART_SEPARATOR)
+    field = fields.get(name)
+    if field is None:
+        raise ValueError(f"Filter by {name} isn't allowed")
+    if operation not in field.operators:
+        raise ValueError(f"Operator {operation} isn't allowed for {name}")
+
+    column = field.column
+    if operation == "eq" and raw_value == NULL_VALUE and column.nullable:
+        return column.is_(None)
+    if operation == "in":
+        return column == any_(
+            int_array(
+                _parse_value(field, value)
+                for value in raw_value.split(VALUE_SEPARATOR)
+            )
+        )
+    if operation == "prefix":
+        if not raw_value:
+            raise ValueError(f"Empty prefix of {name}")
+        # Whole pattern is one parameter, so planner turns it into index range
+        pattern = "".join(
+            LIKE_ESCAPE + char if char in f"%_{LIKE_ESCAPE}" else char
+            for char in raw_value
+        )
+        return column.like(f"{pattern}%", escape=LIKE_ESCAPE)
+    return COMPARISONS[operation](column, _parse_value(field, raw_value))
+
+
+def parse_list_query(
+    fields: t.Mapping[str, ListField],
+    filter_value: str = "",
+    sort_value: str = "",
+) -> ListQuery:
+    """This function compiles filter like group_id:eq:3,last_name:prefix:Sm
+    and sort like -last_name,id to SQL expressions. Only whitelisted fields
+    and operators are allowed, ValueError raised otherwise. id field is
+    appended to the order, so it is unique and pages can be cut by keyset"""
+    id_column = fields[ID_FIELD].column
+    filters = tuple(
+        _parse_filter(fields, condition.strip())
+        for condition in filter_value.split(FILTER_SEPARATOR)
+        if condition.strip()
+    )
+
+    order: list[tuple[InstrumentedAttribute[t.Any], bool]] = []
+    for item in sort_value.split(FILTER_SEPARATOR):
+        item = item.strip()
+        name = item.lstrip("-")
+        if not name:
+            continue
+        field = fields.get(name)
+        if field is None or not field.sortable:
+            raise ValueError(f"Sort by {name} isn't allowed")
+        if any(column is field.column for column, _ in order):
+            raise ValueError(f"Sort by {name} is repeated")
+        order.append((field.column, item.startswith("-")))
+    if not any(column is id_column for column, _ in order):
+        order.append((id_column, False))
+
+    return ListQuery(filters=filters, order=tuple(order))
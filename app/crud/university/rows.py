@@ -0,0 +1,227 @@
+import typing as t
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy import ColumnElement, Select, any_, select
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.crud.university.utils import int_array
+from app.db.models import Course, Group, Student, StudentToCourse
+from app.db.session import s
+
+
+class EntityRow:
+    """Read only entity built straight from Core row, without identity map
+    and pydantic. Output fields go first in slots, then columns needed for
+    cursor keys and relationships, then relationships which are filled by
+    second query keyed by ids of the page, not included ones stay None"""
+
+    __slots__: tuple[str, ...] = ()
+    columns: t.ClassVar[tuple[InstrumentedAttribute[t.Any], ...]]
+    fields: t.ClassVar[tuple[str, ...]]
+    relationships: t.ClassVar[tuple[str, ...]] = ()
+
+    def __init__(self, *values: t.Any) -> None:
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.relationships:
+            setattr(self, name, None)
+
+    def as_dict(self, include: t.Collection[str] = ()) -> dict[str, t.Any]:
+        """This method returns output fields with included relationships,
+        the same dict response model dumps for the entity"""
+        data = {name: getattr(self, name) for name in self.fields}
+        for name in self.relationships:
+            if name in include:
+                related = getattr(self, name)
+                if isinstance(related, list):
+                    data[name] = [item.as_dict() for item in related]
+                else:
+                    data[name] = None if related is None else related.as_dict()
+        return data
+
+
+class StudentRow(EntityRow):
+    id: int
+    first_name: str
+    last_name: str
+    group_id: int | None
+    group: "GroupRow | None"
+    courses: "list[CourseRow] | None"
+
+    __slots__ = (
+        "id",
+        "first_name",
+        "last_name",
+        "group_id",
+        "group",
+        "courses",
+    )
+    columns = (
+        Student.id,
+        Student.first_name,
+        Student.last_name,
+        Student.group_id,
+    )
+    fields = ("id", "first_name", "last_name")
+    relationships = ("group", "courses")
+
+
+class GroupRow(EntityRow):
+    id: int
+    name: str
+    student_count: int
+    students: list[StudentRow] | None
+
+    __slots__ = ("id", "name", "student_count", "students")
+    columns = (Group.id, Group.name, Group.student_count)
+    fields = ("id", "name")
+    relationships = ("students",)
+
+
+class CourseRow(EntityRow):
+    id: int
+    name: str
+    description: str
+    student_count: int
+    students: list[StudentRow] | None
+
+    __slots__ = ("id", "name", "description", "student_count", "students")
+    columns = (
+        Course.id,
+        Course.name,
+        Course.description,
+        Course.student_count,
+    )
+    fields = ("id", "name", "description")
+    relationships = ("students",)
+
+
+R = t.TypeVar("R", bound=EntityRow)
+
+
+@dataclass(frozen=True)
+class RelatedRows:
+    """Collection loaded by second query, it selects key of owner row
+    followed by fields of related rows"""
+
+    row: type[EntityRow]
+    # Attribute of owner row matched with the first column of statement
+    owner_key: str
+    statement: t.Callable[[list[int]], Select[t.Any]]
+
+
+@dataclass(frozen=True)
+class JoinedRow:
+    """Many-to-one relationship, its fields are outer joined to the owner
+    rows in the same statement"""
+
+    row: type[EntityRow]
+    target: t.Any
+    onclause: ColumnElement[bool]
+
+
+def _fields(row: type[EntityRow]) -> tuple[InstrumentedAttribute[t.Any], ...]:
+    return row.columns[: len(row.fields)]
+
+
+RELATED_ROWS: dict[type[EntityRow], dict[str, RelatedRows | JoinedRow]] = {
+    StudentRow: {
+        "group": JoinedRow(GroupRow, Group, Group.id == Student.group_id),
+        "courses": RelatedRows(
+            CourseRow,
+            "id",
+            statement=lambda ids: select(
+                StudentToCourse.student_id, *_fields(CourseRow)
+            )
+            .join(Course, Course.id == StudentToCourse.course_id)
+            .where(StudentToCourse.student_id == any_(int_array(ids)))
+            .order_by(StudentToCourse.student_id, Course.id),
+        ),
+    },
+    GroupRow: {
+        "students": RelatedRows(
+            StudentRow,
+            "id",
+            statement=lambda ids: select(
+                Student.group_id, *_fields(StudentRow)
+            )
+            .where(Student.group_id == any_(int_array(ids)))
+            .order_by(Student.group_id, Student.id),
+        ),
+    },
+    CourseRow: {
+        "students": RelatedRows(
+            StudentRow,
+            "id",
+            statement=lambda ids: select(
+                StudentToCourse.course_id, *_fields(StudentRow)
+            )
+            .join(Student, Student.id == StudentToCourse.student_id)
+            .where(StudentToCourse.course_id == any_(int_array(ids)))
+            .order_by(StudentToCourse.course_id, Student.id),
+        ),
+    },
+}
+
+
+def rows_statement(
+    row: type[EntityRow], include: t.Collection[str]
+) -> Select[t.Any]:
+    """This function returns select of row columns with fields of included
+    many-to-one relationships, ValueError raised if row has no such
+    relationships"""
+    unknown = set(include) - set(row.relationships)
+    if unknown:
+        raise ValueError(f"There is no relationships {unknown}")
+    statement = select(*row.columns)
+    for _, joined in _joined_rows(row, include):
+        statement = statement.add_columns(*_fields(joined.row)).outerjoin(
+            joined.target, joined.onclause
+        )
+    return statement
+
+
+def select_rows(
+    row: type[R], statement: Select[t.Any], include: t.Collection[str]
+) -> list[R]:
+    """This function returns rows of rows_statement as row objects, each
+    included collection is loaded by one more query keyed by ids of the
+    rows"""
+    joined = _joined_rows(row, include)
+    rows = []
+    for values in s.user_db.execute(statement):
+        start, end = 0, len(row.columns)
+        item = row(*values[start:end])
+        for name, joined_row in joined:
+            start, end = end, end + len(joined_row.row.fields)
+            # Primary key of not joined row is NULL
+            if values[start] is not None:
+                setattr(item, name, joined_row.row(*values[start:end]))
+        rows.append(item)
+
+    for name, related in RELATED_ROWS[row].items():
+        if name in include and isinstance(related, RelatedRows):
+            _fill_related(rows, name, related)
+    return rows
+
+
+def _joined_rows(
+    row: type[EntityRow], include: t.Collection[str]
+) -> list[tuple[str, JoinedRow]]:
+    return [
+        (name, related)
+        for name, related in RELATED_ROWS[row].items()
+        if name in include and isinstance(related, JoinedRow)
+    ]
+
+
+def _fill_related(rows: list[R], name: str, related: RelatedRows) -> None:
+    keys = {getattr(item, related.owner_key) for item in rows} - {None}
+    by_key: defaultdict[int, list[EntityRow]] = defaultdict(list)
+    if keys:
+        result = s.user_db.execute(related.statement(sorted(keys)))
+        for key, *values in result:
+            by_key[key].append(related.row(*values))
+    for item in rows:
+        setattr(item, name, by_key.get(getattr(item, related.owner_key), []))
@@ -0,0 +1,55 @@
+import typing as t
+
+from sqlalchemy import Connection, Row, func, select, text
+
+from app.db.models import course_stats, group_stats, student_stats
+from app.db.models.stats import STATS_VIEWS
+from app.db.session import s
+
+
+def get_student_stats() -> Row[t.Any] | None:
+    """This function returns totals of students and enrollments from
+    student_stats view"""
+    return s.user_db.execute(select(student_stats)).first()
+
+
+def get_course_stats() -> t.Sequence[Row[t.Any]]:
+    """This function returns amount of students of each course from
+    course_stats view, the most popular courses go first"""
+    statement = select(
+        course_stats.c.course_id.label("id"),
+        course_stats.c.name,
+        course_stats.c.students,
+    ).order_by(course_stats.c.students.desc(), course_stats.c.course_id)
+    return s.user_db.execute(statement).all()
+
+
+def get_group_stats() -> t.Sequence[Row[t.Any]]:
+    """This function returns amount of students of each group from
+    group_stats view, the biggest groups go first"""
+    statement = select(
+        group_stats.c.group_id.label("id"),
+        group_stats.c.name,
+        group_stats.c.students,
+    ).order_by(group_stats.c.students.desc(), group_stats.c.group_id)
+    return s.user_db.execute(statement).all()
+
+
+def get_group_size_distribution() -> t.Sequence[Row[t.Any]]:
+    """This function returns how many groups have each size, counted over
+    group_stats view"""
+    size = group_stats.c.students.label("size")
+    statement = (
+        select(size, func.count().label("groups"))
+        .group_by(size)
+        .order_by(size)
+    )
+    return s.user_db.execute(statement).all()
+
+
+def refresh_stats(connection: Connection, concurrently: bool = True) -> None:
+    """This function recomputes statistics views. CONCURRENTLY refresh
+    doesn't block reads of the views while it runs"""
+    option = "CONCURRENTLY " if concurrently else ""
+    for name, _, _ in STATS_VIEWS:
+        connection.execute(text(f"REFRESH MATERIALIZED VIEW {option}{name}"))
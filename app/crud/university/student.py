@@ -1,27 +1,140 @@
 import typing as t
+from dataclasses import dataclass, field
 
-from sqlalchemy import select, not_
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import (
+    Row,
+    Select,
+    any_,
+    delete,
+    func,
+    insert,
+    literal,
+    not_,
+    select,
+    update,
+)
+from sqlalchemy.orm import joinedload, Session
 
 from app.api.university.api_models.student import StudentRequest
 from app.db.transaction import transaction
+from app.crud.university.enrollment import replace_enrollments
 from app.crud.university.group import get_group
+from app.crud.university.list_query import (
+    NAME_OPERATORS,
+    RANGE_OPERATORS,
+    ListField,
+    ListQuery,
+    parse_list_query,
+)
+from app.crud.university.rows import (
+    StudentRow,
+    rows_statement,
+    select_rows,
+)
 from app.crud.university.utils import (
+    aggregate_versions,
     get_course_by_ids,
+    get_missing_ids,
+    int_array,
+    relationship_options,
     set_value_to_model,
+    versions_digest,
 )
-from app.db.models import Student, Course
+from app.db.models import Course, Group, Student, StudentToCourse
+from app.db.models.search import student_full_name
 from app.db.session import s
 
 
-def get_all_students() -> t.Sequence[Student]:
-    """This function returns all students with group and courses"""
-    statement = select(Student).options(
-        joinedload(Student.group), selectinload(Student.courses)
+STUDENT_LIST_FIELDS = {
+    "id": ListField(Student.id, RANGE_OPERATORS, sortable=True),
+    "group_id": ListField(Student.group_id, frozenset({"eq", "in"})),
+    "first_name": ListField(Student.first_name, NAME_OPERATORS),
+    "last_name": ListField(Student.last_name, NAME_OPERATORS, sortable=True),
+}
+
+
+def get_student_rows(
+    limit: int,
+    after: t.Sequence[t.Any] | None = None,
+    include: t.Collection[str] = (),
+    query: ListQuery | None = None,
+) -> list[StudentRow]:
+    """This function returns page of students filtered and ordered by query,
+    by id if it isn't provided, as read only rows. Only rows which go after
+    cursor key and only needed columns are selected, rows skip identity map
+    and included relationships are loaded by one keyed query each"""
+    if query is None:
+        query = parse_list_query(STUDENT_LIST_FIELDS)
+    statement = query.apply(rows_statement(StudentRow, include), after).limit(
+        limit
+    )
+    return select_rows(StudentRow, statement, include)
+
+
+def stream_all_students(
+    session: Session,
+    chunk_size: int,
+    include: t.Collection[str] = (),
+    query: ListQuery | None = None,
+) -> t.Iterator[Student]:
+    """This function yields all students filtered and ordered by query from
+    server side cursor, included relationships are loaded for each chunk of
+    rows"""
+    if query is None:
+        query = parse_list_query(STUDENT_LIST_FIELDS)
+    statement = query.apply(
+        select(Student).options(*relationship_options(Student, include))
+    ).execution_options(yield_per=chunk_size)
+    yield from session.scalars(statement)
+
+
+def search_students(query: str, limit: int) -> t.Sequence[Student]:
+    """This function returns students which full name is similar to query,
+    most similar first. word_similarity ranks partial and misspelled names,
+    its <% operator is served by trigram index on full name"""
+    full_name = student_full_name()
+    rank = func.word_similarity(query, full_name)
+    statement = (
+        select(Student)
+        .where(literal(query).op("<%")(full_name))
+        .order_by(rank.desc(), Student.id)
+        .limit(limit)
     )
     return s.user_db.scalars(statement).all()
 
 
+def _student_etag(student_id: int) -> Select[tuple[str]]:
+    return (
+        select(
+            versions_digest(
+                Student.version,
+                Group.id,
+                Group.version,
+                aggregate_versions(Course.id, Course.version),
+            )
+        )
+        .select_from(Student)
+        .outerjoin(Group, Group.id == Student.group_id)
+        .outerjoin(StudentToCourse, StudentToCourse.student_id == Student.id)
+        .outerjoin(Course, Course.id == StudentToCourse.course_id)
+        .where(Student.id == student_id)
+        .group_by(Student.id, Group.id)
+    )
+
+
+def get_student_etag(student_id: int, lock: bool = False) -> str | None:
+    """This function returns etag of student with group and courses computed
+    from row versions, None if student don't exist. With lock student row is
+    locked till the end of transaction"""
+    if lock:
+        s.user_db.execute(
+            select(Student.id)
+            .where(Student.id == student_id)
+            .with_for_update()
+        )
+    return s.user_db.scalar(_student_etag(student_id))
+
+
 def get_student(student_id: int) -> Student | None:
     """This function return student with courses by it id, None if not exist"""
     return s.user_db.get(
@@ -59,6 +172,100 @@ def post_student(student_data: StudentRequest) -> Student:
     return student
 
 
+@dataclass
+class BulkResult:
+    created: dict[int, int] = field(default_factory=dict)
+    errors: dict[int, str] = field(default_factory=dict)
+
+
+@transaction
+def post_students_bulk(
+    students_data: dict[int, StudentRequest], atomic: bool = False
+) -> BulkResult:
+    """This function adds students keyed by their position in request with
+    one multi-row INSERT and their courses with one more. Group and course
+    ids of all students are checked with one query each, invalid students are
+    reported in errors, in atomic mode nothing is added if any is invalid"""
+    result = BulkResult()
+    group_ids = {
+        data.group_id for data in students_data.values() if data.group_id
+    }
+    course_ids = {
+        course_id
+        for data in students_data.values()
+        for course_id in data.course_ids or ()
+    }
+    existing_groups = (
+        set(s.user_db.scalars(select(Group.id).where(Group.id.in_(group_ids))))
+        if group_ids
+        else set()
+    )
+    existing_courses = (
+        set(
+            s.user_db.scalars(
+                select(Course.id).where(Course.id.in_(course_ids))
+            )
+        )
+        if course_ids
+        else set()
+    )
+
+    valid_data = {}
+    for index, data in students_data.items():
+        if not data.first_name or not data.last_name:
+            result.errors[index] = "first_name and last_name must be provided"
+        elif data.group_id and data.group_id not in existing_groups:
+            result.errors[index] = f"Group {data.group_id} don't exist"
+        elif set(data.course_ids or ()) - existing_courses:
+            ids = set(data.course_ids or ()) - existing_courses
+            result.errors[index] = f"There is no courses with this ids {ids}"
+        else:
+            valid_data[index] = data
+    if not valid_data or (atomic and result.errors):
+        return result
+
+    student_ids = s.user_db.scalars(
+        insert(Student).returning(Student.id, sort_by_parameter_order=True),
+        [
+            {
+                "first_name": data.first_name,
+                "last_name": data.last_name,
+                "group_id": data.group_id or None,
+            }
+            for data in valid_data.values()
+        ],
+    ).all()
+    result.created = dict(zip(valid_data, student_ids))
+
+    enrollments = [
+        {"student_id": student_id, "course_id": course_id}
+        for index, student_id in result.created.items()
+        for course_id in dict.fromkeys(valid_data[index].course_ids or ())
+    ]
+    if enrollments:
+        s.user_db.execute(insert(StudentToCourse), enrollments)
+    return result
+
+
+@transaction
+def update_student_fields(
+    student_id: int, fields: dict[str, t.Any]
+) -> Row[t.Any] | None:
+    """This function updates scalar fields of student with one UPDATE ...
+    RETURNING without loading it first, returned row holds only student
+    columns, None if student don't exist"""
+    statement = (
+        update(Student)
+        .where(Student.id == student_id)
+        .values(**fields)
+        .returning(
+            Student.id, Student.first_name, Student.last_name, Student.group_id
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return s.user_db.execute(statement).one_or_none()
+
+
 @transaction
 def update_student(
     student: Student, request_data: StudentRequest, action: str | None
@@ -82,13 +289,7 @@ def update_student(
             student.group_id = None
 
         if request_data.course_ids is not None:
-            courses = _get_course_by_ids_student(
-                request_data.course_ids,
-                student_id=student.id,
-                with_student=True,
-            )
-            for course in courses:
-                student.courses.remove(course)
+            _remove_courses_from_student(student, request_data.course_ids)
 
         return student
 
@@ -112,8 +313,12 @@ def update_student(
 
 
 @transaction
-def put_student(student: Student, request_data: StudentRequest) -> Student:
-    """This function entirely change the student in the database"""
+def put_student(
+    student: Student, request_data: StudentRequest
+) -> tuple[Student, int]:
+    """This function entirely change the student in the database, only
+    difference between old and new courses is written. Returns student and
+    amount of touched enrollment rows"""
     student = set_value_to_model(
         student,
         request_data={
@@ -121,10 +326,10 @@ def put_student(student: Student, request_data: StudentRequest) -> Student:
             "last_name": request_data.last_name,
         },
     )
-    student.courses.clear()
-    assert request_data.course_ids
-    courses = get_course_by_ids(request_data.course_ids)
-    student.courses.extend(courses)
+    assert request_data.course_ids is not None
+    missing = get_missing_ids(Course.id, request_data.course_ids)
+    if missing:
+        raise ValueError(f"There is no courses with this ids {missing}")
 
     assert request_data.group_id
     group = get_group(request_data.group_id)
@@ -132,12 +337,52 @@ def put_student(student: Student, request_data: StudentRequest) -> Student:
         raise ValueError(f"Group {request_data.group_id} don't exist")
     student.group = group
 
-    return student
+    rows_touched = replace_enrollments(
+        StudentToCourse.student_id,
+        student.id,
+        StudentToCourse.course_id,
+        request_data.course_ids,
+    )
+    s.user_db.expire(student, ["courses"])
 
+    return student, rows_touched
+
+
+def delete_student(student_id: int) -> bool:
+    """This function deletes student with one DELETE ... RETURNING without
+    loading it, enrollments are removed by ON DELETE CASCADE in database.
+    Returns False if student don't exist"""
+    statement = (
+        delete(Student)
+        .where(Student.id == student_id)
+        .returning(Student.id)
+        .execution_options(synchronize_session=False)
+    )
+    return s.user_db.scalar(statement) is not None
 
-def delete_student(student: Student) -> None:
-    """This function delete student from database"""
-    s.user_db.delete(student)
+
+def _remove_courses_from_student(
+    student: Student, course_ids: list[int]
+) -> None:
+    """This function removes student from courses with one DELETE without
+    loading student courses, ValueError raised if student is not assigned to
+    some of them"""
+    statement = (
+        delete(StudentToCourse)
+        .where(
+            StudentToCourse.student_id == student.id,
+            StudentToCourse.course_id == any_(int_array(course_ids)),
+        )
+        .returning(StudentToCourse.course_id)
+        .execution_options(synchronize_session=False)
+    )
+    missing = set(course_ids) - set(s.user_db.scalars(statement))
+    if missing:
+        raise ValueError(
+            f"There is no courses {missing} which assigned "
+            f"student {student.id}"
+        )
+    s.user_db.expire(student, ["courses"])
 
 
 def _get_course_by_ids_student(
@@ -1,12 +1,37 @@
 import typing as t
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Text,
+    any_,
+    cast,
+    func,
+    inspect,
+    literal,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.orm import (
+    InstrumentedAttribute,
+    joinedload,
+    noload,
+    selectinload,
+)
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from app.db.models import Course, Student
 from app.db.models.base import Base
 from app.db.session import s
+from app.db.transaction import transaction
 
 M = t.TypeVar("M", bound=Base)
+T = t.TypeVar("T")
+
+
+class PreconditionFailed(Exception):
+    pass
 
 
 def set_value_to_model(model: M, request_data: dict[str, t.Any]) -> M:
@@ -17,6 +42,46 @@ def set_value_to_model(model: M, request_data: dict[str, t.Any]) -> M:
     return model
 
 
+def int_array(values: t.Iterable[int]) -> ColumnElement[list[int]]:
+    """This function binds ids as one integer array parameter, so statement
+    has the same text for any amount of ids"""
+    return literal(list(values), ARRAY(Integer))
+
+
+def get_missing_ids(
+    column: InstrumentedAttribute[int], ids: t.Collection[int]
+) -> set[int]:
+    """This function returns ids which have no row, only ids are selected"""
+    existing = s.user_db.scalars(
+        select(column).where(column == any_(int_array(ids)))
+    )
+    return set(ids) - set(existing)
+
+
+def relationship_options(
+    model: type[Base], include: t.Collection[str]
+) -> list[LoaderOption]:
+    """This function returns loader options which eagerly load included
+    relationships, collections with separate SELECT IN and many-to-one with
+    JOIN, the rest are not loaded at all. ValueError raised if model has no
+    such relationship"""
+    relationships = inspect(model).relationships
+    unknown = set(include) - set(relationships.keys())
+    if unknown:
+        raise ValueError(f"There is no relationships {unknown}")
+
+    options: list[LoaderOption] = []
+    for name, relationship in relationships.items():
+        attribute = getattr(model, name)
+        if name not in include:
+            options.append(noload(attribute))
+        elif relationship.uselist:
+            options.append(selectinload(attribute))
+        else:
+            options.append(joinedload(attribute))
+    return options
+
+
 def get_course_by_ids(course_ids: list[int]) -> t.Sequence[Course]:
     """This functions returns courses by provided ids, if there is no some id
     ValueError raised"""
@@ -36,3 +101,39 @@ def get_student_by_ids(student_ids: list[int]) -> t.Sequence[Student]:
         ids = set(student_ids) - {student.id for student in students}
         raise ValueError(f"There is no students with this ids {ids}")
     return students
+
+
+def aggregate_versions(
+    id_column: InstrumentedAttribute[int],
+    version_column: InstrumentedAttribute[int],
+) -> ColumnElement[str]:
+    """This function aggregates id:version pairs of joined rows ordered by
+    id, rows missing in outer join are skipped"""
+    return func.string_agg(
+        cast(id_column, Text) + ":" + cast(version_column, Text),
+        aggregate_order_by(literal_column("','"), id_column),
+    )
+
+
+def versions_digest(
+    *versions: ColumnElement[t.Any] | InstrumentedAttribute[t.Any],
+) -> ColumnElement[str]:
+    """This function returns md5 of versions of entity and related rows, it
+    changes whenever any row of entity representation changes"""
+    return func.md5(func.concat_ws("|", *versions))
+
+
+@transaction
+def write_if_match(
+    get_etag: t.Callable[[], str | None],
+    if_match: t.Collection[str],
+    write: t.Callable[[], T],
+) -> T:
+    """This function runs write only if current etag is one of if_match,
+    PreconditionFailed raised otherwise. get_etag should lock entity row, so
+    it isn't changed between check and write. Missing entity is left to
+    write to report"""
+    etag = get_etag()
+    if etag is not None and etag not in if_match:
+        raise PreconditionFailed(f"Current ETag is {etag}")
+    return write()
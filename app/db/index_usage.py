@@ -0,0 +1,75 @@
+import typing as t
+
+from sqlalchemy import Connection, text
+
+from app.configs import INDEX_REPORT_MIN_INDEX_USAGE, INDEX_REPORT_MIN_ROWS
+
+# Indexes behind primary key, unique and exclusion constraints are needed
+# even if never scanned, so only plain indexes are reported.
+UNUSED_INDEXES = text(
+    """
+    SELECT stat.relname AS table_name,
+           stat.indexrelname AS index_name,
+           stat.idx_scan AS scans,
+           pg_relation_size(stat.indexrelid) AS size_bytes
+    FROM pg_stat_user_indexes AS stat
+    JOIN pg_index AS ind ON ind.indexrelid = stat.indexrelid
+    WHERE stat.idx_scan <= :max_scans
+      AND NOT ind.indisunique
+      AND NOT EXISTS (
+          SELECT FROM pg_constraint WHERE conindid = stat.indexrelid
+      )
+    ORDER BY pg_relation_size(stat.indexrelid) DESC, stat.indexrelname
+    """
+)
+
+SEQ_SCAN_TABLES = text(
+    """
+    SELECT relname AS table_name,
+           n_live_tup AS live_rows,
+           seq_scan,
+           seq_tup_read,
+           coalesce(idx_scan, 0) AS idx_scan,
+           round(
+               100.0 * coalesce(idx_scan, 0)
+               / nullif(seq_scan + coalesce(idx_scan, 0), 0),
+               1
+           ) AS index_usage
+    FROM pg_stat_user_tables
+    WHERE seq_scan > 0
+      AND n_live_tup >= :min_rows
+      AND 100.0 * coalesce(idx_scan, 0)
+          < :min_index_usage * (seq_scan + coalesce(idx_scan, 0))
+    ORDER BY seq_tup_read DESC, relname
+    """
+)
+
+
+def find_unused_indexes(
+    connection: Connection, max_scans: int = 0
+) -> list[dict[str, t.Any]]:
+    """This function returns plain indexes scanned at most max_scans times
+    since statistics reset, the largest go first"""
+    return [
+        dict(row)
+        for row in connection.execute(
+            UNUSED_INDEXES, {"max_scans": max_scans}
+        ).mappings()
+    ]
+
+
+def find_seq_scan_tables(
+    connection: Connection,
+    min_rows: int = INDEX_REPORT_MIN_ROWS,
+    min_index_usage: float = INDEX_REPORT_MIN_INDEX_USAGE,
+) -> list[dict[str, t.Any]]:
+    """This function returns tables with at least min_rows rows which are
+    read by sequential scans in more than 100 - min_index_usage percent of
+    scans, tables with the most rows read sequentially go first"""
+    return [
+        dict(row)
+        for row in connection.execute(
+            SEQ_SCAN_TABLES,
+            {"min_rows": min_rows, "min_index_usage": min_index_usage},
+        ).mappings()
+    ]
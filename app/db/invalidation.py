@@ -0,0 +1,228 @@
+import logging
+import typing as t
+
+from sqlalchemy import Delete, Insert, UpdateBase, event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+
+log = logging.getLogger(__name__)
+
+TAGS_KEY = "invalidated_tags"
+CHANGED_ROWS_OPTION = "changed_rows"
+ANY_ID = "*"
+LIST_ID = "list"
+
+# Entities a row of table belongs to and columns holding their ids, the
+# first pair identifies the row itself
+ROW_TAGS: dict[str, tuple[tuple[str, str], ...]] = {
+    "students": (("student", "id"), ("group", "group_id")),
+    "groups": (("group", "id"),),
+    "courses": (("course", "id"),),
+    "student_to_course": (
+        ("student", "student_id"),
+        ("course", "course_id"),
+    ),
+}
+ENTITY_TABLES = {"students", "groups", "courses"}
+
+InvalidationListener = t.Callable[[set[str]], None]
+invalidation_listeners: list[InvalidationListener] = []
+
+
+def tag(kind: str, entity_id: t.Any) -> str:
+    """This function returns tag of entity, cached values built from the
+    entity are marked with it. Id * stands for any entity of kind and list
+    for set of entities of kind"""
+    return f"{kind}:{entity_id}"
+
+
+def add_invalidation_listener(listener: InvalidationListener) -> None:
+    """This function registers callable receiving tags of changed entities,
+    it is called when change is written and again when it is committed"""
+    invalidation_listeners.append(listener)
+
+
+def row_tags(
+    table: str, row: t.Mapping[str, t.Any], strict: bool = True
+) -> set[str] | None:
+    """This function returns tags of entities touched by row of table, None
+    if row misses id columns. Strict row must have all of them, otherwise
+    one is enough. Row moved between entities changes both of them, so
+    changed rows name it with old and with new ids"""
+    columns = ROW_TAGS[table]
+    present = [(kind, column) for kind, column in columns if column in row]
+    if not present or (strict and len(present) < len(columns)):
+        return None
+    return {
+        tag(kind, row[column])
+        for kind, column in present
+        if row[column] is not None
+    }
+
+
+def table_tags(table: str, membership: bool) -> set[str]:
+    """This function returns tags of any entity stored in table, used when
+    changed rows aren't known"""
+    tags = {tag(kind, ANY_ID) for kind, _ in ROW_TAGS[table]}
+    return tags | list_tags(table, membership)
+
+
+def list_tags(table: str, membership: bool) -> set[str]:
+    """This function returns tag of entities list of table if rows were
+    added or removed"""
+    if not membership or table not in ENTITY_TABLES:
+        return set()
+    return {tag(ROW_TAGS[table][0][0], LIST_ID)}
+
+
+def changed_rows(
+    model: t.Any, rows: t.Iterable[t.Mapping[str, t.Any]]
+) -> dict[str, t.Any]:
+    """This function returns execution options naming rows of model changed
+    by statement, for statements which changed rows can't be read from"""
+    return {CHANGED_ROWS_OPTION: {model.__tablename__: list(rows)}}
+
+
+def invalidate(session: Session, tags: set[str]) -> None:
+    """This function notifies listeners about changed entities and keeps
+    tags till commit of session transaction"""
+    if not tags:
+        return
+    session.info.setdefault(TAGS_KEY, set()).update(tags)
+    _notify(tags)
+
+
+def _notify(tags: set[str]) -> None:
+    for listener in invalidation_listeners:
+        try:
+            listener(tags)
+        except Exception:
+            log.exception("Error in invalidation listener")
+
+
+def _row_tags_of(obj: t.Any, membership: bool) -> set[str]:
+    # Only loaded attributes are read, not loaded foreign key wasn't changed
+    state = inspect(obj)
+    table = state.mapper.local_table.name
+    if table not in ROW_TAGS:
+        return set()
+    tags = row_tags(table, state.dict, strict=False)
+    if tags is None:
+        return table_tags(table, membership)
+    # Entity the row is moved from changes as well as one it is moved to
+    for kind, column in ROW_TAGS[table]:
+        if column in state.mapper.column_attrs:
+            tags |= {
+                tag(kind, entity_id)
+                for entity_id in state.attrs[column].history.deleted
+                if entity_id is not None
+            }
+    return tags | list_tags(table, membership)
+
+
+def _object_tags(obj: t.Any, membership: bool) -> set[str]:
+    tags = _row_tags_of(obj, membership)
+    state = inspect(obj)
+    for relationship in state.mapper.relationships:
+        history = state.attrs[relationship.key].history
+        for related in (*history.added, *history.deleted):
+            tags |= _row_tags_of(related, membership=False)
+    return tags
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context: UOWTransaction) -> None:
+    tags: set[str] = set()
+    for obj in (*session.new, *session.deleted):
+        tags |= _object_tags(obj, membership=True)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tags |= _object_tags(obj, membership=False)
+    invalidate(session, tags)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed(orm_execute_state: ORMExecuteState) -> t.Any:
+    """Rows changed by INSERT, UPDATE or DELETE statement are found in its
+    parameters or RETURNING, whole table is invalidated if they aren't
+    there. Statements changing data in CTE aren't recognized, they should
+    name changed rows with changed_rows options"""
+    changed_rows = orm_execute_state.execution_options.get(CHANGED_ROWS_OPTION)
+    if changed_rows is not None:
+        tags: set[str] = set()
+        for changed_table, changed in changed_rows.items():
+            tags |= _rows_tags(
+                changed_table, changed, strict=False, membership=True
+            )
+        invalidate(orm_execute_state.session, tags)
+        return None
+
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return None
+    statement = t.cast(UpdateBase, orm_execute_state.statement)
+    table = getattr(statement.table, "name", None)
+    if table not in ROW_TAGS:
+        return None
+    membership = isinstance(statement, (Insert, Delete))
+
+    # Entities which inserted rows join are in parameters, nothing cached
+    # depends on new row itself
+    result = None
+    strict = not isinstance(statement, Delete)
+    rows: t.Sequence[t.Mapping[t.Any, t.Any]] | None = None
+    parameters = orm_execute_state.parameters
+    if isinstance(statement, Insert) and parameters:
+        strict = False
+        rows = (
+            parameters
+            if isinstance(parameters, t.Sequence)
+            else [t.cast(t.Mapping[str, t.Any], parameters)]
+        )
+    elif statement.exported_columns:
+        frozen = orm_execute_state.invoke_statement().freeze()
+        rows = frozen().mappings().all()
+        result = frozen()
+
+    invalidate(
+        orm_execute_state.session,
+        _rows_tags(
+            table,
+            rows,
+            strict=strict,
+            membership=membership,
+        )
+        if rows is not None
+        else table_tags(table, membership),
+    )
+    return result
+
+
+def _rows_tags(
+    table: str,
+    rows: t.Iterable[t.Mapping[t.Any, t.Any]],
+    strict: bool,
+    membership: bool,
+) -> set[str]:
+    tags: set[str] = set()
+    for row in rows:
+        tags_of_row = row_tags(table, row, strict)
+        if tags_of_row is None:
+            return table_tags(table, membership)
+        tags |= tags_of_row
+    return tags | list_tags(table, membership) if tags else tags
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    tags = session.info.pop(TAGS_KEY, None)
+    if tags:
+        _notify(tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back(session: Session, previous_transaction: t.Any) -> None:
+    if not session.in_transaction():
+        session.info.pop(TAGS_KEY, None)
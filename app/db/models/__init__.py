@@ -3,3 +3,6 @@ from .course import Course
 from .group import Group
 from .student import Student
 from .student_course_association import StudentToCourse
+from .search import STUDENT_NAME_INDEX
+from .stats import course_stats, group_stats, student_stats
+from .triggers import STUDENT_COUNT_FUNCTION
@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING
 
+from sqlalchemy import Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.models.base import Base
@@ -13,17 +14,37 @@ if TYPE_CHECKING:
 
 class Course(Base):
     __tablename__ = "courses"
+    # Serve student amount filter, which is ordered by count and id, and
+    # name prefix filter of courses list
+    __table_args__ = (
+        Index("ix_courses_student_count_id", "student_count", "id"),
+        Index(
+            "ix_courses_name_pattern",
+            "name",
+            postgresql_ops={"name": "varchar_pattern_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     name: Mapped[str] = mapped_column(unique=True)
     description: Mapped[str] = mapped_column()
+    student_count: Mapped[int] = mapped_column(server_default=text("0"))
+    # Incremented by database trigger on every change of the row
+    version: Mapped[int] = mapped_column(server_default=text("1"))
 
     students: Mapped[list["Student"]] = relationship(
         secondary=StudentToCourse.__table__,
         back_populates="courses",
         join_depth=1,
+        passive_deletes=True,
+        order_by="Student.id",
     )
 
+    __mapper_args__ = {
+        "version_id_col": version,
+        "version_id_generator": False,
+    }
+
     def __repr__(self) -> str:
         return f"Course({self.id}, {self.name}, {self.description})"
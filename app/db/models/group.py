@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String
+from sqlalchemy import Index, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.models.base import Base
@@ -11,14 +11,36 @@ if TYPE_CHECKING:
 
 class Group(Base):
     __tablename__ = "groups"
+    # Serve student amount filter, which is ordered by count and id, and
+    # name prefix filter of groups list
+    __table_args__ = (
+        Index("ix_groups_student_count_id", "student_count", "id"),
+        Index(
+            "ix_groups_name_pattern",
+            "name",
+            postgresql_ops={"name": "varchar_pattern_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     name: Mapped[str] = mapped_column(String(5), unique=True)
+    student_count: Mapped[int] = mapped_column(server_default=text("0"))
+    # Incremented by database trigger on every change of the row
+    version: Mapped[int] = mapped_column(server_default=text("1"))
 
+    # Ordered, so ORM loads and row reads list students the same way
     students: Mapped[list["Student"]] = relationship(
-        back_populates="group", join_depth=1
+        back_populates="group",
+        join_depth=1,
+        passive_deletes=True,
+        order_by="Student.id",
     )
 
+    __mapper_args__ = {
+        "version_id_col": version,
+        "version_id_generator": False,
+    }
+
     def __repr__(self) -> str:
         return f"Group({self.id}, {self.name})"
@@ -0,0 +1,62 @@
+import typing as t
+
+from sqlalchemy import DDL, ColumnElement, event, literal_column, text
+from sqlalchemy.engine import Connection
+
+from app.db.models.student import Student
+
+TRGM_EXTENSION = "pg_trgm"
+STUDENT_NAME_INDEX = "ix_students_full_name_trgm"
+
+# Planner uses expression index only for the same expression, so search
+# query builds it with student_full_name from the same parts.
+STUDENT_FULL_NAME = "(first_name || ' ' || last_name)"
+
+CREATE_TRGM_EXTENSION = f"CREATE EXTENSION IF NOT EXISTS {TRGM_EXTENSION}"
+CREATE_STUDENT_NAME_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS {STUDENT_NAME_INDEX} ON students "
+    f"USING gin ({STUDENT_FULL_NAME} gin_trgm_ops)"
+)
+
+
+def student_full_name() -> ColumnElement[str]:
+    """This function returns first and last name expression covered by
+    trigram index"""
+    # Grouped, because || and <% operators have the same precedence
+    return (
+        Student.first_name + literal_column("' '") + Student.last_name
+    ).self_group()
+
+
+def trgm_available(connection: Connection) -> bool:
+    """This function checks if pg_trgm extension can be created on the
+    server, so schema still builds where contrib modules aren't installed"""
+    return bool(
+        connection.scalar(
+            text(
+                "SELECT EXISTS "
+                "(SELECT FROM pg_available_extensions WHERE name = :name)"
+            ),
+            {"name": TRGM_EXTENSION},
+        )
+    )
+
+
+def _if_trgm_available(
+    ddl: t.Any,
+    target: t.Any,
+    bind: Connection | None,
+    *args: t.Any,
+    **kw: t.Any,
+) -> bool:
+    return bind is None or trgm_available(bind)
+
+
+for statement in (CREATE_TRGM_EXTENSION, CREATE_STUDENT_NAME_INDEX):
+    event.listen(
+        Student.__table__,
+        "after_create",
+        DDL(statement).execute_if(
+            dialect="postgresql", callable_=_if_trgm_available
+        ),
+    )
@@ -0,0 +1,123 @@
+from sqlalchemy import (
+    DDL,
+    DateTime,
+    Float,
+    Integer,
+    String,
+    column,
+    event,
+    table,
+)
+
+from app.db.models.base import Base
+
+# Views aren't part of metadata tables, these clauses are used to query them
+course_stats = table(
+    "course_stats",
+    column("course_id", Integer),
+    column("name", String),
+    column("students", Integer),
+)
+group_stats = table(
+    "group_stats",
+    column("group_id", Integer),
+    column("name", String),
+    column("students", Integer),
+)
+student_stats = table(
+    "student_stats",
+    column("students", Integer),
+    column("unassigned_students", Integer),
+    column("enrollments", Integer),
+    column("students_without_courses", Integer),
+    column("average_courses_per_student", Float),
+    column("refreshed_at", DateTime(timezone=True)),
+)
+
+# Name, query and unique key. REFRESH ... CONCURRENTLY needs a unique index,
+# single row student_stats gets a constant key for it.
+STATS_VIEWS = (
+    (
+        "course_stats",
+        """
+        SELECT courses.id AS course_id,
+               courses.name,
+               count(student_to_course.student_id) AS students
+        FROM courses
+        LEFT JOIN student_to_course
+            ON student_to_course.course_id = courses.id
+        GROUP BY courses.id
+        """,
+        "course_id",
+    ),
+    (
+        "group_stats",
+        """
+        SELECT groups.id AS group_id,
+               groups.name,
+               count(students.id) AS students
+        FROM groups
+        LEFT JOIN students ON students.group_id = groups.id
+        GROUP BY groups.id
+        """,
+        "group_id",
+    ),
+    (
+        "student_stats",
+        """
+        SELECT 1 AS id,
+               totals.*,
+               coalesce(
+                   totals.enrollments::float / nullif(totals.students, 0), 0
+               ) AS average_courses_per_student,
+               now() AS refreshed_at
+        FROM (
+            SELECT (SELECT count(*) FROM students) AS students,
+                   (SELECT count(*) FROM students WHERE group_id IS NULL)
+                       AS unassigned_students,
+                   (SELECT count(*) FROM student_to_course) AS enrollments,
+                   (
+                       SELECT count(*) FROM students
+                       WHERE NOT EXISTS (
+                           SELECT FROM student_to_course
+                           WHERE student_to_course.student_id = students.id
+                       )
+                   ) AS students_without_courses
+        ) AS totals
+        """,
+        "id",
+    ),
+)
+
+
+def stats_views_ddl() -> list[DDL]:
+    """This function returns statements creating statistics views with
+    unique indexes"""
+    statements = []
+    for name, query, key in STATS_VIEWS:
+        statements.append(
+            DDL(f"CREATE MATERIALIZED VIEW {name} AS {query} WITH DATA")
+        )
+        statements.append(
+            DDL(f"CREATE UNIQUE INDEX ix_{name}_{key} ON {name} ({key})")
+        )
+    return statements
+
+
+def drop_stats_views_ddl() -> list[DDL]:
+    """This function returns statements dropping statistics views"""
+    return [
+        DDL(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
+        for name, _, _ in STATS_VIEWS
+    ]
+
+
+for ddl in stats_views_ddl():
+    event.listen(
+        Base.metadata, "after_create", ddl.execute_if(dialect="postgresql")
+    )
+# Views depend on tables, so they are dropped first
+for ddl in drop_stats_views_ddl():
+    event.listen(
+        Base.metadata, "before_drop", ddl.execute_if(dialect="postgresql")
+    )
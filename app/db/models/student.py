@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.models.base import Base
@@ -15,12 +15,31 @@ if TYPE_CHECKING:
 
 class Student(Base):
     __tablename__ = "students"
+    # Serve group members lookups and SET NULL of group_id on group delete,
+    # sort by last name and name prefix filters of students list
+    __table_args__ = (
+        Index("ix_students_group_id_id", "group_id", "id"),
+        Index("ix_students_last_name_id", "last_name", "id"),
+        Index(
+            "ix_students_last_name_pattern",
+            "last_name",
+            postgresql_ops={"last_name": "varchar_pattern_ops"},
+        ),
+        Index(
+            "ix_students_first_name_pattern",
+            "first_name",
+            postgresql_ops={"first_name": "varchar_pattern_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     first_name: Mapped[str] = mapped_column()
     last_name: Mapped[str] = mapped_column()
 
+    # Incremented by database trigger on every change of the row
+    version: Mapped[int] = mapped_column(server_default=text("1"))
+
     group_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("groups.id", ondelete="SET NULL"), nullable=True
     )
@@ -30,8 +49,15 @@ class Student(Base):
         secondary=StudentToCourse.__table__,
         back_populates="students",
         join_depth=1,
+        passive_deletes=True,
+        order_by="Course.id",
     )
 
+    __mapper_args__ = {
+        "version_id_col": version,
+        "version_id_generator": False,
+    }
+
     def __repr__(self) -> str:
         return (
             f"Student({self.id},"
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.models.base import Base
@@ -6,6 +6,15 @@ from app.db.models.base import Base
 
 class StudentToCourse(Base):
     __tablename__ = "student_to_course"
+    # Primary key leads with student_id, course side lookups and cascades
+    # use this one
+    __table_args__ = (
+        Index(
+            "ix_student_to_course_course_id_student_id",
+            "course_id",
+            "student_id",
+        ),
+    )
 
     student_id: Mapped[int] = mapped_column(
         ForeignKey("students.id", ondelete="CASCADE"), primary_key=True
@@ -0,0 +1,117 @@
+from sqlalchemy import DDL, event
+
+from app.db.models.base import Base
+
+STUDENT_COUNT_FUNCTION = "maintain_student_count"
+
+# Statement level triggers see all changed rows in transition tables, so bulk
+# inserts, deletes and reassignments update every counter once per statement.
+# TG_ARGV holds counter table and foreign key column of the changed table.
+CREATE_STUDENT_COUNT_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {STUDENT_COUNT_FUNCTION}() RETURNS trigger AS $$
+DECLARE
+    changes text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := format(
+            'SELECT %%1$I AS id, 1 AS amount FROM new_rows', TG_ARGV[1]
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := format(
+            'SELECT %%1$I AS id, -1 AS amount FROM old_rows', TG_ARGV[1]
+        );
+    ELSE
+        changes := format(
+            'SELECT %%1$I AS id, 1 AS amount FROM new_rows '
+            'UNION ALL SELECT %%1$I, -1 FROM old_rows',
+            TG_ARGV[1]
+        );
+    END IF;
+    EXECUTE format(
+        'UPDATE %%1$I SET student_count = %%1$I.student_count + delta.amount '
+        'FROM (SELECT id, sum(amount) AS amount FROM (%%2$s) AS changes '
+        'WHERE id IS NOT NULL GROUP BY id HAVING sum(amount) <> 0) AS delta '
+        'WHERE %%1$I.id = delta.id',
+        TG_ARGV[0],
+        changes
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+TRIGGER_REFERENCING = {
+    "INSERT": "REFERENCING NEW TABLE AS new_rows",
+    "DELETE": "REFERENCING OLD TABLE AS old_rows",
+    "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+
+STUDENT_COUNT_TRIGGERS = (
+    ("students", "groups", "group_id"),
+    ("student_to_course", "courses", "course_id"),
+)
+
+
+def _create_trigger(
+    table: str, operation: str, counter_table: str, column: str
+) -> DDL:
+    return DDL(
+        f"CREATE TRIGGER {table}_{operation.lower()}_{counter_table}_count "
+        f"AFTER {operation} ON {table} {TRIGGER_REFERENCING[operation]} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION {STUDENT_COUNT_FUNCTION}"
+        f"('{counter_table}', '{column}')"
+    )
+
+
+VERSION_FUNCTION = "bump_version"
+VERSIONED_TABLES = ("students", "groups", "courses")
+
+# Versions are bumped in database, so rows changed by Core statements and
+# by student_count triggers get new version as well as ORM flushes
+CREATE_VERSION_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {VERSION_FUNCTION}() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+DROP_VERSION_FUNCTION = f"DROP FUNCTION IF EXISTS {VERSION_FUNCTION}()"
+
+DROP_STUDENT_COUNT_FUNCTION = (
+    f"DROP FUNCTION IF EXISTS {STUDENT_COUNT_FUNCTION}()"
+)
+
+
+def student_count_ddl() -> list[DDL]:
+    """This function returns counter function and trigger statements"""
+    return [DDL(CREATE_STUDENT_COUNT_FUNCTION)] + [
+        _create_trigger(table, operation, counter_table, column)
+        for table, counter_table, column in STUDENT_COUNT_TRIGGERS
+        for operation in TRIGGER_REFERENCING
+    ]
+
+
+def version_ddl() -> list[DDL]:
+    """This function returns version function and trigger statements, row
+    version changes only if any column of the row changes"""
+    return [DDL(CREATE_VERSION_FUNCTION)] + [
+        DDL(
+            f"CREATE TRIGGER {table}_{VERSION_FUNCTION} BEFORE UPDATE ON "
+            f"{table} FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) "
+            f"EXECUTE FUNCTION {VERSION_FUNCTION}()"
+        )
+        for table in VERSIONED_TABLES
+    ]
+
+
+for ddl in student_count_ddl() + version_ddl():
+    event.listen(
+        Base.metadata, "after_create", ddl.execute_if(dialect="postgresql")
+    )
+for statement in (DROP_STUDENT_COUNT_FUNCTION, DROP_VERSION_FUNCTION):
+    event.listen(
+        Base.metadata,
+        "after_drop",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
@@ -0,0 +1,85 @@
+import threading
+import time
+import typing as t
+from dataclasses import dataclass, field
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    waiting: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def start_wait(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def finish_wait(self, elapsed: float, error: Exception | None) -> None:
+        with self._lock:
+            self.waiting -= 1
+            if isinstance(error, PoolTimeoutError):
+                self.timeouts += 1
+            if error is not None:
+                return
+            self.checkouts += 1
+            self.total_wait += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+
+    def as_dict(self) -> dict[str, t.Any]:
+        with self._lock:
+            avg_wait = self.total_wait / max(self.checkouts, 1)
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waiting": self.waiting,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "avg_checkout_ms": round(avg_wait * 1000, 3),
+                "max_checkout_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool which records how long callers wait for a connection"""
+
+    stats: PoolStats
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        self.stats.start_wait()
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().connect()
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self.stats.finish_wait(time.perf_counter() - start, error)
+
+    def recreate(self) -> "TimedQueuePool":
+        pool = t.cast(TimedQueuePool, super().recreate())
+        pool.stats = self.stats
+        return pool
+
+    def status_dict(self) -> dict[str, t.Any]:
+        """This method returns live pool occupancy together with checkout
+        statistics"""
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "timeout": self.timeout(),
+            **self.stats.as_dict(),
+        }
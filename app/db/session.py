@@ -1,11 +1,23 @@
+import itertools
 import logging
+import time
+import typing as t
+from contextlib import contextmanager
 from contextvars import ContextVar
 from dataclasses import dataclass
 
-from sqlalchemy import Engine, create_engine, select
+from sqlalchemy import Connection, Engine, create_engine, event, select
 from sqlalchemy.orm import Session, SessionTransaction, sessionmaker
 
-from app.configs import BASE_URL, DB_NAME, ENGINE_OPTIONS
+from app.configs import (
+    BASE_URL,
+    DB_NAME,
+    ENGINE_OPTIONS,
+    REPLICA_BALANCING,
+    REPLICA_URLS,
+)
+from app.db import slow_query
+from app.db.pool import TimedQueuePool
 
 log = logging.getLogger(__name__)
 
@@ -15,8 +27,47 @@ class EnginePool:
     engine: Engine
     maker: sessionmaker
 
+    def status(self) -> dict[str, t.Any]:
+        pool = t.cast(TimedQueuePool, self.engine.pool)
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            **pool.status_dict(),
+        }
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_time * 1000:.3f};desc="{self.count} queries",'
+            f" db-slowest;dur={self.slowest_time * 1000:.3f}"
+        )
+
+    def as_dict(self) -> dict[str, t.Any]:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_time * 1000, 3),
+            "slowest_ms": round(self.slowest_time * 1000, 3),
+            "slowest_statement": self.slowest_statement,
+        }
+
 
 session_pools: dict[str, EnginePool] = {}
+replica_counter = itertools.count()
+
+query_stats = ContextVar[QueryStats | None]("query_stats", default=None)
 
 user_db = ContextVar[Session]("user_db")
 user_db_transaction = ContextVar[SessionTransaction | None](
@@ -28,16 +79,101 @@ class SessionExcept(Exception):
     pass
 
 
-def set_session() -> None:
-    current_pool = get_sync_pool(f"{BASE_URL}/{DB_NAME}", ENGINE_OPTIONS)
-    s.user_db = current_pool.maker()
-    s.user_db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+class LazySession:
+    """Session proxy which checks out a pooled connection only on first use,
+    so requests which never touch the database don't hold a connection.
+    Read only sessions are opened on a replica chosen at that moment"""
+
+    def __init__(
+        self, db_url: str, options: dict, read_only: bool = False
+    ) -> None:
+        self._db_url = db_url
+        self._options = options
+        self._read_only = read_only
+        self._session: Session | None = None
+
+    @property
+    def is_used(self) -> bool:
+        return self._session is not None
+
+    @property
+    def read_only(self) -> bool:
+        return self._read_only
+
+    def use_primary(self) -> None:
+        """This method reroutes read only session to the primary, session
+        which was already opened on replica is closed"""
+        if not self._read_only:
+            return
+        self._read_only = False
+        if self._session is not None:
+            log.warning("Write in read only session, switching to primary")
+            self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            db_url = get_read_url() if self._read_only else self._db_url
+            current_pool = get_sync_pool(db_url, self._options)
+            self._session = current_pool.maker()
+            self._session.connection(
+                execution_options={"isolation_level": "AUTOCOMMIT"}
+            )
+        return self._session
+
+    def __getattr__(self, name: str) -> t.Any:
+        return getattr(self.session, name)
+
+
+def set_session(read_only: bool = False) -> None:
+    s.user_db = t.cast(
+        Session,
+        LazySession(f"{BASE_URL}/{DB_NAME}", ENGINE_OPTIONS, read_only),
+    )
+
+
+def use_primary() -> None:
+    """This function makes sure that current session works with primary"""
+    if isinstance(s.user_db, LazySession):
+        s.user_db.use_primary()
+
+
+def get_request_db_url() -> str:
+    """This function returns replica url for read only request and primary
+    url otherwise"""
+    session = user_db.get(None)
+    if isinstance(session, LazySession) and session.read_only:
+        return get_read_url()
+    return f"{BASE_URL}/{DB_NAME}"
+
+
+def get_read_url() -> str:
+    """This function returns replica url chosen by REPLICA_BALANCING strategy,
+    primary url is returned if there are no replicas"""
+    if not REPLICA_URLS:
+        return f"{BASE_URL}/{DB_NAME}"
+
+    replica_urls = [f"{url}/{DB_NAME}" for url in REPLICA_URLS]
+    if REPLICA_BALANCING == "least_connections":
+        return min(replica_urls, key=_checked_out_connections)
+    return replica_urls[next(replica_counter) % len(replica_urls)]
+
+
+def _checked_out_connections(db_url: str) -> int:
+    db_engine = session_pools.get(db_url)
+    if not db_engine:
+        return 0
+    return t.cast(TimedQueuePool, db_engine.engine.pool).checkedout()
 
 
 def get_sync_pool(db_url: str, options: dict) -> EnginePool:
     db_engine = session_pools.get(db_url)
     if not db_engine:
-        auto_engine = create_engine(db_url, **options)
+        auto_engine = create_engine(
+            db_url, poolclass=TimedQueuePool, **options
+        )
+        instrument_engine(auto_engine)
         _check_connection(auto_engine)
         auto_maker = _create_sessionmaker(auto_engine)
 
@@ -48,6 +184,51 @@ def get_sync_pool(db_url: str, options: dict) -> EnginePool:
     return db_engine
 
 
+def start_query_stats() -> QueryStats:
+    """This function starts collecting statistics of queries executed in
+    current context"""
+    stats = QueryStats()
+    query_stats.set(stats)
+    return stats
+
+
+def instrument_engine(engine: Engine) -> None:
+    """This function registers engine events which time every statement and
+    record it to the query statistics of current context"""
+    event.listen(engine, "before_cursor_execute", _start_query_timer)
+    event.listen(engine, "after_cursor_execute", _record_query)
+
+
+def _start_query_timer(
+    conn: Connection,
+    cursor: t.Any,
+    statement: str,
+    parameters: t.Any,
+    context: t.Any,
+    executemany: bool,
+) -> None:
+    # Start time lives on execution context of the statement, so it is
+    # dropped with the context when statement fails
+    context._query_start_time = time.perf_counter()
+
+
+def _record_query(
+    conn: Connection,
+    cursor: t.Any,
+    statement: str,
+    parameters: t.Any,
+    context: t.Any,
+    executemany: bool,
+) -> None:
+    elapsed = time.perf_counter() - context._query_start_time
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    slow_query.slow_query_log.record(
+        conn, statement, parameters, context, executemany, elapsed
+    )
+
+
 def _check_connection(engine: Engine) -> None:
     try:
         with engine.connect() as conn:
@@ -63,6 +244,8 @@ def _create_sessionmaker(engine: Engine) -> sessionmaker:
 
 
 def pop_session() -> None:
+    if isinstance(s.user_db, LazySession) and not s.user_db.is_used:
+        return
     try:
         s.user_db.commit()
     except Exception as e:
@@ -72,6 +255,19 @@ def pop_session() -> None:
         s.user_db.close()
 
 
+@contextmanager
+def stream_session(db_url: str) -> t.Iterator[Session]:
+    """This context manager opens session which is independent of request
+    session, so response can be streamed after request is torn down. It is
+    not in autocommit mode, server side cursors live inside its transaction"""
+    session = get_sync_pool(db_url, ENGINE_OPTIONS).maker()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
 def close_dbs() -> None:
     for ses_pool in session_pools.values():
         ses_pool.engine.dispose()
@@ -91,7 +287,7 @@ class Sessions:
         return user_db_transaction.get()
 
     @user_db_transaction.setter
-    def user_db_transaction(self, value: SessionTransaction) -> None:
+    def user_db_transaction(self, value: SessionTransaction | None) -> None:
         user_db_transaction.set(value)
 
 
@@ -0,0 +1,312 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import typing as t
+from logging.handlers import RotatingFileHandler
+from types import FrameType
+
+from sqlalchemy import Connection, Engine, NullPool, create_engine
+
+from app.configs import (
+    SLOW_QUERY_EXPLAIN_QUEUE_SIZE,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_LOG_BACKUPS,
+    SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_LOG_MAX_BYTES,
+    SLOW_QUERY_THRESHOLD_MS,
+)
+
+log = logging.getLogger(__name__)
+
+CRUD_MODULE_PREFIX = "app.crud."
+EXPLAIN_OPTION = "slow_query_explain"
+# Statements EXPLAIN accepts, only reads among them are run with ANALYZE
+EXPLAINABLE_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+READ_STATEMENTS = ("SELECT", "WITH")
+
+_ROW_LOCK_PATTERN = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.I
+)
+_WRITE_PATTERN = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.I)
+
+_NORMALIZE_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+(?:::\w+(?:\[\])?)?"), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+def fingerprint(statement: str) -> str:
+    """This function returns hash of statement with literals and bind
+    parameters stripped, so one query shape has one fingerprint"""
+    normalized = statement
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip().lower()
+    return hashlib.md5(normalized.encode()).hexdigest()[:16]
+
+
+def redact_parameters(parameters: t.Any) -> t.Any:
+    """This function replaces parameter values by their type names"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    return type(parameters).__name__
+
+
+def find_crud_caller() -> str | None:
+    """This function returns the innermost app.crud function on the call
+    stack"""
+    frame: FrameType | None = sys._getframe()
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(CRUD_MODULE_PREFIX):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def is_read_only(statement: str, context: t.Any) -> bool:
+    """This function checks if statement only reads rows, so running it
+    once more by EXPLAIN ANALYZE has no effects. Writes, row locks and
+    writes in WITH queries are not reads"""
+    if context is not None and (
+        context.isinsert or context.isupdate or context.isdelete
+    ):
+        return False
+    if not statement.lstrip().upper().startswith(READ_STATEMENTS):
+        return False
+    if _ROW_LOCK_PATTERN.search(statement):
+        return False
+    return not _WRITE_PATTERN.search(statement)
+
+
+class SlowQueryLog:
+    """Writes statements slower than threshold to a rotating file, sampled
+    ones get plan captured on a separate connection in a background thread.
+    Reads are explained with ANALYZE and BUFFERS, writes and locking reads
+    only with estimates, as ANALYZE would run them again. Explain queue is
+    bounded, when it is full sample is written without plan and counted in
+    dropped_explains"""
+
+    def __init__(
+        self,
+        path: str,
+        threshold_ms: float,
+        explain_sample_rate: float,
+        max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+        backups: int = SLOW_QUERY_LOG_BACKUPS,
+        explain_queue_size: int = SLOW_QUERY_EXPLAIN_QUEUE_SIZE,
+    ) -> None:
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.explain_sample_rate = explain_sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._logger: logging.Logger | None = None
+        self._lock = threading.Lock()
+        self._explain_engines: dict[str, Engine] = {}
+        self._samples: queue.Queue[
+            tuple[dict[str, t.Any], str, str, t.Any, bool]
+        ] = queue.Queue(maxsize=explain_queue_size)
+        self._worker: threading.Thread | None = None
+        self._worker_pid: int | None = None
+        self.dropped_explains = 0
+
+    @property
+    def logger(self) -> logging.Logger:
+        with self._lock:
+            if self._logger is None:
+                logger = logging.getLogger(f"{__name__}.{self.path}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                handler = RotatingFileHandler(
+                    self.path,
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backups,
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._logger = logger
+        return self._logger
+
+    def record(
+        self,
+        conn: Connection,
+        statement: str,
+        parameters: t.Any,
+        context: t.Any,
+        executemany: bool,
+        elapsed: float,
+    ) -> None:
+        if elapsed < self.threshold:
+            return
+        if conn.get_execution_options().get(EXPLAIN_OPTION):
+            return
+
+        entry = {
+            "ts": time.time(),
+            "fingerprint": fingerprint(statement),
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": statement,
+            "parameters": redact_parameters(parameters),
+            "caller": find_crud_caller(),
+        }
+        if (
+            not executemany
+            and statement.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS)
+            and random.random() < self.explain_sample_rate
+        ):
+            if self._submit_explain(
+                entry,
+                conn.engine.url.render_as_string(hide_password=False),
+                statement,
+                parameters,
+                is_read_only(statement, context),
+            ):
+                return
+        self.write(entry)
+
+    def write(self, entry: dict[str, t.Any]) -> None:
+        self.logger.info(json.dumps(entry, default=str))
+
+    def flush(self) -> None:
+        """This method waits until all submitted plans are written"""
+        self._samples.join()
+
+    def _submit_explain(
+        self,
+        entry: dict[str, t.Any],
+        db_url: str,
+        statement: str,
+        parameters: t.Any,
+        analyze: bool,
+    ) -> bool:
+        """This method queues sample for the explain thread, False returned
+        if queue is full and the sample is dropped"""
+        self._start_worker()
+        try:
+            self._samples.put_nowait(
+                (entry, db_url, statement, parameters, analyze)
+            )
+        except queue.Full:
+            with self._lock:
+                self.dropped_explains += 1
+            return False
+        return True
+
+    def _start_worker(self) -> None:
+        """Thread is started by each process, one of parent isn't running
+        after fork"""
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._worker = threading.Thread(
+                    target=self._explain_samples,
+                    name="slow-query-explain",
+                    daemon=True,
+                )
+                self._worker.start()
+                self._worker_pid = os.getpid()
+
+    def _explain_samples(self) -> None:
+        while True:
+            sample = self._samples.get()
+            try:
+                self._explain_and_write(*sample)
+            finally:
+                self._samples.task_done()
+
+    def _explain_and_write(
+        self,
+        entry: dict[str, t.Any],
+        db_url: str,
+        statement: str,
+        parameters: t.Any,
+        analyze: bool,
+    ) -> None:
+        try:
+            entry["plan"] = self._explain(
+                db_url, statement, parameters, analyze
+            )
+        except Exception as e:
+            log.warning(f"Explain of slow query failed: {e}")
+        self.write(entry)
+
+    def _explain(
+        self, db_url: str, statement: str, parameters: t.Any, analyze: bool
+    ) -> t.Any:
+        engine = self._explain_engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url, poolclass=NullPool)
+            self._explain_engines[db_url] = engine
+
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        with engine.connect() as conn:
+            conn = conn.execution_options(**{EXPLAIN_OPTION: True})
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN ({options}) {statement}",
+                tuple(parameters)
+                if isinstance(parameters, list)
+                else parameters,
+            ).scalar()
+            conn.rollback()
+        return plan
+
+
+def summarize_slow_queries(path: str) -> list[dict[str, t.Any]]:
+    """This function groups slow query log (with rotated files) by
+    fingerprint, the most expensive query shapes go first"""
+    summary: dict[str, dict[str, t.Any]] = {}
+    for file_path in [path, *sorted(glob.glob(f"{glob.escape(path)}.*"))]:
+        try:
+            with open(file_path) as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            continue
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            item = summary.setdefault(
+                entry["fingerprint"],
+                {
+                    "fingerprint": entry["fingerprint"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "callers": set(),
+                    "statement": entry["statement"],
+                },
+            )
+            item["count"] += 1
+            item["total_ms"] += entry["duration_ms"]
+            item["max_ms"] = max(item["max_ms"], entry["duration_ms"])
+            if entry.get("caller"):
+                item["callers"].add(entry["caller"])
+
+    for item in summary.values():
+        item["avg_ms"] = round(item["total_ms"] / item["count"], 3)
+        item["total_ms"] = round(item["total_ms"], 3)
+        item["callers"] = sorted(item["callers"])
+    return sorted(summary.values(), key=lambda item: -item["total_ms"])
+
+
+slow_query_log = SlowQueryLog(
+    SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+)
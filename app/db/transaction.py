@@ -1,46 +1,209 @@
-import sys
 import logging
-
+import random
+import sys
+import threading
+import time
+import typing as t
+from dataclasses import dataclass, field
 from functools import wraps
 from typing import Callable, ParamSpec, TypeVar
 
-from app.db.session import s
+from sqlalchemy.exc import DBAPIError
+
+from app.configs import (
+    TRANSACTION_ISOLATION_LEVEL,
+    TRANSACTION_RETRIES,
+    TRANSACTION_RETRY_BACKOFF,
+    TRANSACTION_RETRY_BACKOFF_MAX,
+)
+from app.db.session import s, use_primary
 
 log = logging.getLogger(__name__)
 
 P = ParamSpec("P")
 T = TypeVar("T")
 
+SERIALIZATION_FAILURE = "40001"
+DEADLOCK_DETECTED = "40P01"
+RETRYABLE_SQLSTATES = {SERIALIZATION_FAILURE, DEADLOCK_DETECTED}
+
+
+@dataclass
+class TransactionStats:
+    commits: int = 0
+    rollbacks: int = 0
+    retries: int = 0
+    aborts: int = 0
+    savepoint_rollbacks: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "commits": self.commits,
+                "rollbacks": self.rollbacks,
+                "retries": self.retries,
+                "aborts": self.aborts,
+                "savepoint_rollbacks": self.savepoint_rollbacks,
+            }
+
+
+transaction_stats = TransactionStats()
+
+
+@dataclass(frozen=True)
+class TransactionOptions:
+    isolation_level: str | None = TRANSACTION_ISOLATION_LEVEL
+    read_only: bool = False
+    retries: int = TRANSACTION_RETRIES
+
+    @property
+    def execution_options(self) -> dict[str, t.Any]:
+        options: dict[str, t.Any] = {}
+        if self.isolation_level:
+            options["isolation_level"] = self.isolation_level
+        if self.read_only:
+            options["postgresql_readonly"] = True
+        return options
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """This function checks if error is serialization failure or deadlock,
+    after which whole transaction can be safely repeated"""
+    if not isinstance(exc, DBAPIError):
+        return False
+    sqlstate = getattr(exc.orig, "pgcode", None) or getattr(
+        exc.orig, "sqlstate", None
+    )
+    return sqlstate in RETRYABLE_SQLSTATES
+
+
+def retry_delay(attempt: int) -> float:
+    """This function returns exponential backoff with full jitter, so
+    conflicting transactions don't retry in lockstep"""
+    ceiling = min(
+        TRANSACTION_RETRY_BACKOFF_MAX, TRANSACTION_RETRY_BACKOFF * 2**attempt
+    )
+    return random.uniform(0, ceiling)
+
 
+@t.overload
 def transaction(func: Callable[P, T]) -> Callable[P, T]:
-    @wraps(func)
-    def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-        s.user_db.commit()
-        s.user_db_transaction = s.user_db.begin()
-        assert s.user_db_transaction is not None
-        try:
-            result = func(*args, **kwargs)
-        except Exception as e:
-            log.exception(f"Error in transaction: {e}")
-            if s.user_db_transaction.is_active:
+    ...
+
+
+@t.overload
+def transaction(
+    *,
+    isolation_level: str | None = ...,
+    read_only: bool = ...,
+    retries: int = ...,
+) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    ...
+
+
+def transaction(
+    func: Callable[P, T] | None = None,
+    *,
+    isolation_level: str | None = TRANSACTION_ISOLATION_LEVEL,
+    read_only: bool = False,
+    retries: int = TRANSACTION_RETRIES,
+) -> Callable[P, T] | Callable[[Callable[P, T]], Callable[P, T]]:
+    """This decorator runs function in transaction, it can be used as is or
+    with isolation_level, read_only and retries arguments. Nested calls
+    become SAVEPOINTs, serialization failures and deadlocks of the outermost
+    transaction are retried with jittered backoff up to retries times"""
+    options = TransactionOptions(isolation_level, read_only, retries)
+
+    def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if s.user_db_transaction is not None:
+                return _run_in_savepoint(func, *args, **kwargs)
+
+            attempt = 0
+            while True:
                 try:
-                    s.user_db_transaction.rollback()
-                except Exception:
-                    log.exception("Error during transaction rollback")
-            raise e
-        else:
+                    return _run_in_transaction(options, func, *args, **kwargs)
+                except Exception as exc:
+                    if not is_retryable_error(exc):
+                        raise
+                    if attempt >= retries:
+                        transaction_stats.increment("aborts")
+                        raise
+                    delay = retry_delay(attempt)
+                    attempt += 1
+                    transaction_stats.increment("retries")
+                    log.warning(
+                        f"Retrying {func.__name__} in {delay:.3f}s, attempt "
+                        f"{attempt} of {retries}: {exc}"
+                    )
+                    time.sleep(delay)
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def _run_in_transaction(
+    options: TransactionOptions,
+    func: Callable[P, T],
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> T:
+    use_primary()
+    s.user_db.commit()
+    s.user_db_transaction = s.user_db.begin()
+    assert s.user_db_transaction is not None
+    try:
+        if options.execution_options:
+            s.user_db.connection(execution_options=options.execution_options)
+        result = func(*args, **kwargs)
+    except Exception as e:
+        log.exception(f"Error in transaction: {e}")
+        if s.user_db_transaction.is_active:
             try:
-                s.user_db_transaction.commit()
-            except Exception as exc:
-                _, _, exc_trace = sys.exc_info()
-                try:
-                    s.user_db_transaction.rollback()
-                except Exception:
-                    log.exception("Error during transaction rollback")
-                raise exc.with_traceback(exc_trace)
-        finally:
-            s.user_db.commit()
-            s.user_db_transaction = None
-        return result
-
-    return wrapper
+                s.user_db_transaction.rollback()
+                transaction_stats.increment("rollbacks")
+            except Exception:
+                log.exception("Error during transaction rollback")
+        raise e
+    else:
+        try:
+            s.user_db_transaction.commit()
+            transaction_stats.increment("commits")
+        except Exception as exc:
+            _, _, exc_trace = sys.exc_info()
+            try:
+                s.user_db_transaction.rollback()
+                transaction_stats.increment("rollbacks")
+            except Exception:
+                log.exception("Error during transaction rollback")
+            raise exc.with_traceback(exc_trace)
+    finally:
+        s.user_db.commit()
+        s.user_db_transaction = None
+    return result
+
+
+def _run_in_savepoint(
+    func: Callable[P, T], *args: P.args, **kwargs: P.kwargs
+) -> T:
+    savepoint = s.user_db.begin_nested()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        if savepoint.is_active:
+            savepoint.rollback()
+            transaction_stats.increment("savepoint_rollbacks")
+        raise
+    savepoint.commit()
+    return result
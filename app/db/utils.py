@@ -42,6 +42,8 @@ def init_database(db_url: str, db_name: str) -> None:
 
 
 def create_table() -> None:
+    """This function creates schema of models without alembic, database
+    isn't stamped, so it is used only for the test database"""
     Base.metadata.create_all(s.user_db.get_bind())
 
 
@@ -1,17 +1,26 @@
 from flask_restful import Api
 
+from app.api.admin.endpoints.cache import CacheStatsApi
+from app.api.admin.endpoints.pool import PoolsStatsApi
+from app.api.admin.endpoints.single_flight import SingleFlightStatsApi
+from app.api.admin.endpoints.transaction import TransactionsStatsApi
 from app.api.university.endpoints.course import (
     CourseApi,
     CoursesApi,
+    CourseStudentAmountApi,
 )
+from app.api.university.endpoints.enrollment import EnrollmentsApi
 from app.api.university.endpoints.group import (
     GroupApi,
     GroupsApi,
     GroupStudentAmountApi,
 )
+from app.api.university.endpoints.stats import CourseStatsApi, GroupStatsApi
 from app.api.university.endpoints.student import (
     StudentApi,
     StudentsApi,
+    StudentsBulkApi,
+    StudentsSearchApi,
 )
 
 GROUP_STUDENTS_AMOUNT_ROUTE = "/group_students_amount/<int:student_amount>"
@@ -22,15 +31,28 @@ GROUP_PATCH_ROUTE = "/group/<int:group_id>/<action>"
 
 
 STUDENTS_ROUTE = "/students"
+STUDENTS_BULK_ROUTE = "/students/bulk"
+STUDENTS_SEARCH_ROUTE = "/students/search"
 STUDENT_POST_ROUTE = "/student"
 STUDENT_PATCH_ROUTE = "/student/<int:student_id>/<action>"
 STUDENT_ROUTE = "/student/<int:student_id>"
 
+COURSE_STUDENTS_AMOUNT_ROUTE = "/course_students_amount/<int:student_amount>"
 COURSES_ROUTE = "/courses"
 COURSE_POST_ROUTE = "/course"
 COURSE_PATCH_ROUTE = "/course/<int:course_id>/<action>"
 COURSE_ROUTE = "/course/<int:course_id>"
 
+ENROLLMENTS_ROUTE = "/enrollments"
+
+STATS_COURSES_ROUTE = "/stats/courses"
+STATS_GROUPS_ROUTE = "/stats/groups"
+
+ADMIN_POOLS_ROUTE = "/admin/pools"
+ADMIN_TRANSACTIONS_ROUTE = "/admin/transactions"
+ADMIN_CACHE_ROUTE = "/admin/cache"
+ADMIN_SINGLE_FLIGHT_ROUTE = "/admin/single_flight"
+
 
 def init_api_routers(api: Api):
     api.add_resource(GroupStudentAmountApi, GROUP_STUDENTS_AMOUNT_ROUTE)
@@ -39,12 +61,25 @@ def init_api_routers(api: Api):
         GroupApi, GROUP_ROUTE, GROUP_POST_ROUTE, GROUP_PATCH_ROUTE
     )
 
+    api.add_resource(CourseStudentAmountApi, COURSE_STUDENTS_AMOUNT_ROUTE)
     api.add_resource(CoursesApi, COURSES_ROUTE)
     api.add_resource(
         CourseApi, COURSE_ROUTE, COURSE_POST_ROUTE, COURSE_PATCH_ROUTE
     )
 
     api.add_resource(StudentsApi, STUDENTS_ROUTE)
+    api.add_resource(StudentsBulkApi, STUDENTS_BULK_ROUTE)
+    api.add_resource(StudentsSearchApi, STUDENTS_SEARCH_ROUTE)
     api.add_resource(
         StudentApi, STUDENT_ROUTE, STUDENT_POST_ROUTE, STUDENT_PATCH_ROUTE
     )
+
+    api.add_resource(EnrollmentsApi, ENROLLMENTS_ROUTE)
+
+    api.add_resource(CourseStatsApi, STATS_COURSES_ROUTE)
+    api.add_resource(GroupStatsApi, STATS_GROUPS_ROUTE)
+
+    api.add_resource(PoolsStatsApi, ADMIN_POOLS_ROUTE)
+    api.add_resource(TransactionsStatsApi, ADMIN_TRANSACTIONS_ROUTE)
+    api.add_resource(CacheStatsApi, ADMIN_CACHE_ROUTE)
+    api.add_resource(SingleFlightStatsApi, ADMIN_SINGLE_FLIGHT_ROUTE)
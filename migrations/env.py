@@ -13,7 +13,8 @@ config = context.config
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 
-config.set_main_option("sqlalchemy.url", f"{BASE_URL}/{DB_NAME}")
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", f"{BASE_URL}/{DB_NAME}")
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -0,0 +1,76 @@
+"""foreign key and filter indexes
+
+Revision ID: e77ecd322430
+Revises: e90b653c9c2a
+Create Date: 2026-10-18 13:32:31.122077+00:00
+
+"""
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Name, table and columns. Foreign key columns had no index, so joins and
+# cascades on them scanned the whole table, amount filters order by count
+# and id, so they replace single column student_count indexes.
+INDEXES = (
+    ("ix_students_group_id_id", "students", ["group_id", "id"]),
+    (
+        "ix_student_to_course_course_id_student_id",
+        "student_to_course",
+        ["course_id", "student_id"],
+    ),
+    ("ix_groups_student_count_id", "groups", ["student_count", "id"]),
+    ("ix_courses_student_count_id", "courses", ["student_count", "id"]),
+)
+REPLACED_INDEXES = (
+    ("ix_groups_student_count", "groups", ["student_count"]),
+    ("ix_courses_student_count", "courses", ["student_count"]),
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e77ecd322430"
+down_revision: str | None = "e90b653c9c2a"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY builds don't block writes, but can't run in transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _ in REPLACED_INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _ in INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,74 @@
+"""list filter indexes
+
+Revision ID: e373070e11f4
+Revises: e77ecd322430
+Create Date: 2026-10-18 13:36:02.315944+00:00
+
+"""
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Name, table, columns and operator classes. Pattern operator class lets
+# LIKE prefix filters use btree whatever collation database has.
+INDEXES = (
+    ("ix_students_last_name_id", "students", ["last_name", "id"], {}),
+    (
+        "ix_students_last_name_pattern",
+        "students",
+        ["last_name"],
+        {"last_name": "varchar_pattern_ops"},
+    ),
+    (
+        "ix_students_first_name_pattern",
+        "students",
+        ["first_name"],
+        {"first_name": "varchar_pattern_ops"},
+    ),
+    (
+        "ix_groups_name_pattern",
+        "groups",
+        ["name"],
+        {"name": "varchar_pattern_ops"},
+    ),
+    (
+        "ix_courses_name_pattern",
+        "courses",
+        ["name"],
+        {"name": "varchar_pattern_ops"},
+    ),
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e373070e11f4"
+down_revision: str | None = "e77ecd322430"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY builds don't block writes, but can't run in transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, ops in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_ops=ops,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
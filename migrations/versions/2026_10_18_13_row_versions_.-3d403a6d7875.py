@@ -0,0 +1,57 @@
+"""row versions
+
+Revision ID: 3d403a6d7875
+Revises: 87a38c3ea7b0
+Create Date: 2026-10-18 13:41:20.807752+00:00
+
+"""
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+VERSIONED_TABLES = ("students", "groups", "courses")
+
+CREATE_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+DROP_VERSION_FUNCTION = "DROP FUNCTION IF EXISTS bump_version()"
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d403a6d7875"
+down_revision: str | None = "87a38c3ea7b0"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "version",
+                sa.Integer(),
+                server_default=sa.text("1"),
+                nullable=False,
+            ),
+        )
+    op.execute(CREATE_VERSION_FUNCTION)
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_bump_version BEFORE UPDATE ON {table} "
+            "FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) "
+            "EXECUTE FUNCTION bump_version()"
+        )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_bump_version ON {table}")
+        op.drop_column(table, "version")
+    op.execute(DROP_VERSION_FUNCTION)
@@ -0,0 +1,83 @@
+"""statistics materialized views
+
+Revision ID: 87a38c3ea7b0
+Revises: e373070e11f4
+Create Date: 2026-10-18 13:38:41.071651+00:00
+
+"""
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+# Name, query and unique key
+STATS_VIEWS = (
+    (
+        "course_stats",
+        """
+        SELECT courses.id AS course_id,
+               courses.name,
+               count(student_to_course.student_id) AS students
+        FROM courses
+        LEFT JOIN student_to_course
+            ON student_to_course.course_id = courses.id
+        GROUP BY courses.id
+        """,
+        "course_id",
+    ),
+    (
+        "group_stats",
+        """
+        SELECT groups.id AS group_id,
+               groups.name,
+               count(students.id) AS students
+        FROM groups
+        LEFT JOIN students ON students.group_id = groups.id
+        GROUP BY groups.id
+        """,
+        "group_id",
+    ),
+    (
+        "student_stats",
+        """
+        SELECT 1 AS id,
+               totals.*,
+               coalesce(
+                   totals.enrollments::float / nullif(totals.students, 0), 0
+               ) AS average_courses_per_student,
+               now() AS refreshed_at
+        FROM (
+            SELECT (SELECT count(*) FROM students) AS students,
+                   (SELECT count(*) FROM students WHERE group_id IS NULL)
+                       AS unassigned_students,
+                   (SELECT count(*) FROM student_to_course) AS enrollments,
+                   (
+                       SELECT count(*) FROM students
+                       WHERE NOT EXISTS (
+                           SELECT FROM student_to_course
+                           WHERE student_to_course.student_id = students.id
+                       )
+                   ) AS students_without_courses
+        ) AS totals
+        """,
+        "id",
+    ),
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "87a38c3ea7b0"
+down_revision: str | None = "e373070e11f4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    for name, query, key in STATS_VIEWS:
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {query} WITH DATA")
+        op.execute(f"CREATE UNIQUE INDEX ix_{name}_{key} ON {name} ({key})")
+
+
+def downgrade() -> None:
+    for name, _, _ in STATS_VIEWS:
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
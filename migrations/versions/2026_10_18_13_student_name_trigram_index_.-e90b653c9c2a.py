@@ -0,0 +1,53 @@
+"""student name trigram index
+
+Revision ID: e90b653c9c2a
+Revises: 743c34bb8c1c
+Create Date: 2026-10-18 13:29:56.709557+00:00
+
+"""
+import logging
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+TRGM_EXTENSION = "pg_trgm"
+STUDENT_NAME_INDEX = "ix_students_full_name_trgm"
+
+CREATE_TRGM_EXTENSION = f"CREATE EXTENSION IF NOT EXISTS {TRGM_EXTENSION}"
+CREATE_STUDENT_NAME_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS {STUDENT_NAME_INDEX} ON students "
+    "USING gin ((first_name || ' ' || last_name) gin_trgm_ops)"
+)
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e90b653c9c2a"
+down_revision: str | None = "743c34bb8c1c"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    trgm_available = op.get_bind().scalar(
+        sa.text(
+            "SELECT EXISTS "
+            "(SELECT FROM pg_available_extensions WHERE name = :name)"
+        ),
+        {"name": TRGM_EXTENSION},
+    )
+    if not trgm_available:
+        log.warning(
+            f"{TRGM_EXTENSION} extension isn't available, "
+            f"{STUDENT_NAME_INDEX} is skipped and student search won't work"
+        )
+        return
+    op.execute(CREATE_TRGM_EXTENSION)
+    op.execute(CREATE_STUDENT_NAME_INDEX)
+
+
+def downgrade() -> None:
+    # pg_trgm is left installed, other objects of database may use it
+    op.drop_index(STUDENT_NAME_INDEX, table_name="students", if_exists=True)
@@ -0,0 +1,115 @@
+"""student counts
+
+Revision ID: 743c34bb8c1c
+Revises: 86b760160586
+Create Date: 2026-10-18 14:38:14.512340+00:00
+
+"""
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+# Counter table and foreign key column of the table its students are in
+COUNTED_TABLES = (
+    ("groups", "students", "group_id"),
+    ("courses", "student_to_course", "course_id"),
+)
+
+CREATE_STUDENT_COUNT_FUNCTION = """
+CREATE OR REPLACE FUNCTION maintain_student_count() RETURNS trigger AS $$
+DECLARE
+    changes text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := format(
+            'SELECT %1$I AS id, 1 AS amount FROM new_rows', TG_ARGV[1]
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := format(
+            'SELECT %1$I AS id, -1 AS amount FROM old_rows', TG_ARGV[1]
+        );
+    ELSE
+        changes := format(
+            'SELECT %1$I AS id, 1 AS amount FROM new_rows '
+            'UNION ALL SELECT %1$I, -1 FROM old_rows',
+            TG_ARGV[1]
+        );
+    END IF;
+    EXECUTE format(
+        'UPDATE %1$I SET student_count = %1$I.student_count + delta.amount '
+        'FROM (SELECT id, sum(amount) AS amount FROM (%2$s) AS changes '
+        'WHERE id IS NOT NULL GROUP BY id HAVING sum(amount) <> 0) AS delta '
+        'WHERE %1$I.id = delta.id',
+        TG_ARGV[0],
+        changes
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+TRIGGER_REFERENCING = {
+    "INSERT": "REFERENCING NEW TABLE AS new_rows",
+    "DELETE": "REFERENCING OLD TABLE AS old_rows",
+    "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+DROP_STUDENT_COUNT_FUNCTION = (
+    "DROP FUNCTION IF EXISTS maintain_student_count()"
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "743c34bb8c1c"
+down_revision: str | None = "86b760160586"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    for counter_table, table, column in COUNTED_TABLES:
+        op.add_column(
+            counter_table,
+            sa.Column(
+                "student_count",
+                sa.Integer(),
+                server_default=sa.text("0"),
+                nullable=False,
+            ),
+        )
+        op.create_index(
+            op.f(f"ix_{counter_table}_student_count"),
+            counter_table,
+            ["student_count"],
+            unique=False,
+        )
+        # Rows which existed before triggers are counted once here
+        op.execute(
+            f"UPDATE {counter_table} SET student_count = "
+            f"(SELECT count(*) FROM {table} "
+            f"WHERE {table}.{column} = {counter_table}.id)"
+        )
+    op.execute(CREATE_STUDENT_COUNT_FUNCTION)
+    for counter_table, table, column in COUNTED_TABLES:
+        for operation, referencing in TRIGGER_REFERENCING.items():
+            op.execute(
+                f"CREATE TRIGGER {table}_{operation.lower()}_"
+                f"{counter_table}_count AFTER {operation} ON {table} "
+                f"{referencing} FOR EACH STATEMENT EXECUTE FUNCTION "
+                f"maintain_student_count('{counter_table}', '{column}')"
+            )
+
+
+def downgrade() -> None:
+    for counter_table, table, _ in COUNTED_TABLES:
+        for operation in TRIGGER_REFERENCING:
+            op.execute(
+                f"DROP TRIGGER {table}_{operation.lower()}_"
+                f"{counter_table}_count ON {table}"
+            )
+        op.drop_index(
+            op.f(f"ix_{counter_table}_student_count"),
+            table_name=counter_table,
+            if_exists=True,
+        )
+        op.drop_column(counter_table, "student_count")
+    op.execute(DROP_STUDENT_COUNT_FUNCTION)
@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import Engine, event
 
 from app.app import create_app
 from app.db.session import get_sync_pool, s
@@ -12,6 +13,7 @@ from app.db.session import (
     pop_session,
     set_session,
 )
+from app.db.slow_query import slow_query_log
 from app.db.utils import (
     create_database,
     create_table,
@@ -44,6 +46,38 @@ def db_set_session() -> None:
         s.user_db.close()
 
 
+@pytest.fixture
+def request_session():
+    """Opens session of request like the app does, changes which the test
+    didn't commit are rolled back"""
+    set_session()
+    yield
+    s.user_db.rollback()
+    pop_session()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def slow_query_log_file(tmp_path_factory):
+    """Keeps slow query log of the test run out of the repository"""
+    slow_query_log.path = str(
+        tmp_path_factory.mktemp("slow_query") / "slow_queries.log"
+    )
+    return slow_query_log.path
+
+
+@pytest.fixture
+def statements():
+    """Collects SQL statements executed during the test"""
+    executed: list[str] = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", collect)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", collect)
+
+
 @pytest.hookimpl(tryfirst=True)
 def pytest_sessionstart(session):
     create_database(BASE_SUPERUSER_URL, DB_NAME)
@@ -56,6 +90,7 @@ def pytest_sessionstart(session):
 @pytest.hookimpl(tryfirst=True)
 def pytest_sessionfinish(session, exitstatus):
     try:
+        slow_query_log.flush()
         close_dbs()
     finally:
         print("\nClose DB")
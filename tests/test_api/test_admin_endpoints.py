@@ -0,0 +1,28 @@
+import json
+
+from app.configs import API_PREFIX
+from app.init_routers import ADMIN_POOLS_ROUTE, ADMIN_TRANSACTIONS_ROUTE
+
+ADMIN_POOLS_ROUTE = f"{API_PREFIX}{ADMIN_POOLS_ROUTE}"
+ADMIN_TRANSACTIONS_ROUTE = f"{API_PREFIX}{ADMIN_TRANSACTIONS_ROUTE}"
+
+
+def test_get_pools_stats(client):
+    client.get(f"{API_PREFIX}/students")
+    response = client.get(ADMIN_POOLS_ROUTE)
+    assert response.status_code == 200
+    pools = json.loads(response.data)
+    assert pools
+    for item in pools:
+        assert "***" in item["url"]
+        assert item["checkouts"] > 0
+        assert "checked_out" in item
+        assert "avg_checkout_ms" in item
+
+
+def test_get_transactions_stats(client):
+    response = client.get(ADMIN_TRANSACTIONS_ROUTE)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    for counter in ("commits", "rollbacks", "retries", "aborts"):
+        assert counter in data
@@ -0,0 +1,563 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.api.university import cache as cache_module
+from app.api.university.cache import (
+    CachedResponse,
+    MemoryBackend,
+    SharedMemoryBackend,
+    entity_cache,
+    get_cached,
+)
+from app.api.university.utils import ETAG_HEADER
+from app.configs import API_PREFIX
+from app.db import invalidation
+from app.init_routers import (
+    ADMIN_CACHE_ROUTE,
+    COURSE_POST_ROUTE,
+    COURSES_ROUTE,
+    ENROLLMENTS_ROUTE,
+    GROUP_POST_ROUTE,
+    STUDENT_POST_ROUTE,
+)
+
+ADMIN_CACHE_ROUTE = f"{API_PREFIX}{ADMIN_CACHE_ROUTE}"
+COURSE_POST_ROUTE = f"{API_PREFIX}{COURSE_POST_ROUTE}"
+COURSES_ROUTE = f"{API_PREFIX}{COURSES_ROUTE}"
+ENROLLMENTS_ROUTE = f"{API_PREFIX}{ENROLLMENTS_ROUTE}"
+GROUP_POST_ROUTE = f"{API_PREFIX}{GROUP_POST_ROUTE}"
+STUDENT_POST_ROUTE = f"{API_PREFIX}{STUDENT_POST_ROUTE}"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_cache(name, path, clock, max_bytes=10):
+    if name == "memory":
+        cache = MemoryBackend(max_bytes=max_bytes, ttl=60, lock_ttl=5)
+    else:
+        cache = SharedMemoryBackend(
+            str(path), max_bytes=max_bytes, ttl=60, lock_ttl=5
+        )
+    cache.now = clock
+    return cache
+
+
+@pytest.fixture(params=["memory", "shared"])
+def cache(request, tmp_path):
+    clock = FakeClock()
+    return create_cache(request.param, tmp_path / "cache.sqlite", clock), clock
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    tags: list[set[str]] = []
+    monkeypatch.setattr(invalidation, "invalidation_listeners", [tags.append])
+    return tags
+
+
+def cached(body: bytes, *tags: str) -> CachedResponse:
+    return CachedResponse(body, frozenset(tags))
+
+
+def post(client, route, data):
+    return json.loads(client.post(route, json=data).data)
+
+
+def test_cache_evicts_least_recently_used(cache):
+    cache, clock = cache
+    cache.set("a", cached(b"1234"), clock())
+    clock.now += 2
+    cache.set("b", cached(b"1234"), clock())
+    clock.now += 2
+    assert cache.get("a") is not None
+    cache.set("c", cached(b"1234"), clock())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.status()["size_bytes"] == 8
+    assert cache.stats.evictions == 1
+
+
+def test_cache_expires_entries(cache):
+    cache, clock = cache
+    cache.set("a", cached(b"1"), clock())
+    clock.now += 61
+    assert cache.get("a") is None
+    assert cache.stats.expirations == 1
+
+
+def test_cache_invalidates_tags(cache):
+    cache, clock = cache
+    cache.set("a", cached(b"1", "group:1", "student:2"), clock())
+    cache.set("b", cached(b"1", "group:2", "student:3"), clock())
+    cache.set("c", cached(b"1", "course:1"), clock())
+
+    cache.invalidate({"student:2"})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+    cache.invalidate({"group:*"})
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats.invalidations == 2
+
+
+def test_cache_skips_values_read_before_invalidation(cache):
+    cache, clock = cache
+    since = clock()
+    clock.now += 1
+    cache.invalidate({"student:1"})
+    assert not cache.set("a", cached(b"1", "student:1"), since)
+    assert cache.set("b", cached(b"1", "student:2", "group:1"), since)
+    clock.now += 1
+    assert cache.set("a", cached(b"1", "student:1"), clock())
+
+
+def test_cache_skips_values_read_before_invalidation_of_kind(cache):
+    cache, clock = cache
+    since = clock()
+    clock.now += 1
+    cache.invalidate({"group:*"})
+    assert not cache.set("a", cached(b"1", "student:1", "group:1"), since)
+    assert cache.set("b", cached(b"1", "course:1"), since)
+
+
+def test_cache_skips_values_read_too_long_ago(cache):
+    cache, clock = cache
+    since = clock()
+    clock.now += 6
+    assert not cache.set("a", cached(b"1", "student:1"), since)
+
+
+def test_cache_fill_lock_expires(cache):
+    cache, clock = cache
+    token = cache.try_lock("a")
+    assert token
+    assert cache.try_lock("a") is None
+    cache.unlock("a", token)
+    assert cache.try_lock("a")
+    clock.now += 5
+    assert cache.try_lock("a")
+
+
+def test_cache_fill_lock_is_released_by_holder(cache):
+    cache, clock = cache
+    expired = cache.try_lock("a")
+    clock.now += 5
+    token = cache.try_lock("a")
+    cache.unlock("a", expired)
+    assert cache.try_lock("a") is None
+    cache.unlock("a", token)
+    assert cache.try_lock("a")
+
+
+def test_shared_cache_is_shared_by_instances(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "cache.sqlite"
+    first = create_cache("shared", path, clock)
+    second = create_cache("shared", path, clock)
+
+    first.set("a", cached(b"1", "student:1", "group:1"), clock())
+    loaded = second.get("a")
+    assert loaded == cached(b"1", "student:1", "group:1")
+    assert first.try_lock("b")
+    assert not second.try_lock("b")
+
+    second.invalidate({"group:1"})
+    assert first.get("a") is None
+    assert first.status()["size_bytes"] == 0
+
+
+def test_cached_response_is_packed_to_bytes():
+    response = CachedResponse(
+        b'{"id": 1}\n', frozenset({"course:1"}), "abc", {"X-Total": "1"}
+    )
+    assert CachedResponse.loads(response.dumps()) == response
+
+
+def test_redis_cache_round_trip():
+    redis = pytest.importorskip("redis")
+    url = os.getenv("ENTITY_CACHE_REDIS_URL", "redis://localhost:6379/15")
+    try:
+        redis.Redis.from_url(url).ping()
+    except redis.ConnectionError:
+        pytest.skip("Redis server isn't available")
+    from app.api.university.cache.redis import RedisBackend
+
+    cache = RedisBackend(
+        url, max_bytes=10, ttl=60, lock_ttl=5, prefix="test:cache:"
+    )
+    cache.clear()
+    cache.set("a", cached(b"1", "group:1"), cache.now())
+    assert cache.get("a") == cached(b"1", "group:1")
+    token = cache.try_lock("a")
+    assert token and not cache.try_lock("a")
+    cache.unlock("a", "other")
+    assert not cache.try_lock("a")
+    cache.unlock("a", token)
+    assert cache.try_lock("a")
+    cache.invalidate({"group:*"})
+    assert cache.get("a") is None
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, tmp_path):
+    backend = SharedMemoryBackend(
+        str(tmp_path / "cache.sqlite"), max_bytes=1000, ttl=60, lock_ttl=5
+    )
+    monkeypatch.setattr(cache_module, "entity_cache", backend)
+    return backend
+
+
+def test_concurrent_misses_are_loaded_once(shared_cache):
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.1)
+        return cached(b"roster", "group:1")
+
+    with ThreadPoolExecutor(5) as executor:
+        responses = list(
+            executor.map(lambda _: get_cached("group:1", load), range(5))
+        )
+
+    assert all(response.body == b"roster" for response in responses)
+    assert len(loads) == 1
+    assert shared_cache.stats.misses == 5
+    assert shared_cache.stats.coalesced == 4
+
+
+def test_fill_lock_wait_times_out(shared_cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "ENTITY_CACHE_LOCK_WAIT", 0.05)
+    shared_cache.try_lock("group:1")
+
+    def load():
+        return cached(b"roster", "group:1")
+
+    assert get_cached("group:1", load).body == b"roster"
+    assert shared_cache.stats.lock_timeouts == 1
+
+
+class BrokenBackend(MemoryBackend):
+    name = "broken"
+
+    def __init__(self, *failing: str) -> None:
+        super().__init__(max_bytes=1000, ttl=60, lock_ttl=5)
+        self.cleared = False
+        for name in failing:
+            setattr(self, name, self._broken(name))
+
+    @staticmethod
+    def _broken(name):
+        def call(*args):
+            raise ConnectionError(f"{name} failed")
+
+        return call
+
+    def clear(self) -> None:
+        super().clear()
+        self.cleared = True
+
+
+@pytest.mark.parametrize("failing", ["get", "try_lock", "now", "set"])
+def test_cache_errors_fall_back_to_load(monkeypatch, failing):
+    backend = BrokenBackend(failing)
+    monkeypatch.setattr(cache_module, "entity_cache", backend)
+
+    def load():
+        return cached(b"roster", "group:1")
+
+    assert get_cached("group:1", load).body == b"roster"
+    assert backend.stats.errors >= 1
+
+
+def test_failed_invalidation_clears_cache(monkeypatch):
+    backend = BrokenBackend("invalidate")
+    monkeypatch.setattr(cache_module, "entity_cache", backend)
+    backend.set("a", cached(b"1", "group:1"), backend.now() - 1)
+
+    cache_module.invalidate_entities({"group:1"})
+    assert backend.cleared
+    assert backend.get("a") is None
+    assert backend.enabled
+
+
+def test_failed_clear_disables_cache(monkeypatch):
+    backend = BrokenBackend("invalidate", "clear")
+    monkeypatch.setattr(cache_module, "entity_cache", backend)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return cached(b"roster", "group:1")
+
+    cache_module.invalidate_entities({"group:1"})
+    assert not backend.enabled
+    get_cached("group:1", load)
+    get_cached("group:1", load)
+    assert len(loads) == 2
+
+
+def test_get_student_is_cached(client):
+    student = post(
+        client, STUDENT_POST_ROUTE, {"first_name": "Cache", "last_name": "Hit"}
+    )
+    route = f"{API_PREFIX}/student/{student['id']}"
+    client.get(route)
+    response = client.get(route)
+    assert '"0 queries"' in response.headers["Server-Timing"]
+    assert json.loads(response.data)["last_name"] == "Hit"
+
+    client.patch(route, json={"last_name": "Miss"})
+    assert json.loads(client.get(route).data)["last_name"] == "Miss"
+
+
+def test_scalar_patch_invalidates_rows(client, invalidated):
+    group = post(client, GROUP_POST_ROUTE, {"name": "CH-22"})
+    student = post(
+        client,
+        STUDENT_POST_ROUTE,
+        {"first_name": "Tag", "last_name": "Row", "group_id": group["id"]},
+    )
+    invalidated.clear()
+    client.patch(
+        f"{API_PREFIX}/student/{student['id']}", json={"first_name": "Tags"}
+    )
+    assert set().union(*invalidated) == {
+        f"student:{student['id']}",
+        f"group:{group['id']}",
+    }
+
+
+def test_group_cache_follows_students(client):
+    group = post(client, GROUP_POST_ROUTE, {"name": "CH-23"})
+    route = f"{API_PREFIX}/group/{group['id']}"
+    student = post(
+        client,
+        STUDENT_POST_ROUTE,
+        {"first_name": "Joins", "last_name": "Group", "group_id": group["id"]},
+    )
+    assert [
+        item["id"] for item in json.loads(client.get(route).data)["students"]
+    ] == [student["id"]]
+
+    client.delete(f"{API_PREFIX}/student/{student['id']}")
+    assert json.loads(client.get(route).data)["students"] == []
+
+
+def test_course_cache_follows_enrollments(client):
+    course = post(
+        client,
+        COURSE_POST_ROUTE,
+        {"name": "Cached course", "description": "Enrollments"},
+    )
+    route = f"{API_PREFIX}/course/{course['id']}"
+    student = post(
+        client, STUDENT_POST_ROUTE, {"first_name": "Enr", "last_name": "Olls"}
+    )
+    assert json.loads(client.get(route).data)["students"] == []
+
+    client.post(
+        ENROLLMENTS_ROUTE,
+        json=[{"student_id": student["id"], "course_id": course["id"]}],
+    )
+    students = json.loads(client.get(route).data)["students"]
+    assert [item["id"] for item in students] == [student["id"]]
+
+
+def test_course_catalog_is_cached(client):
+    client.get(COURSES_ROUTE)
+    response = client.get(COURSES_ROUTE)
+    assert '"0 queries"' in response.headers["Server-Timing"]
+
+    course = post(
+        client,
+        COURSE_POST_ROUTE,
+        {"name": "New catalog course", "description": "Catalog"},
+    )
+    names = [
+        item["name"] for item in json.loads(client.get(COURSES_ROUTE).data)
+    ]
+    assert course["name"] in names
+
+
+def test_get_cache_stats(client):
+    client.get(f"{API_PREFIX}/course/1")
+    client.get(f"{API_PREFIX}/course/1")
+    response = client.get(ADMIN_CACHE_ROUTE)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["hits"] > 0
+    assert data["backend"] == entity_cache.name
+    assert data["entries"] == entity_cache.usage()["entries"]
+    for counter in (
+        "misses",
+        "evictions",
+        "expirations",
+        "invalidations",
+        "coalesced",
+        "lock_timeouts",
+        "errors",
+    ):
+        assert counter in data
+
+
+def test_group_move_invalidates_group_left(client):
+    group_from = post(client, GROUP_POST_ROUTE, {"name": "CH-24"})
+    group_to = post(client, GROUP_POST_ROUTE, {"name": "CH-25"})
+    student = post(
+        client,
+        STUDENT_POST_ROUTE,
+        {
+            "first_name": "Moves",
+            "last_name": "Away",
+            "group_id": group_from["id"],
+        },
+    )
+    route = f"{API_PREFIX}/group/{group_from['id']}"
+    client.get(route)
+
+    response = client.put(
+        f"{API_PREFIX}/group/{group_to['id']}",
+        json={"name": group_to["name"], "student_ids": [student["id"]]},
+    )
+    assert response.status_code == 200
+    response = client.get(route)
+    assert json.loads(response.data)["students"] == []
+    response = client.patch(
+        route,
+        json={"name": "CH-26"},
+        headers={"If-Match": response.headers[ETAG_HEADER]},
+    )
+    assert response.status_code == 200
+
+
+def test_unenrollment_invalidates_course_left(client):
+    group = post(client, GROUP_POST_ROUTE, {"name": "CH-27"})
+    course = post(
+        client,
+        COURSE_POST_ROUTE,
+        {"name": "Course left", "description": "Unenrollment"},
+    )
+    student = post(
+        client,
+        STUDENT_POST_ROUTE,
+        {
+            "first_name": "Leaves",
+            "last_name": "Course",
+            "group_id": group["id"],
+            "course_ids": [course["id"]],
+        },
+    )
+    route = f"{API_PREFIX}/course/{course['id']}"
+    assert len(json.loads(client.get(route).data)["students"]) == 1
+
+    response = client.put(
+        f"{API_PREFIX}/student/{student['id']}",
+        json={
+            "first_name": "Leaves",
+            "last_name": "Course",
+            "group_id": group["id"],
+            "course_ids": [],
+        },
+    )
+    assert response.status_code == 200
+    response = client.get(route)
+    assert json.loads(response.data)["students"] == []
+    response = client.patch(
+        route,
+        json={"description": "Left"},
+        headers={"If-Match": response.headers[ETAG_HEADER]},
+    )
+    assert response.status_code == 200
+
+
+def test_group_move_names_both_groups(client, invalidated):
+    group_from = post(client, GROUP_POST_ROUTE, {"name": "CH-28"})
+    group_to = post(client, GROUP_POST_ROUTE, {"name": "CH-29"})
+    student = post(
+        client,
+        STUDENT_POST_ROUTE,
+        {
+            "first_name": "Tag",
+            "last_name": "Move",
+            "group_id": group_from["id"],
+        },
+    )
+    invalidated.clear()
+    client.put(
+        f"{API_PREFIX}/group/{group_to['id']}",
+        json={"name": group_to["name"], "student_ids": [student["id"]]},
+    )
+    assert set().union(*invalidated) >= {
+        f"student:{student['id']}",
+        f"group:{group_from['id']}",
+        f"group:{group_to['id']}",
+    }
+
+    invalidated.clear()
+    client.put(
+        f"{API_PREFIX}/group/{group_to['id']}",
+        json={"name": group_to["name"], "student_ids": []},
+    )
+    assert set().union(*invalidated) >= {
+        f"student:{student['id']}",
+        f"group:{group_to['id']}",
+    }
+
+
+def test_unenrollment_names_course(client, invalidated):
+    group = post(client, GROUP_POST_ROUTE, {"name": "CH-30"})
+    course = post(
+        client,
+        COURSE_POST_ROUTE,
+        {"name": "Tagged course", "description": "Unenrollment"},
+    )
+    student_json = {
+        "first_name": "Tag",
+        "last_name": "Course",
+        "group_id": group["id"],
+        "course_ids": [course["id"]],
+    }
+    student = post(client, STUDENT_POST_ROUTE, student_json)
+    invalidated.clear()
+    client.put(
+        f"{API_PREFIX}/student/{student['id']}",
+        json={**student_json, "course_ids": []},
+    )
+    assert f"course:{course['id']}" in set().union(*invalidated)
+
+
+def test_student_group_change_names_both_groups(client, invalidated):
+    group_from = post(client, GROUP_POST_ROUTE, {"name": "CH-31"})
+    group_to = post(client, GROUP_POST_ROUTE, {"name": "CH-32"})
+    student_json = {
+        "first_name": "Tag",
+        "last_name": "Flush",
+        "group_id": group_from["id"],
+        "course_ids": [],
+    }
+    student = post(client, STUDENT_POST_ROUTE, student_json)
+    invalidated.clear()
+    client.put(
+        f"{API_PREFIX}/student/{student['id']}",
+        json={**student_json, "group_id": group_to["id"]},
+    )
+    assert set().union(*invalidated) >= {
+        f"student:{student['id']}",
+        f"group:{group_from['id']}",
+        f"group:{group_to['id']}",
+    }
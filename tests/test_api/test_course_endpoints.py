@@ -2,6 +2,7 @@ import json
 
 import pytest
 
+from app.api.university.utils import ETAG_HEADER, ROWS_TOUCHED_HEADER
 from app.crud.university.course import get_course_by_name
 from app.configs import API_PREFIX
 from app.init_routers import (
@@ -22,6 +23,17 @@ def test_get_courses(client):
         assert "students" not in item
 
 
+def test_get_courses_filtered(client):
+    name = json.loads(client.get(COURSES_ROUTE).data)[0]["name"]
+    response = client.get(
+        COURSES_ROUTE, query_string={"filter": f"name:prefix:{name[:3]}"}
+    )
+    assert response.status_code == 200
+    courses = json.loads(response.data)
+    assert name in [item["name"] for item in courses]
+    assert all(item["name"].startswith(name[:3]) for item in courses)
+
+
 def test_courses_with_students(client):
     response = client.get(COURSES_ROUTE, query_string={"with": "students"})
     assert response.status_code == 200
@@ -29,7 +41,18 @@ def test_courses_with_students(client):
         assert "students" in item
 
 
+@pytest.mark.parametrize("student_amount", [0, 2, 5])
+def test_less_or_equal_students_in_course(client, student_amount):
+    response = client.get(
+        f"{API_PREFIX}/course_students_amount/{student_amount}"
+    )
+    assert response.status_code == 200
+    for item in json.loads(response.data):
+        assert len(item["students"]) <= student_amount
+
+
 GET_COURSE_ID = 1
+NOT_ASSIGNED_STUDENT_ID = 4
 
 
 def test_get_course(client):
@@ -132,7 +155,7 @@ REMOVE_STUDENT_COURSE_ID = 1
 remove_students_json = {"student_ids": [1]}
 
 
-def test_patch_course_remove_students(client):
+def test_patch_course_remove_students(client, statements):
     response = client.patch(
         f"{API_PREFIX}/course/{REMOVE_STUDENT_COURSE_ID}/remove",
         json=remove_students_json,
@@ -140,6 +163,20 @@ def test_patch_course_remove_students(client):
     assert response.status_code == 200
     response_data = json.loads(response.data)
     assert len(response_data["students"]) == 0
+    # Students are read once, after they are removed
+    assert [
+        statement
+        for statement in statements
+        if statement.startswith("SELECT") and "students" in statement
+    ] == [statements[-1]]
+
+
+def test_patch_course_remove_not_assigned_student(client):
+    response = client.patch(
+        f"{API_PREFIX}/course/{GET_COURSE_ID}/remove",
+        json={"student_ids": [NOT_ASSIGNED_STUDENT_ID]},
+    )
+    assert response.status_code == 422
 
 
 PUT_COURSE_ID = 1
@@ -164,6 +201,30 @@ def test_put_course(client):
     )
 
 
+DIFF_PUT_COURSE_ID = 2
+diff_put_course_json = {
+    "name": "Course 2",
+    "description": "Description 2",
+    "student_ids": [13, 14],
+}
+
+
+def test_put_course_writes_only_difference(client):
+    route = f"{API_PREFIX}/course/{DIFF_PUT_COURSE_ID}"
+    client.put(route, json=diff_put_course_json)
+
+    response = client.put(route, json=diff_put_course_json)
+    assert response.status_code == 200
+    assert response.headers[ROWS_TOUCHED_HEADER] == "0"
+
+    response = client.put(
+        route, json={**diff_put_course_json, "student_ids": [13, 15]}
+    )
+    assert response.headers[ROWS_TOUCHED_HEADER] == "2"
+    students = json.loads(response.data)["students"]
+    assert {student["id"] for student in students} == {13, 15}
+
+
 INVALID_PUT_ID = 1
 invalid_put_json = {
     "name": "Test_put_name",
@@ -214,3 +275,26 @@ def test_invalid_data_course(client, method):
 def test_invalid_post_course(client):
     response = client.post(COURSE_POST_ROUTE, json=invalid_data_json)
     assert response.status_code == 422
+
+
+def test_put_course_if_match(client):
+    course_json = {
+        "name": "Etag course",
+        "description": "Etag description",
+        "student_ids": [NOT_ASSIGNED_STUDENT_ID],
+    }
+    course = json.loads(client.post(COURSE_POST_ROUTE, json=course_json).data)
+    route = f"{API_PREFIX}/course/{course['id']}"
+    response = client.put(
+        route, json=course_json, headers={"If-Match": '"stale"'}
+    )
+    assert response.status_code == 412
+
+    etag = client.get(route).headers[ETAG_HEADER]
+    response = client.put(
+        route,
+        json={**course_json, "name": "Fresh course"},
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == 200
+    assert client.get(route).headers[ETAG_HEADER] != etag
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app.configs import API_PREFIX
+from app.init_routers import ENROLLMENTS_ROUTE
+
+ENROLLMENTS_ROUTE = f"{API_PREFIX}{ENROLLMENTS_ROUTE}"
+
+ENROLL_STUDENT_IDS = [10, 11]
+ENROLL_COURSE_ID = 2
+
+
+def test_post_enrollments(client):
+    pairs = [
+        {"student_id": student_id, "course_id": ENROLL_COURSE_ID}
+        for student_id in ENROLL_STUDENT_IDS
+    ]
+    invalid_pairs = [
+        {"student_id": 1000, "course_id": ENROLL_COURSE_ID},
+        {"student_id": ENROLL_STUDENT_IDS[0], "course_id": 1000},
+    ]
+    response = client.post(
+        ENROLLMENTS_ROUTE, json=[*pairs, pairs[0], *invalid_pairs]
+    )
+    assert response.status_code == 200
+    assert json.loads(response.data) == {
+        "inserted": 2,
+        "duplicate": 1,
+        "invalid": 2,
+    }
+
+    response = client.post(ENROLLMENTS_ROUTE, json=pairs)
+    assert json.loads(response.data) == {
+        "inserted": 0,
+        "duplicate": 2,
+        "invalid": 0,
+    }
+
+    course = json.loads(
+        client.get(f"{API_PREFIX}/course/{ENROLL_COURSE_ID}").data
+    )
+    enrolled = {student["id"] for student in course["students"]}
+    assert set(ENROLL_STUDENT_IDS) <= enrolled
+
+
+UNENROLL_STUDENT_ID = 12
+UNENROLL_COURSE_ID = 3
+
+
+def test_delete_enrollments(client):
+    pair = {"student_id": UNENROLL_STUDENT_ID, "course_id": UNENROLL_COURSE_ID}
+    client.post(ENROLLMENTS_ROUTE, json=[pair])
+
+    response = client.delete(
+        ENROLLMENTS_ROUTE,
+        json=[pair, {"student_id": UNENROLL_STUDENT_ID, "course_id": 1000}],
+    )
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"deleted": 1, "missing": 1}
+
+
+@pytest.mark.parametrize(
+    "body", [{"student_id": 1}, [{"student_id": "one", "course_id": 1}]]
+)
+def test_invalid_enrollments(client, body):
+    response = client.post(ENROLLMENTS_ROUTE, json=body)
+    assert response.status_code == 422
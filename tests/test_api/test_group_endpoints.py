@@ -2,15 +2,20 @@ import json
 
 import pytest
 
+from app.api.university.utils import ETAG_HEADER
 from app.crud.university.group import get_group_by_name
 from app.configs import API_PREFIX
 from app.init_routers import (
     GROUP_POST_ROUTE,
     GROUPS_ROUTE,
+    STUDENT_POST_ROUTE,
 )
 
 GROUP_POST_ROUTE = f"{API_PREFIX}{GROUP_POST_ROUTE}"
 GROUPS_ROUTE = f"{API_PREFIX}{GROUPS_ROUTE}"
+STUDENT_POST_ROUTE = f"{API_PREFIX}{STUDENT_POST_ROUTE}"
+
+NOT_ASSIGNED_STUDENT_ID = 4
 
 student_amount_case = [5, 10, 15]
 
@@ -42,6 +47,22 @@ def test_get_groups_with_students(client):
         assert "students" in item
 
 
+def test_get_groups_filtered_and_sorted(client):
+    response = client.get(
+        GROUPS_ROUTE,
+        query_string={
+            "filter": "student_count:gte:1",
+            "sort": "-student_count,name",
+            "with": "students",
+        },
+    )
+    assert response.status_code == 200
+    groups = json.loads(response.data)
+    counts = [len(item["students"]) for item in groups]
+    assert groups and all(counts)
+    assert counts == sorted(counts, reverse=True)
+
+
 GET_GROUP_ID = 1
 
 
@@ -96,7 +117,7 @@ REMOVE_STUDENT_FOR_GROUP_ID = 1
 remove_student_from_group_json = {"student_ids": [1]}
 
 
-def test_remove_students_from_group(client):
+def test_remove_students_from_group(client, statements):
     response = client.patch(
         f"{API_PREFIX}/group/{REMOVE_STUDENT_FOR_GROUP_ID}/remove",
         json=remove_student_from_group_json,
@@ -104,6 +125,20 @@ def test_remove_students_from_group(client):
     assert response.status_code == 200
     response_data = json.loads(response.data)
     assert len(response_data["students"]) == 0
+    # Students are read once, after they are removed
+    assert [
+        statement
+        for statement in statements
+        if statement.startswith("SELECT") and "students" in statement
+    ] == [statements[-1]]
+
+
+def test_remove_not_assigned_student_from_group(client):
+    response = client.patch(
+        f"{API_PREFIX}/group/{GET_GROUP_ID}/remove",
+        json={"student_ids": [NOT_ASSIGNED_STUDENT_ID]},
+    )
+    assert response.status_code == 422
 
 
 ADD_STUDENT_TO_GROUP_ID = 6
@@ -155,7 +190,10 @@ def test_delete_group(client):
 
 def test_zero_amount_group(client):
     response = client.get(f"{API_PREFIX}/group_students_amount/0")
-    assert response.status_code == 404
+    assert response.status_code == 200
+    groups = json.loads(response.data)
+    assert groups
+    assert all(group["students"] == [] for group in groups)
 
 
 test_404_method_case = ["get", "patch", "put", "delete"]
@@ -184,3 +222,32 @@ def test_invalid_data_group(client, method):
 def test_invalid_post_group(client):
     response = client.post(GROUP_POST_ROUTE, json=invalid_data_json)
     assert response.status_code == 422
+
+
+def test_group_etag_changes_with_students(client):
+    group = json.loads(
+        client.post(GROUP_POST_ROUTE, json={"name": "ET-21"}).data
+    )
+    route = f"{API_PREFIX}/group/{group['id']}"
+    student = json.loads(
+        client.post(
+            STUDENT_POST_ROUTE,
+            json={
+                "first_name": "Etag",
+                "last_name": "Member",
+                "group_id": group["id"],
+            },
+        ).data
+    )
+    etag = client.get(route).headers[ETAG_HEADER]
+    assert client.get(route, headers={"If-None-Match": etag}).status_code == (
+        304
+    )
+
+    client.patch(
+        f"{API_PREFIX}/student/{student['id']}", json={"first_name": "Renamed"}
+    )
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers[ETAG_HEADER] != etag
+    assert json.loads(response.data)["students"][0]["first_name"] == "Renamed"
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import pytest
+
+from app.api.university.endpoints import group as group_endpoints
+from app.api.university.single_flight import SingleFlight, list_flights
+from app.configs import API_PREFIX
+from app.init_routers import ADMIN_SINGLE_FLIGHT_ROUTE, GROUPS_ROUTE
+
+ADMIN_SINGLE_FLIGHT_ROUTE = f"{API_PREFIX}{ADMIN_SINGLE_FLIGHT_ROUTE}"
+GROUPS_ROUTE = f"{API_PREFIX}{GROUPS_ROUTE}"
+
+
+def run_in_threads(executor, flights, key, load, count):
+    """Submits calls of flight in request threads, each with the session of
+    the test"""
+    return [
+        executor.submit(copy_context().run, flights.run, key, load)
+        for _ in range(count)
+    ]
+
+
+def test_concurrent_calls_share_load():
+    flights = SingleFlight()
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.1)
+        return len(loads)
+
+    with ThreadPoolExecutor(5) as executor:
+        calls = run_in_threads(
+            executor, flights, "groups?with=students", load, 5
+        )
+
+    assert [call.result() for call in calls] == [1] * 5
+    assert flights.stats.as_dict() == {"flights": 1, "folded": 4}
+
+
+def test_load_error_is_raised_to_all_callers():
+    flights = SingleFlight()
+
+    def load():
+        time.sleep(0.1)
+        raise ValueError("Invalid cursor")
+
+    with ThreadPoolExecutor(3) as executor:
+        calls = run_in_threads(executor, flights, "groups", load, 3)
+
+    assert all(isinstance(call.exception(), ValueError) for call in calls)
+    assert flights.stats.folded == 2
+
+
+def test_calls_after_change_start_new_flight():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(2) as executor:
+        (first,) = run_in_threads(executor, flights, "groups", load, 1)
+        assert started.wait(5)
+        flights.forget({"group:1"})
+        started.clear()
+        (second,) = run_in_threads(executor, flights, "groups", load, 1)
+        assert started.wait(5)
+        release.set()
+
+    assert [first.result(), second.result()] == ["value", "value"]
+    assert flights.stats.as_dict() == {"flights": 2, "folded": 0}
+
+
+def test_identical_group_lists_are_folded(client, monkeypatch):
+    get_group_rows = group_endpoints.get_group_rows
+
+    def slow_get_group_rows(*args, **kwargs):
+        time.sleep(0.2)
+        return get_group_rows(*args, **kwargs)
+
+    monkeypatch.setattr(group_endpoints, "get_group_rows", slow_get_group_rows)
+    folded = list_flights.stats.folded
+    with ThreadPoolExecutor(4) as executor:
+        responses = list(
+            executor.map(
+                lambda _: client.get(f"{GROUPS_ROUTE}?with=students"),
+                range(4),
+            )
+        )
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.data for response in responses}) == 1
+    assert list_flights.stats.folded - folded == 3
+
+
+@pytest.mark.parametrize("query", ["?limit=0", "?with=teachers"])
+def test_invalid_group_list_query(client, query):
+    assert client.get(f"{GROUPS_ROUTE}{query}").status_code == 422
+
+
+def test_get_single_flight_stats(client):
+    client.get(GROUPS_ROUTE)
+    response = client.get(ADMIN_SINGLE_FLIGHT_ROUTE)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["flights"] > 0
+    assert "folded" in data
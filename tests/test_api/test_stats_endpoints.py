@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.configs import API_PREFIX, BASE_URL, DB_NAME
+from app.crud.university.stats import refresh_stats
+from app.init_routers import (
+    STATS_COURSES_ROUTE,
+    STATS_GROUPS_ROUTE,
+    STUDENT_POST_ROUTE,
+    STUDENTS_ROUTE,
+)
+
+STATS_COURSES_ROUTE = f"{API_PREFIX}{STATS_COURSES_ROUTE}"
+STATS_GROUPS_ROUTE = f"{API_PREFIX}{STATS_GROUPS_ROUTE}"
+STUDENT_POST_ROUTE = f"{API_PREFIX}{STUDENT_POST_ROUTE}"
+STUDENTS_ROUTE = f"{API_PREFIX}{STUDENTS_ROUTE}"
+
+
+@pytest.fixture
+def refresh():
+    engine = create_engine(f"{BASE_URL}/{DB_NAME}")
+
+    def refresh_views() -> None:
+        with engine.begin() as connection:
+            refresh_stats(connection)
+
+    yield refresh_views
+    engine.dispose()
+
+
+def get_all_students(client):
+    return json.loads(
+        client.get(STUDENTS_ROUTE, query_string={"with": "group,courses"}).data
+    )
+
+
+def test_course_stats(client, refresh):
+    refresh()
+    response = client.get(STATS_COURSES_ROUTE)
+    assert response.status_code == 200
+    stats = json.loads(response.data)
+
+    students = get_all_students(client)
+    enrollments = sum(len(student["courses"]) for student in students)
+    assert stats["students"] == len(students)
+    assert stats["enrollments"] == enrollments
+    assert stats["students_without_courses"] == sum(
+        not student["courses"] for student in students
+    )
+    assert stats["average_courses_per_student"] == pytest.approx(
+        enrollments / len(students)
+    )
+    assert sum(course["students"] for course in stats["courses"]) == (
+        enrollments
+    )
+    counts = [course["students"] for course in stats["courses"]]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_group_stats(client, refresh):
+    refresh()
+    response = client.get(STATS_GROUPS_ROUTE)
+    assert response.status_code == 200
+    stats = json.loads(response.data)
+
+    students = get_all_students(client)
+    assert stats["unassigned_students"] == sum(
+        student["group"] is None for student in students
+    )
+    sizes = [group["students"] for group in stats["groups"]]
+    assert sum(sizes) == stats["students"] - stats["unassigned_students"]
+    assert stats["group_size_distribution"] == [
+        {"size": size, "groups": sizes.count(size)}
+        for size in sorted(set(sizes))
+    ]
+    assert stats["average_group_size"] == pytest.approx(
+        sum(sizes) / len(sizes)
+    )
+
+
+def test_stats_change_after_refresh(client, refresh):
+    refresh()
+    before = json.loads(client.get(STATS_COURSES_ROUTE).data)
+    client.post(
+        STUDENT_POST_ROUTE, json={"first_name": "Stat", "last_name": "Fresh"}
+    )
+
+    assert json.loads(client.get(STATS_COURSES_ROUTE).data) == before
+    refresh()
+    after = json.loads(client.get(STATS_COURSES_ROUTE).data)
+    assert after["students"] == before["students"] + 1
+    assert after["refreshed_at"] > before["refreshed_at"]
@@ -1,16 +1,41 @@
 import json
 
 import pytest
+from sqlalchemy import text
 
+from app.api.university import utils
+from app.api.university.utils import (
+    ETAG_HEADER,
+    NDJSON_MIMETYPE,
+    NEXT_CURSOR_HEADER,
+)
 from app.configs import API_PREFIX
 from app.crud.university.student import get_student_by_name
+from app.db.models.search import TRGM_EXTENSION
+from app.db.session import s
 from app.init_routers import (
+    GROUPS_ROUTE,
     STUDENT_POST_ROUTE,
+    STUDENTS_BULK_ROUTE,
     STUDENTS_ROUTE,
+    STUDENTS_SEARCH_ROUTE,
 )
 
 STUDENT_POST_ROUTE = f"{API_PREFIX}{STUDENT_POST_ROUTE}"
 STUDENTS_ROUTE = f"{API_PREFIX}{STUDENTS_ROUTE}"
+GROUPS_ROUTE = f"{API_PREFIX}{GROUPS_ROUTE}"
+STUDENTS_BULK_ROUTE = f"{API_PREFIX}{STUDENTS_BULK_ROUTE}"
+STUDENTS_SEARCH_ROUTE = f"{API_PREFIX}{STUDENTS_SEARCH_ROUTE}"
+
+
+@pytest.fixture
+def trgm_installed():
+    installed = s.user_db.scalar(
+        text("SELECT EXISTS (SELECT FROM pg_extension WHERE extname = :name)"),
+        {"name": TRGM_EXTENSION},
+    )
+    if not installed:
+        pytest.skip(f"{TRGM_EXTENSION} extension isn't available")
 
 
 def test_get_students(client):
@@ -21,6 +46,153 @@ def test_get_students(client):
         assert "last_name" in item
 
 
+@pytest.mark.parametrize(
+    "with_value, included, queries",
+    [
+        (None, set(), 1),
+        ("group", {"group"}, 1),
+        ("group,courses", {"group", "courses"}, 2),
+    ],
+)
+def test_get_students_with(client, with_value, included, queries):
+    query = {"with": with_value} if with_value else {}
+    response = client.get(STUDENTS_ROUTE, query_string=query)
+    assert response.status_code == 200
+    for item in json.loads(response.data):
+        assert {"group", "courses"} & set(item) == included
+    assert f'"{queries} queries"' in response.headers["Server-Timing"]
+
+
+def test_get_students_with_unknown_relationship(client):
+    response = client.get(STUDENTS_ROUTE, query_string={"with": "teachers"})
+    assert response.status_code == 422
+
+
+def test_get_students_pages(client):
+    ids, cursor = [], None
+    while True:
+        query = {"limit": 4, **({"after": cursor} if cursor else {})}
+        response = client.get(STUDENTS_ROUTE, query_string=query)
+        assert response.status_code == 200
+        page = json.loads(response.data)
+        assert len(page) <= 4
+        ids.extend(item["id"] for item in page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+
+    all_ids = [
+        item["id"] for item in json.loads(client.get(STUDENTS_ROUTE).data)
+    ]
+    assert ids == sorted(ids) == all_ids
+
+
+def test_get_students_page_size_is_capped(client, monkeypatch):
+    monkeypatch.setattr(utils, "PAGE_SIZE_MAX", 2)
+    response = client.get(STUDENTS_ROUTE, query_string={"limit": 1000})
+    assert len(json.loads(response.data)) == 2
+    assert NEXT_CURSOR_HEADER in response.headers
+
+
+@pytest.mark.parametrize(
+    "query", [{"limit": 0}, {"limit": "ten"}, {"after": "not-a-cursor"}]
+)
+def test_get_students_invalid_page(client, query):
+    response = client.get(STUDENTS_ROUTE, query_string=query)
+    assert response.status_code == 422
+
+
+def test_get_students_filtered(client):
+    group_id = client.get(GROUPS_ROUTE).json[0]["id"]
+    student = client.post(
+        STUDENT_POST_ROUTE,
+        json={
+            "first_name": "Ida",
+            "last_name": "Dunmore",
+            "group_id": group_id,
+        },
+    ).json
+    response = client.get(
+        STUDENTS_ROUTE,
+        query_string={
+            "filter": f"group_id:eq:{group_id},last_name:prefix:Dun",
+            "with": "group",
+        },
+    )
+    assert response.status_code == 200
+    students = json.loads(response.data)
+    assert student["id"] in [item["id"] for item in students]
+    for item in students:
+        assert item["group"]["id"] == group_id
+        assert item["last_name"].startswith("Dun")
+
+
+def test_get_students_sorted_pages(client):
+    query = {"sort": "-last_name,id"}
+    ids, cursor = [], None
+    while True:
+        page_query = {
+            **query,
+            "limit": 4,
+            **({"after": cursor} if cursor else {}),
+        }
+        response = client.get(STUDENTS_ROUTE, query_string=page_query)
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in json.loads(response.data))
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    students = json.loads(client.get(STUDENTS_ROUTE, query_string=query).data)
+    assert ids == [item["id"] for item in students]
+    assert students[0]["last_name"] >= students[-1]["last_name"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"filter": "teacher_id:eq:1"},
+        {"filter": "group_id:gt:1"},
+        {"filter": "group_id:eq:one"},
+        {"filter": "last_name:prefix:"},
+        {"sort": "first_name"},
+        {"sort": "id,id"},
+    ],
+)
+def test_get_students_invalid_list_query(client, query):
+    response = client.get(STUDENTS_ROUTE, query_string=query)
+    assert response.status_code == 422
+
+
+def test_get_students_cursor_of_other_sort(client):
+    response = client.get(
+        STUDENTS_ROUTE, query_string={"sort": "-last_name", "limit": 1}
+    )
+    response = client.get(
+        STUDENTS_ROUTE,
+        query_string={"after": response.headers[NEXT_CURSOR_HEADER]},
+    )
+    assert response.status_code == 422
+
+
+def test_stream_students(client, monkeypatch):
+    monkeypatch.setattr(utils, "STREAM_CHUNK_SIZE", 4)
+    response = client.get(
+        STUDENTS_ROUTE,
+        query_string={"with": "courses"},
+        headers={"Accept": NDJSON_MIMETYPE},
+    )
+    assert response.status_code == 200
+    assert response.mimetype == NDJSON_MIMETYPE
+    students = [json.loads(line) for line in response.data.splitlines()]
+
+    all_students = json.loads(
+        client.get(STUDENTS_ROUTE, query_string={"with": "courses"}).data
+    )
+    assert students == all_students
+
+
 GET_STUDENT_ID = 1
 
 
@@ -188,6 +360,74 @@ def test_remove_student(client):
     assert response.data == b""
 
 
+SCALAR_PATCH_STUDENT_ID = 6
+
+
+def test_patch_student_scalar_fields(client):
+    response = client.patch(
+        f"{API_PREFIX}/student/{SCALAR_PATCH_STUDENT_ID}",
+        json={"last_name": "Scalar"},
+    )
+    assert response.status_code == 200
+    assert json.loads(response.data)["last_name"] == "Scalar"
+    assert '"1 queries"' in response.headers["Server-Timing"]
+
+
+FAST_DELETE_STUDENT_ID = 7
+
+
+def test_delete_student_single_statement(client):
+    route = f"{API_PREFIX}/student/{FAST_DELETE_STUDENT_ID}"
+    response = client.delete(route)
+    assert response.status_code == 204
+    assert '"1 queries"' in response.headers["Server-Timing"]
+
+    assert client.delete(route).status_code == 404
+
+
+def test_get_student_etag(client):
+    student = json.loads(
+        client.post(
+            STUDENT_POST_ROUTE, json={"first_name": "Etag", "last_name": "Get"}
+        ).data
+    )
+    route = f"{API_PREFIX}/student/{student['id']}"
+    response = client.get(route)
+    assert response.status_code == 200
+    etag = response.headers[ETAG_HEADER]
+
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers[ETAG_HEADER] == etag
+
+    client.patch(route, json={"last_name": "Changed"})
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers[ETAG_HEADER] != etag
+
+
+def test_patch_student_if_match(client):
+    student = json.loads(
+        client.post(
+            STUDENT_POST_ROUTE, json={"first_name": "Etag", "last_name": "Put"}
+        ).data
+    )
+    route = f"{API_PREFIX}/student/{student['id']}"
+    etag = client.get(route).headers[ETAG_HEADER]
+
+    response = client.patch(
+        route, json={"last_name": "First"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+
+    response = client.patch(
+        route, json={"last_name": "Second"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    assert json.loads(client.get(route).data)["last_name"] == "First"
+
+
 test_404_method_case = ["get", "patch", "put", "delete"]
 
 
@@ -217,3 +457,92 @@ def test_invalid_data_student(client, method):
 def test_invalid_data_post_student(client):
     response = client.post(STUDENT_POST_ROUTE, json=invalid_data_json)
     assert response.status_code == 422
+
+
+bulk_students = [
+    {"first_name": "Bulk", "last_name": "One", "course_ids": [1, 2]},
+    {"first_name": "Bulk", "last_name": "Two", "group_id": 1000},
+    {"first_name": "Bulk", "last_name": "Three", "group_id": 2},
+    {"first_name": 12},
+]
+
+
+def test_post_students_bulk(client):
+    response = client.post(STUDENTS_BULK_ROUTE, json=bulk_students)
+    assert response.status_code == 207
+    data = json.loads(response.data)
+    assert [item["index"] for item in data["created"]] == [0, 2]
+    assert [item["index"] for item in data["errors"]] == [1, 3]
+
+    student = json.loads(
+        client.get(f"{API_PREFIX}/student/{data['created'][0]['id']}").data
+    )
+    assert student["last_name"] == "One"
+    assert {course["id"] for course in student["courses"]} == {1, 2}
+
+
+def test_post_students_bulk_atomic(client):
+    response = client.post(
+        STUDENTS_BULK_ROUTE,
+        json=[{"first_name": "Atomic", "last_name": "Bulk"}, *bulk_students],
+        query_string={"atomic": "true"},
+    )
+    assert response.status_code == 422
+    assert json.loads(response.data)["created"] == []
+    assert get_student_by_name("Atomic") is None
+
+
+def test_post_students_bulk_ndjson(client):
+    body = "\n".join(
+        json.dumps({"first_name": "Stream", "last_name": f"Bulk {i}"})
+        for i in range(3)
+    )
+    response = client.post(
+        STUDENTS_BULK_ROUTE, data=body, content_type=NDJSON_MIMETYPE
+    )
+    assert response.status_code == 201
+    assert len(json.loads(response.data)["created"]) == 3
+    assert '"1 queries"' in response.headers["Server-Timing"]
+
+
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_post_students_bulk_too_many(client, monkeypatch, ndjson):
+    monkeypatch.setattr(utils, "BULK_MAX_ITEMS", 2)
+    students = [
+        {"first_name": "Limit", "last_name": f"Bulk {i}"} for i in range(3)
+    ]
+    if ndjson:
+        response = client.post(
+            STUDENTS_BULK_ROUTE,
+            data="\n".join(json.dumps(student) for student in students),
+            content_type=NDJSON_MIMETYPE,
+        )
+    else:
+        response = client.post(STUDENTS_BULK_ROUTE, json=students)
+    assert response.status_code == 413
+    assert get_student_by_name("Limit") is None
+
+
+def test_search_students(client, trgm_installed):
+    student = client.post(
+        STUDENT_POST_ROUTE,
+        json={"first_name": "Maximilian", "last_name": "Oberstein"},
+    ).json
+    response = client.get(
+        STUDENTS_SEARCH_ROUTE,
+        query_string={"q": "Maximillian Oberstain", "limit": 3},
+    )
+    assert response.status_code == 200
+    found = json.loads(response.data)
+    assert len(found) <= 3
+    assert found[0] == {
+        "id": student["id"],
+        "first_name": "Maximilian",
+        "last_name": "Oberstein",
+    }
+
+
+@pytest.mark.parametrize("query", [{}, {"q": " "}, {"q": "Jo", "limit": 0}])
+def test_search_students_invalid_query(client, query):
+    response = client.get(STUDENTS_SEARCH_ROUTE, query_string=query)
+    assert response.status_code == 422
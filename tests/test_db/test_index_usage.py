@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.configs import BASE_URL, DB_NAME
+from app.db.index_usage import find_seq_scan_tables, find_unused_indexes
+
+PROBE_TABLE = "index_usage_probe"
+
+
+@pytest.fixture
+def probe_connection():
+    engine = create_engine(
+        f"{BASE_URL}/{DB_NAME}", isolation_level="AUTOCOMMIT"
+    )
+    with engine.connect() as connection:
+        connection.execute(text(f"CREATE TABLE {PROBE_TABLE} (id int)"))
+        connection.execute(
+            text(f"CREATE INDEX ix_{PROBE_TABLE}_id ON {PROBE_TABLE} (id)")
+        )
+        connection.execute(
+            text(f"INSERT INTO {PROBE_TABLE} SELECT generate_series(1, 100)")
+        )
+        try:
+            yield connection
+        finally:
+            connection.execute(text(f"DROP TABLE {PROBE_TABLE}"))
+    engine.dispose()
+
+
+def test_index_report(probe_connection):
+    probe_connection.execute(text("SET enable_indexscan = off"))
+    probe_connection.execute(text("SET enable_bitmapscan = off"))
+    for _ in range(3):
+        probe_connection.execute(
+            text(f"SELECT * FROM {PROBE_TABLE} WHERE id = 7")
+        )
+    probe_connection.execute(text("SELECT pg_stat_force_next_flush()"))
+
+    unused = {
+        item["index_name"]: item
+        for item in find_unused_indexes(probe_connection)
+    }
+    assert unused[f"ix_{PROBE_TABLE}_id"]["scans"] == 0
+    assert "students_pkey" not in unused
+
+    tables = {
+        item["table_name"]: item
+        for item in find_seq_scan_tables(probe_connection, min_rows=50)
+    }
+    assert tables[PROBE_TABLE]["seq_scan"] >= 3
+    assert tables[PROBE_TABLE]["index_usage"] == 0
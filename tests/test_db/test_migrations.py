@@ -0,0 +1,86 @@
+import alembic.command
+import alembic.config
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.configs import BASE_URL, POSTGRESS_DB
+from app.db.models import STUDENT_NAME_INDEX, Base
+from app.db.models.search import trgm_available
+from app.db.utils import create_database, drop_database
+
+MIGRATIONS_DB_NAME = "test_university_migrations"
+MIGRATIONS_DB_URL = f"{BASE_URL}/{MIGRATIONS_DB_NAME}"
+
+
+@pytest.fixture
+def migrations_engine():
+    create_database(f"{BASE_URL}/{POSTGRESS_DB}", MIGRATIONS_DB_NAME)
+    engine = create_engine(MIGRATIONS_DB_URL)
+    yield engine
+    engine.dispose()
+    drop_database(f"{BASE_URL}/{POSTGRESS_DB}", MIGRATIONS_DB_NAME)
+
+
+BASELINE_REVISION = "86b760160586"
+
+
+@pytest.fixture
+def migrations_config():
+    config = alembic.config.Config()
+    config.set_main_option("script_location", "migrations")
+    config.set_main_option("sqlalchemy.url", MIGRATIONS_DB_URL)
+    return config
+
+
+def test_migrations_build_models_schema(migrations_engine, migrations_config):
+    config = migrations_config
+    alembic.command.upgrade(config, "head")
+    with migrations_engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, Base.metadata) == []
+        triggers = connection.scalar(
+            text("SELECT count(*) FROM pg_trigger WHERE NOT tgisinternal")
+        )
+        assert triggers == 9
+        indexes = {
+            index["name"]
+            for index in inspect(connection).get_indexes("students")
+        }
+        assert (STUDENT_NAME_INDEX in indexes) == trgm_available(connection)
+
+    alembic.command.downgrade(config, "base")
+    with migrations_engine.connect() as connection:
+        assert inspect(connection).get_table_names() == ["alembic_version"]
+
+
+def test_migrations_upgrade_database_with_rows(
+    migrations_engine, migrations_config
+):
+    alembic.command.upgrade(migrations_config, BASELINE_REVISION)
+    with migrations_engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO groups (id, name) VALUES (1, 'AB-01'), "
+                "(2, 'AB-02');"
+                "INSERT INTO courses (id, name, description) "
+                "VALUES (1, 'Art', 'Art');"
+                "INSERT INTO students (id, first_name, last_name, group_id) "
+                "VALUES (1, 'Ann', 'Lee', 1), (2, 'Bob', 'Ray', 1), "
+                "(3, 'Eve', 'Fox', NULL);"
+                "INSERT INTO student_to_course VALUES (1, 1), (3, 1)"
+            )
+        )
+
+    alembic.command.upgrade(migrations_config, "head")
+    with migrations_engine.connect() as connection:
+        counts = connection.execute(
+            text("SELECT id, student_count FROM groups ORDER BY id")
+        ).all()
+        assert [tuple(row) for row in counts] == [(1, 2), (2, 0)]
+        assert (
+            connection.scalar(text("SELECT student_count FROM courses")) == 2
+        )
+        versions = connection.scalars(text("SELECT version FROM students"))
+        assert set(versions) == {1}
@@ -0,0 +1,82 @@
+import pytest
+
+from app.api.university.api_models.course import CourseResponse
+from app.api.university.api_models.group import GroupResponse
+from app.api.university.api_models.student import StudentResponse
+from app.crud.university.course import get_course_rows, stream_all_courses
+from app.crud.university.group import get_group_rows, stream_all_groups
+from app.crud.university.rows import StudentRow
+from app.crud.university.student import (
+    get_student_rows,
+    stream_all_students,
+)
+from app.configs import BASE_URL, DB_NAME
+from app.db.session import stream_session
+
+PAGE_LIMIT = 1000
+CHUNK_SIZE = 100
+
+
+LOADERS = {
+    "students": (
+        stream_all_students,
+        get_student_rows,
+        StudentResponse,
+        {"group", "courses"},
+    ),
+    "groups": (
+        stream_all_groups,
+        get_group_rows,
+        GroupResponse,
+        {"students"},
+    ),
+    "courses": (
+        stream_all_courses,
+        get_course_rows,
+        CourseResponse,
+        {"students"},
+    ),
+}
+
+
+@pytest.mark.parametrize(
+    "entity, include",
+    [
+        ("students", set()),
+        ("students", {"group"}),
+        ("students", {"group", "courses"}),
+        ("groups", set()),
+        ("groups", {"students"}),
+        ("courses", set()),
+        ("courses", {"students"}),
+    ],
+)
+def test_rows_match_response_models(entity, include):
+    stream_all, get_rows, response_model, relationships = LOADERS[entity]
+    exclude = relationships - include
+    rows = get_rows(PAGE_LIMIT, None, include)
+    # NDJSON stream of ORM entities is the reference for JSON rows
+    with stream_session(f"{BASE_URL}/{DB_NAME}") as session:
+        expected = [
+            response_model.model_validate(entity).model_dump(exclude=exclude)
+            for entity in stream_all(session, CHUNK_SIZE, include)
+        ]
+    assert [row.as_dict(include) for row in rows] == expected
+
+
+def test_student_rows_join_group():
+    rows = get_student_rows(PAGE_LIMIT, None, {"group"})
+    assert all(
+        row.group is None
+        if row.group_id is None
+        else row.group.id == row.group_id
+        for row in rows
+    )
+    assert all(row.courses is None for row in rows)
+    assert not hasattr(rows[0], "__dict__")
+    assert isinstance(rows[0], StudentRow)
+
+
+def test_rows_unknown_relationship():
+    with pytest.raises(ValueError):
+        get_group_rows(PAGE_LIMIT, None, {"teachers"})
@@ -0,0 +1,78 @@
+from contextvars import copy_context
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+
+from app.configs import API_PREFIX, BASE_URL, DB_NAME
+from app.db import session
+from app.db.session import LazySession
+
+
+def test_request_without_db_skips_checkout(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        session, "get_sync_pool", lambda *args: calls.append(args)
+    )
+    response = client.get("/not_existing_route")
+    assert response.status_code == 404
+    assert calls == []
+
+
+def test_lazy_session_opens_on_first_use():
+    lazy_session = LazySession(f"{BASE_URL}/{DB_NAME}", {})
+    assert not lazy_session.is_used
+
+    assert lazy_session.scalar(select(1)) == 1
+    assert lazy_session.is_used
+    lazy_session.close()
+
+
+def test_read_request_goes_to_replica(client, monkeypatch):
+    replica = f"{BASE_URL}/{DB_NAME}".replace("localhost", "127.0.0.1")
+    monkeypatch.setattr(session, "REPLICA_URLS", [replica.rsplit("/", 1)[0]])
+
+    response = client.get(f"{API_PREFIX}/courses")
+    assert response.status_code == 200
+    assert session.session_pools[replica].status()["checkouts"] > 0
+
+
+def test_write_session_leaves_replica(monkeypatch):
+    replica = f"{BASE_URL}/{DB_NAME}".replace("localhost", "127.0.0.1")
+    monkeypatch.setattr(session, "REPLICA_URLS", [replica.rsplit("/", 1)[0]])
+
+    lazy_session = LazySession(f"{BASE_URL}/{DB_NAME}", {}, read_only=True)
+    assert lazy_session.get_bind().url.host == "127.0.0.1"
+
+    lazy_session.use_primary()
+    assert not lazy_session.is_used
+    assert lazy_session.get_bind().url.host == "localhost"
+    lazy_session.close()
+
+
+def test_server_timing_header(client):
+    response = client.get(f"{API_PREFIX}/students")
+    server_timing = response.headers["Server-Timing"]
+    assert server_timing.startswith("db;dur=")
+    assert "0 queries" not in server_timing
+
+    response = client.get("/not_existing_route")
+    assert '"0 queries"' in response.headers["Server-Timing"]
+
+
+def test_failed_statement_is_not_recorded():
+    def execute() -> session.QueryStats:
+        stats = session.start_query_stats()
+        engine = session.get_sync_pool(
+            f"{BASE_URL}/{DB_NAME}", session.ENGINE_OPTIONS
+        ).engine
+        with engine.connect() as conn:
+            with pytest.raises(DBAPIError):
+                conn.execute(text("SELECT * FROM not_existing_table"))
+            conn.rollback()
+            assert conn.scalar(select(1)) == 1
+            assert "query_start_time" not in conn.info
+        return stats
+
+    stats = copy_context().run(execute)
+    assert stats.count == 1
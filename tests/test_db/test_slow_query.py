@@ -0,0 +1,128 @@
+import json
+import threading
+
+import pytest
+
+from sqlalchemy import select, text
+
+from app.configs import API_PREFIX
+from app.db import slow_query
+from app.db.models import Student
+from app.db.session import s
+from app.db.slow_query import (
+    SlowQueryLog,
+    fingerprint,
+    is_read_only,
+    summarize_slow_queries,
+)
+
+
+@pytest.fixture
+def slow_log(tmp_path, monkeypatch):
+    log = SlowQueryLog(
+        str(tmp_path / "slow.log"), threshold_ms=0, explain_sample_rate=1
+    )
+    monkeypatch.setattr(slow_query, "slow_query_log", log)
+    yield log
+    monkeypatch.undo()
+    log.flush()
+
+
+def test_fingerprint_ignores_literals():
+    assert fingerprint(
+        "SELECT * FROM students WHERE id IN (%(id_1)s, %(id_2)s)"
+    ) == fingerprint("SELECT *  FROM students WHERE id IN ($1::INTEGER)")
+
+
+def test_slow_query_is_logged_with_plan(client, slow_log):
+    response = client.get(f"{API_PREFIX}/student/1")
+    assert response.status_code == 200
+    slow_log.flush()
+
+    with open(slow_log.path) as file:
+        entries = [json.loads(line) for line in file]
+
+    student_entries = [
+        entry
+        for entry in entries
+        if entry["caller"] == "app.crud.university.student.get_student"
+    ]
+    assert student_entries
+    assert all("plan" in entry for entry in student_entries)
+    assert set(student_entries[0]["parameters"].values()) <= {"int", "str"}
+
+    summary = summarize_slow_queries(slow_log.path)
+    assert sum(item["count"] for item in summary) == len(entries)
+
+
+def test_explain_sample_is_dropped_when_queue_is_full(tmp_path, monkeypatch):
+    log = SlowQueryLog(
+        str(tmp_path / "slow.log"),
+        threshold_ms=0,
+        explain_sample_rate=1,
+        explain_queue_size=1,
+    )
+    started, release = threading.Event(), threading.Event()
+
+    def slow_explain(db_url, statement, parameters, analyze):
+        started.set()
+        release.wait(5)
+        return "plan"
+
+    monkeypatch.setattr(log, "_explain", slow_explain)
+    samples = [({"id": i}, "url", "SELECT 1", {}, True) for i in range(3)]
+    assert log._submit_explain(*samples[0])
+    started.wait(5)
+    assert log._submit_explain(*samples[1])
+    assert not log._submit_explain(*samples[2])
+    release.set()
+    log.flush()
+
+    assert log.dropped_explains == 1
+    with open(log.path) as file:
+        assert [json.loads(line) for line in file] == [
+            {"id": 0, "plan": "plan"},
+            {"id": 1, "plan": "plan"},
+        ]
+
+
+@pytest.mark.parametrize(
+    "statement, read_only",
+    [
+        ("SELECT id FROM students WHERE id = %(id)s", True),
+        ("WITH ids AS (SELECT id FROM students) SELECT * FROM ids", True),
+        ("SELECT id FROM students WHERE id = %(id)s FOR UPDATE", False),
+        ("SELECT id FROM students FOR NO KEY UPDATE", False),
+        ("SELECT id FROM groups FOR SHARE", False),
+        (
+            "WITH removed AS (DELETE FROM student_to_course RETURNING "
+            "course_id) SELECT count(*) FROM removed",
+            False,
+        ),
+        (
+            "WITH added AS (INSERT INTO student_to_course SELECT 1, 2 "
+            "RETURNING course_id) SELECT course_id FROM added",
+            False,
+        ),
+        ("UPDATE students SET first_name = %(name)s", False),
+    ],
+)
+def test_only_reads_are_analyzed(statement, read_only):
+    assert is_read_only(statement, None) == read_only
+
+
+def test_locking_read_is_explained_without_analyze(slow_log):
+    s.user_db.execute(
+        select(Student.id).where(Student.id == 1).with_for_update()
+    )
+    s.user_db.execute(text("SELECT id FROM students WHERE id = 1"))
+    s.user_db.rollback()
+    slow_log.flush()
+
+    with open(slow_log.path) as file:
+        plans = {
+            entry["statement"].endswith("FOR UPDATE"): entry["plan"][0]["Plan"]
+            for entry in map(json.loads, file)
+        }
+    assert "Actual Total Time" not in plans[True]
+    assert "Actual Total Time" in plans[False]
@@ -0,0 +1,66 @@
+from sqlalchemy import delete, func, insert, select, update
+
+from app.db.models import Course, Group, Student, StudentToCourse
+from app.db.session import s
+
+
+def count_of(model, model_id):
+    return s.user_db.scalar(
+        select(model.student_count).where(model.id == model_id)
+    )
+
+
+def test_student_count_is_maintained(request_session):
+    group_ids = s.user_db.scalars(
+        insert(Group).returning(Group.id),
+        [{"name": "SC-01"}, {"name": "SC-02"}],
+    ).all()
+    course_id = s.user_db.scalar(
+        insert(Course)
+        .values(name="Count course", description="Count")
+        .returning(Course.id)
+    )
+    student_ids = s.user_db.scalars(
+        insert(Student).returning(Student.id),
+        [
+            {
+                "first_name": "Count",
+                "last_name": f"{i}",
+                "group_id": group_ids[0],
+            }
+            for i in range(3)
+        ],
+    ).all()
+    s.user_db.execute(
+        insert(StudentToCourse),
+        [
+            {"student_id": student_id, "course_id": course_id}
+            for student_id in student_ids
+        ],
+    )
+    assert count_of(Group, group_ids[0]) == 3
+    assert count_of(Course, course_id) == 3
+
+    s.user_db.execute(
+        update(Student)
+        .where(Student.id == student_ids[0])
+        .values(group_id=group_ids[1])
+    )
+    assert count_of(Group, group_ids[0]) == 2
+    assert count_of(Group, group_ids[1]) == 1
+
+    s.user_db.execute(delete(Student).where(Student.id == student_ids[1]))
+    assert count_of(Group, group_ids[0]) == 1
+    assert count_of(Course, course_id) == 2
+
+
+def test_student_count_matches_students(request_session):
+    actual_count = (
+        select(func.count(Student.id))
+        .where(Student.group_id == Group.id)
+        .scalar_subquery()
+    )
+    mismatched = s.user_db.scalars(
+        select(Group.id).where(Group.student_count != actual_count)
+    ).all()
+    assert mismatched == []
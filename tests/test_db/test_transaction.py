@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.db.models import Group
+from app.db.session import s
+from app.db.transaction import (
+    SERIALIZATION_FAILURE,
+    transaction,
+    transaction_stats,
+)
+
+
+class SerializationFailure(Exception):
+    pgcode = SERIALIZATION_FAILURE
+
+
+def test_nested_transaction_is_savepoint(request_session):
+    @transaction
+    def add_inner_group() -> None:
+        s.user_db.add(Group(name="SP-02"))
+        s.user_db.flush()
+        raise ValueError("Inner failure")
+
+    @transaction
+    def add_groups() -> None:
+        s.user_db.add(Group(name="SP-01"))
+        s.user_db.flush()
+        with pytest.raises(ValueError):
+            add_inner_group()
+
+    add_groups()
+    names = s.user_db.scalars(
+        select(Group.name).where(Group.name.in_(["SP-01", "SP-02"]))
+    ).all()
+    assert names == ["SP-01"]
+
+
+def test_serialization_failure_is_retried(request_session):
+    calls = []
+    retries_before = transaction_stats.retries
+
+    @transaction(isolation_level="SERIALIZABLE", retries=2)
+    def conflicting_write() -> int:
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("UPDATE", {}, SerializationFailure())
+        return len(calls)
+
+    assert conflicting_write() == 2
+    assert transaction_stats.retries == retries_before + 1
+
+
+def test_transaction_aborted_after_retries(request_session):
+    aborts_before = transaction_stats.aborts
+
+    @transaction(retries=1)
+    def always_conflicting_write() -> None:
+        raise OperationalError("UPDATE", {}, SerializationFailure())
+
+    with pytest.raises(OperationalError):
+        always_conflicting_write()
+    assert transaction_stats.aborts == aborts_before + 1